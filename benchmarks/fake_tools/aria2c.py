@@ -0,0 +1,206 @@
+# Stand-in for aria2c.exe used by the offline benchmarks.
+#
+# Fetches nothing: it "downloads" each URL on the command line into --dir/--out, printing
+# aria2-style progress lines. With --enable-rpc it instead serves the JSON-RPC methods the add-on
+# uses (addUri, tellStatus, pause, unpause, forceRemove, removeDownloadResult, changeGlobalOption,
+# changeOption, getVersion, shutdown) on --rpc-listen-port, honouring --rpc-secret and --stop-with-process.
+# Behaviour is set through environment variables:
+#   FAKE_DELAY       seconds between progress lines or RPC progress steps (default 0.01)
+#   FAKE_TICKS       progress lines or steps per file (default 10)
+#   FAKE_SIZE        bytes reported per RPC download (default 10000000)
+#   FAKE_WRITE       bytes actually written per RPC download (default 1024)
+#   FAKE_FAIL_RATE   probability of failing with exit code 1, or an RPC download ending in error (default 0)
+
+import os
+import sys
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def env(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return float(default)
+
+def option(args, name, default=None):
+    prefix = f"--{name}="
+    return next((a[len(prefix):] for a in args if a.startswith(prefix)), default)
+
+class RpcServer:
+    def __init__(self, secret):
+        self.secret = secret
+        self.downloads = {}
+        self.options = {}
+        self.lock = threading.Lock()
+        self.next_gid = 1
+        self.httpd = None
+
+    def _run_download(self, gid):
+        size = int(env("FAKE_SIZE", 10000000))
+        ticks = int(env("FAKE_TICKS", 10))
+        delay = env("FAKE_DELAY", 0.01)
+        fail = random.random() < env("FAKE_FAIL_RATE", 0)
+        while True:
+            time.sleep(delay)
+            with self.lock:
+                d = self.downloads.get(gid)
+                if d is None or d["status"] in ("removed", "error"):
+                    return
+                if d["status"] == "paused":
+                    d["downloadSpeed"] = 0
+                    continue
+                step = size // ticks
+                limit = int(self.options.get("max-overall-download-limit", "0") or 0)
+                active = sum(1 for x in self.downloads.values() if x["status"] == "active")
+                own_limit = int(d["options"].get("max-download-limit", "0") or 0)
+                if own_limit:
+                    # The overall limit only caps the total; a download's own limit already fits inside it.
+                    step = min(step, max(1, int(own_limit * delay)))
+                elif limit:
+                    step = min(step, max(1, int(limit * delay / max(active, 1))))
+                d["completedLength"] = min(size, d["completedLength"] + step)
+                d["downloadSpeed"] = int(step / delay)
+                if fail and d["completedLength"] * 2 >= size:
+                    d["status"] = "error"
+                    d["errorMessage"] = "fake failure"
+                    return
+                if d["completedLength"] >= size:
+                    os.makedirs(d["dir"], exist_ok=True)
+                    with open(os.path.join(d["dir"], d["out"]), "wb") as f:
+                        f.write(b"\0" * int(env("FAKE_WRITE", 1024)))
+                    d["status"] = "complete"
+                    d["downloadSpeed"] = 0
+                    return
+
+    def dispatch(self, method, params):
+        if not params or params[0] != f"token:{self.secret}":
+            raise ValueError("Unauthorized")
+        params = params[1:]
+        with self.lock:
+            if method == "aria2.getVersion":
+                return {"version": "fake", "enabledFeatures": []}
+            if method == "aria2.addUri":
+                uris, options = params[0], params[1] if len(params) > 1 else {}
+                gid = f"{self.next_gid:016x}"
+                self.next_gid += 1
+                self.downloads[gid] = {
+                    "gid": gid, "status": "active", "completedLength": 0,
+                    "totalLength": int(env("FAKE_SIZE", 10000000)), "downloadSpeed": 0,
+                    "dir": options.get("dir", "."), "out": options.get("out") or uris[0].rsplit("/", 1)[-1],
+                    "options": options,
+                }
+                threading.Thread(target=self._run_download, args=(gid,), daemon=True).start()
+                return gid
+            if method == "aria2.changeGlobalOption":
+                self.options.update(params[0])
+                return "OK"
+            if method == "aria2.shutdown":
+                threading.Thread(target=self.httpd.shutdown, daemon=True).start()
+                return "OK"
+            d = self.downloads.get(params[0]) if params else None
+            if d is None:
+                raise ValueError(f"GID {params[0] if params else ''} is not found")
+            if method == "aria2.tellStatus":
+                keys = params[1] if len(params) > 1 else list(d)
+                return {k: str(d[k]) if isinstance(d[k], int) else d[k] for k in keys if k in d}
+            if method == "aria2.changeOption":
+                d["options"].update(params[1])
+                return "OK"
+            if method == "aria2.pause":
+                d["status"] = "paused"
+                return params[0]
+            if method == "aria2.unpause":
+                d["status"] = "active"
+                return params[0]
+            if method == "aria2.forceRemove":
+                if d["status"] in ("complete", "error", "removed"):
+                    raise ValueError(f"GID {params[0]} is not active")
+                d["status"] = "removed"
+                return params[0]
+            if method == "aria2.removeDownloadResult":
+                del self.downloads[params[0]]
+                return "OK"
+        raise ValueError(f"Method {method} not found")
+
+    def serve(self, port, watch_pid):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                try:
+                    reply = {"jsonrpc": "2.0", "id": request.get("id"), "result": server.dispatch(request["method"], request.get("params", []))}
+                    code = 200
+                except Exception as e:
+                    reply = {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": 1, "message": str(e)}}
+                    code = 400
+                body = json.dumps(reply).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json-rpc")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        if watch_pid:
+            threading.Thread(target=self._watch, args=(watch_pid,), daemon=True).start()
+        self.httpd.serve_forever()
+
+    def _watch(self, pid):
+        while True:
+            time.sleep(1)
+            try:
+                os.kill(pid, 0)
+            except OSError:
+                self.httpd.shutdown()
+                return
+
+def main():
+    args = sys.argv[1:]
+    if "--enable-rpc" in args:
+        watch_pid = option(args, "stop-with-process")
+        RpcServer(option(args, "rpc-secret", "")).serve(int(option(args, "rpc-listen-port", "6800")), int(watch_pid) if watch_pid else None)
+        return 0
+    directory = "."
+    out = None
+    urls = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ("-d", "--dir", "-o", "--out") and i + 1 < len(args):
+            if arg in ("-d", "--dir"):
+                directory = args[i + 1]
+            else:
+                out = args[i + 1]
+            i += 2
+            continue
+        if arg.startswith("--dir="):
+            directory = arg.split("=", 1)[1]
+        elif arg.startswith("--out="):
+            out = arg.split("=", 1)[1]
+        elif not arg.startswith("-"):
+            urls.append(arg)
+        i += 1
+    if random.random() < env("FAKE_FAIL_RATE", 0):
+        print("errorCode=1 fake failure", file=sys.stderr, flush=True)
+        return 1
+    ticks = int(env("FAKE_TICKS", 10))
+    for n, url in enumerate(urls):
+        name = out if out and n == 0 else url.rstrip("/").rsplit("/", 1)[-1] or f"file{n}"
+        for t in range(1, ticks + 1):
+            print(f"[#{n + 1:06x} {t}MiB/{ticks}MiB({t * 100 // ticks}%) CN:1 DL:1.0MiB]", flush=True)
+            time.sleep(env("FAKE_DELAY", 0.01))
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(b"\0" * 1024)
+    print("Download complete", flush=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+# Stand-in for ffmpeg.exe used by the offline benchmarks.
+#
+# Writes "-progress pipe:1" blocks when asked to and creates the output files (the last argument and
+# every argument after -y, since the add-on always puts -y just before an output).
+# Behaviour is set through environment variables:
+#   FAKE_STARTUP     seconds before any work (default 0)
+#   FAKE_ENCODE      seconds spent "encoding" (default 0.05)
+#   FAKE_FAIL_RATE   probability of failing with exit code 1 (default 0)
+#   FAKE_GOP         seconds between keyframes reported to a showinfo probe (default 2)
+#   FAKE_VCODEC      video codec listed for every input (default h264, empty for none)
+#   FAKE_ACODEC      audio codec listed for every input (default aac, empty for none)
+
+import os
+import sys
+import time
+import random
+
+def env(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return float(default)
+
+def main():
+    args = sys.argv[1:]
+    time.sleep(env("FAKE_STARTUP", 0))
+    if random.random() < env("FAKE_FAIL_RATE", 0):
+        print("Error while processing: fake failure", file=sys.stderr, flush=True)
+        return 1
+    steps = 5
+    total = 0
+    for i in range(steps):
+        time.sleep(env("FAKE_ENCODE", 0.05) / steps)
+        total += 65536
+        if "-progress" in args:
+            print(f"total_size={total}\nout_time_us={i * 1000000}\nprogress=continue", flush=True)
+    if "-progress" in args:
+        print("progress=end", flush=True)
+    inputs = [a for i, a in enumerate(args) if i and args[i - 1] == "-i"]
+    for n, path in enumerate(inputs):
+        print(f"Input #{n}, matroska,webm, from '{path}':", file=sys.stderr, flush=True)
+        if os.environ.get("FAKE_VCODEC", "h264"):
+            print(f"  Stream #{n}:0: Video: {os.environ.get('FAKE_VCODEC', 'h264')} (High), yuv420p, 1280x720", file=sys.stderr, flush=True)
+        if os.environ.get("FAKE_ACODEC", "aac"):
+            print(f"  Stream #{n}:1: Audio: {os.environ.get('FAKE_ACODEC', 'aac')} (LC), 44100 Hz, stereo", file=sys.stderr, flush=True)
+    if args[-1] in inputs:
+        print("At least one output file must be specified", file=sys.stderr, flush=True)
+        return 1
+    if "showinfo" in args:
+        gop = env("FAKE_GOP", 2)
+        for n in range(int(120 / gop)):
+            print(f"[Parsed_showinfo_0 @ 0x0] n:{n} pts:{n} pts_time:{n * gop - 0.7:g} duration:1", file=sys.stderr, flush=True)
+    outputs = [args[i + 1] for i, a in enumerate(args[:-1]) if a == "-y"] + [args[-1]]
+    for path in dict.fromkeys(outputs):
+        if path != "-":
+            with open(path, "wb") as f:
+                f.write(b"\0" * 1024)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
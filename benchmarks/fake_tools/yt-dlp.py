@@ -0,0 +1,134 @@
+# Stand-in for yt-dlp.exe used by the offline benchmarks.
+#
+# Understands the options uTubeDownload passes: -J, --batch-file -, --flat-playlist with --print,
+# -f with comma separated formats, -o (including "infojson:", "thumbnail:" and "subtitle:"),
+# --print after_move:, --progress-template, --load-info-json, --write-info-json, --write-thumbnail,
+# --skip-download, --write-subs and --sub-langs.
+# Behaviour is set through environment variables:
+#   FAKE_STARTUP   seconds spent "unpacking" before any work (default 0)
+#   FAKE_EXTRACT   seconds spent extracting metadata (default 0)
+#   FAKE_TICKS     progress lines per stream (default 10)
+#   FAKE_DELAY     seconds between progress lines (default 0.01)
+#   FAKE_SIZE      bytes reported per stream (default 10000000)
+#   FAKE_WRITE     bytes actually written per stream (default 1024)
+#   FAKE_FAIL_RATE probability of failing with exit code 1 (default 0)
+#   FAKE_ENTRIES   entries in a listed playlist (default 5)
+#   FAKE_PROTOCOL  protocol reported for every format when printing (default https)
+
+import os
+import sys
+import json
+import time
+import random
+
+def env(name, default, cast=float):
+    try:
+        return cast(os.environ.get(name, default))
+    except ValueError:
+        return cast(default)
+
+def option(args, name, default=None):
+    return args[args.index(name) + 1] if name in args else default
+
+def video_id(url):
+    candidate = url.rstrip("/").rsplit("/", 1)[-1]
+    for part in url.replace("?", "&").split("&"):
+        if part.startswith(("v=", "list=")):
+            candidate = part.split("=", 1)[1]
+            break
+    return "".join(c for c in candidate if c.isalnum() or c in "-_") or "video"
+
+def fill(template, values):
+    for key, value in values.items():
+        template = template.replace(f"%({key})s", str(value))
+    return template
+
+def main():
+    args = sys.argv[1:]
+    time.sleep(env("FAKE_STARTUP", 0))
+    if option(args, "--batch-file") == "-":
+        args.append(sys.stdin.read().strip())
+    url = args[-1]
+    info = None
+    if "--load-info-json" in args:
+        with open(option(args, "--load-info-json"), "r", encoding="utf-8") as f:
+            info = json.load(f)
+    else:
+        time.sleep(env("FAKE_EXTRACT", 0))
+    if info is None:
+        vid = video_id(url)
+        info = {"id": vid, "title": f"Video {vid}", "webpage_url": url, "duration": 125, "duration_string": "2:05"}
+
+    if "--flat-playlist" in args:
+        template = option(args, "--print", "%(id)s")
+        for i in range(env("FAKE_ENTRIES", 5, int)):
+            vid = f"{info['id']}-{i}"
+            print(fill(template, {"id": vid, "url": f"https://www.youtube.com/watch?v={vid}", "title": f"Entry {vid}"}), flush=True)
+        return 0
+    if "-J" in args:
+        print(json.dumps(info), flush=True)
+        return 0
+    outputs = [a for i, a in enumerate(args) if i and args[i - 1] == "-o"]
+    typed = {o.split(":", 1)[0]: o.split(":", 1)[1] for o in outputs if o.split(":", 1)[0] in ("infojson", "thumbnail", "subtitle")}
+    template = next((o for o in outputs if o.split(":", 1)[0] not in typed), "%(title)s.%(ext)s")
+    formats = option(args, "-f", "b")
+    streams = [("137", "mp4"), ("140", "m4a")] if "," in formats else [("140", "m4a")]
+    printed = option(args, "--print")
+    if printed and not printed.startswith("after_move:"):
+        # Simulated run: describe each requested format without downloading it.
+        for format_id, ext in streams:
+            values = dict(info, format_id=format_id, ext=ext)
+            print(fill(printed, dict(
+                values,
+                protocol=os.environ.get("FAKE_PROTOCOL", "https"),
+                filename=fill(template, values),
+                url=f"https://media.invalid/{info['id']}/{format_id}.{ext}",
+            )).replace("%(http_headers)j", json.dumps({"User-Agent": "fake"})), flush=True)
+        return 0
+    if random.random() < env("FAKE_FAIL_RATE", 0):
+        print("ERROR: fake failure", file=sys.stderr, flush=True)
+        return 1
+
+    info_template = typed.get("infojson")
+    if "--write-info-json" in args and "--no-write-info-json" not in args and info_template:
+        with open(fill(info_template, info) + ".info.json", "w", encoding="utf-8") as f:
+            json.dump(info, f)
+    if "--write-thumbnail" in args:
+        with open(fill(typed.get("thumbnail", template), dict(info, ext=option(args, "--convert-thumbnails", "webp"))), "wb") as f:
+            f.write(b"RIFF\0\0\0\0WEBP")
+    if "--write-subs" in args or "--write-auto-subs" in args:
+        for lang in option(args, "--sub-langs", "en").split(","):
+            with open(fill(typed.get("subtitle", template), dict(info, ext=f"{lang}.vtt")), "w", encoding="utf-8") as f:
+                f.write("WEBVTT\n\n00:00.000 --> 00:01.000\nfake\n")
+    if "--skip-download" in args:
+        return 0
+
+    progress = option(args, "--progress-template")
+    after_move = next((p[len("after_move:"):] for p in [option(args, "--print", "")] if p.startswith("after_move:")), None)
+    ticks = env("FAKE_TICKS", 10, int)
+    size = env("FAKE_SIZE", 10000000, int)
+    for format_id, ext in streams:
+        for i in range(1, ticks + 1):
+            if progress:
+                print(fill(progress.split(":", 1)[1], {
+                    "progress.status": "downloading",
+                    "progress.downloaded_bytes": size * i // ticks,
+                    "progress.total_bytes": size,
+                    "progress.total_bytes_estimate": "NA",
+                    "progress.speed": size / max(ticks * env("FAKE_DELAY", 0.01), 0.001),
+                    "progress.eta": ticks - i,
+                    "progress.fragment_index": i,
+                    "progress.fragment_count": ticks,
+                }), flush=True)
+            time.sleep(env("FAKE_DELAY", 0.01))
+        path = fill(template, dict(info, format_id=format_id, ext=ext))
+        with open(path, "wb") as f:
+            f.write(b"\0" * env("FAKE_WRITE", 1024, int))
+        if after_move:
+            print(fill(after_move, {"filepath": path}), flush=True)
+        else:
+            print(f"[download] Destination: {path}", flush=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
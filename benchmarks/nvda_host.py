@@ -0,0 +1,179 @@
+# Minimal stand-ins for the NVDA modules uTubeDownload imports, so the add-on core can run
+# in a plain Python process for benchmarking. Nothing here is shipped with the add-on.
+
+import os
+import re
+import sys
+import types
+import queue
+import builtins
+import urllib.parse  # NVDA has always imported this before add-ons load
+import importlib
+import threading
+import subprocess
+
+RepoPath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FakeToolsPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_tools")
+messages = []
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+class _Log:
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+
+    def info(self, s):
+        if self.verbose:
+            print(s)
+
+    def error(self, s):
+        print(s, file=sys.stderr)
+
+    debug = warning = info
+
+class _MainThread:
+    """Runs wx.CallAfter callbacks one at a time on a separate thread, like NVDA's main loop."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while True:
+            func, args, kwargs = self._queue.get()
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                print(f"CallAfter error: {e}", file=sys.stderr)
+
+    def call_after(self, func, *args, **kwargs):
+        self._queue.put((func, args, kwargs))
+
+    def call_later(self, ms, func, *args, **kwargs):
+        threading.Timer(ms / 1000, self.call_after, (func,) + args, kwargs).start()
+
+class _Config(dict):
+    spec = {}
+
+class _ToolPopen(subprocess.Popen):
+    """Runs the fake .py tools through this interpreter and drops Windows-only arguments elsewhere."""
+
+    def __init__(self, args, *a, **kwargs):
+        if isinstance(args, (list, tuple)) and args and str(args[0]).endswith(".py"):
+            args = [sys.executable] + list(args)
+        if os.name != "nt":
+            kwargs.pop("startupinfo", None)
+            kwargs.pop("creationflags", None)
+        super().__init__(args, *a, **kwargs)
+
+def _install_psutil():
+    try:
+        import psutil
+        return psutil
+    except ImportError:
+        pass
+
+    class Process:
+        def __init__(self, pid=None):
+            self.pid = pid or os.getpid()
+
+        def children(self, recursive=False):
+            return []
+
+        def cpu_times(self):
+            return types.SimpleNamespace(user=0.0, system=0.0)
+
+        def memory_info(self):
+            rss = 0
+            try:
+                with open(f"/proc/{self.pid}/statm") as f:
+                    rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            except (OSError, ValueError, AttributeError):
+                pass
+            return types.SimpleNamespace(rss=rss)
+
+        def io_counters(self):
+            raise NotImplementedError
+
+        def suspend(self):
+            os.kill(self.pid, 19)
+
+        def resume(self):
+            os.kill(self.pid, 18)
+
+        def terminate(self):
+            os.kill(self.pid, 15)
+
+        def kill(self):
+            os.kill(self.pid, 9)
+
+    return _module(
+        "psutil",
+        Process=Process,
+        NoSuchProcess=ProcessLookupError,
+        AccessDenied=PermissionError,
+        cpu_percent=lambda interval=None: 0.0,
+        cpu_count=lambda logical=True: os.cpu_count(),
+        disk_io_counters=lambda: None,
+        wait_procs=lambda procs, timeout=None: ([], procs),
+        virtual_memory=lambda: types.SimpleNamespace(percent=0.0),
+    )
+
+def install(config_dir, verbose=False):
+    """Register the fake NVDA modules; config_dir plays the role of NVDA's user configuration folder."""
+    builtins._ = lambda s: s
+    main_thread = _MainThread()
+    _module("api", log=_Log(verbose), getFocusObject=lambda: None, getForegroundObject=lambda: None, getNavigatorObject=lambda: None)
+    _module("config", conf=_Config(), post_configProfileSwitch=None)
+    _module(
+        "wx", CallAfter=main_thread.call_after, CallLater=main_thread.call_later,
+        Dialog=object, YES=1, NO=2, YES_NO=3, OK=4, ICON_ERROR=8, ICON_QUESTION=16
+    )
+    _module("winsound", PlaySound=lambda *a: None, SND_FILENAME=1, SND_ASYNC=2, SND_PURGE=4)
+    _module("controlTypes", Role=types.SimpleNamespace(LINK=1))
+    _module("speech", setSpeechOption=lambda *a: None, speak=lambda *a: None)
+    _module("ui", message=messages.append)
+    _module("scriptHandler", script=lambda **k: (lambda f: f), getLastScriptRepeatCount=lambda: 0)
+    gui = _module("gui", messageBox=lambda *a, **k: 1, mainFrame=None)
+    gui.guiHelper = _module("gui.guiHelper")
+    gui.settingsDialogs = _module("gui.settingsDialogs", NVDASettingsDialog=types.SimpleNamespace(categoryClasses=[]), SettingsPanel=object)
+    _module("tones", beep=lambda *a: None)
+    _module("globalVars", appArgs=types.SimpleNamespace(secure=False, configPath=config_dir))
+    _module("addonHandler", initTranslation=lambda: None)
+    _module("globalPluginHandler", GlobalPlugin=object)
+    _install_psutil()
+    for name, value in (("STARTF_USESHOWWINDOW", 1), ("SW_HIDE", 0), ("CREATE_NO_WINDOW", 0)):
+        if not hasattr(subprocess, name):
+            setattr(subprocess, name, value)
+    if not hasattr(subprocess, "STARTUPINFO"):
+        subprocess.STARTUPINFO = lambda: types.SimpleNamespace(dwFlags=0, wShowWindow=0)
+    subprocess.Popen = _ToolPopen
+
+def load_addon(result_folder, overrides=None):
+    """Import the add-on, fill its settings with their defaults plus overrides, and point it at the fake tools."""
+    if RepoPath not in sys.path:
+        sys.path.insert(0, RepoPath)
+    import config
+    importlib.import_module("globalPlugins.uTubeDownload")
+    section = config.conf.setdefault("uTubeDownload", {})
+    for key, spec in config.conf.spec["uTubeDownload"].items():
+        kind, default = re.match(r"(\w+)\(default=(.*)\)", spec).groups()
+        if kind == "boolean":
+            value = default == "True"
+        elif kind == "integer":
+            value = int(default)
+        else:
+            value = default.strip("'\"")
+        section.setdefault(key, value)
+    section["ResultFolder"] = result_folder
+    section.update(overrides or {})
+    core = importlib.import_module("globalPlugins.uTubeDownload.uTubeDownload_core")
+    core.YouTubeEXE = os.path.join(FakeToolsPath, "yt-dlp.py")
+    core.ConverterEXE = os.path.join(FakeToolsPath, "ffmpeg.py")
+    core.Aria2cEXE = os.path.join(FakeToolsPath, "aria2c.py")
+    core.isBrowser = lambda: True
+    return core
@@ -0,0 +1,216 @@
+"""Offline benchmark for the uTubeDownload core.
+
+Runs the real queue, workers, state store and post-processing pool against the stand-in tools
+in fake_tools/, so no network or NVDA is needed. Two measurements are taken:
+
+  state   the cost of the job table and ledger alone: add, run and complete --state-ops jobs
+          without starting any tool, then flush.
+  jobs    --jobs downloads queued through convertToMP, exactly as NVDA+Y does, timed from the
+          first enqueue until the queue is empty.
+
+Each run prints a summary and, with --output, appends one JSON line tagged with the current git
+commit, so results from different commits can be compared:
+
+    python benchmarks/run_benchmark.py --jobs 1000 --concurrency 4 --output bench.jsonl
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import datetime
+import tempfile
+import tracemalloc
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import nvda_host
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def process_write_bytes():
+    """Bytes this process has handed to write(); the tools run in their own processes and are not counted."""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().io_counters().write_bytes
+    except Exception:
+        return None
+
+def rss_bytes():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return None
+
+def git_commit():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=nvda_host.RepoPath,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=nvda_host.RepoPath,
+            capture_output=True, text=True
+        ).stdout.strip())
+        return commit, dirty
+    except Exception:
+        return None, None
+
+def delta(after, before):
+    if after is None or before is None:
+        return None
+    return after - before
+
+def bench_state(core, ops, folder):
+    before = process_write_bytes()
+    start = time.perf_counter()
+    for i in range(ops):
+        job_id = core.addDownloadToQueue({
+            "url": f"https://www.youtube.com/watch?v=state{i:06d}", "title": f"State {i}",
+            "format": "mp3", "path": folder, "cmd": ["noop"], "is_playlist": False
+        })
+        core.updateDownloadStatusInQueue(job_id, "running")
+        core.updateDownloadStatusInQueue(job_id, "completed", output_path=os.path.join(folder, f"State {i}.mp3"))
+        if i % 100 == 99:
+            core.removeCompletedOrFailedDownloadsFromQueue()
+    core.removeCompletedOrFailedDownloadsFromQueue()
+    core.flushState()
+    elapsed = time.perf_counter() - start
+    return {
+        "state_ops": ops,
+        "state_seconds": round(elapsed, 4),
+        "state_jobs_per_second": round(ops / elapsed, 1) if elapsed else None,
+        "state_write_bytes": delta(process_write_bytes(), before),
+    }
+
+def bench_jobs(core, args, folder):
+    formats = ["mp3", "mp4"] if args.format == "mixed" else [args.format]
+    latencies = []
+    before = process_write_bytes()
+    start = time.perf_counter()
+    if args.playlist:
+        os.environ["FAKE_ENTRIES"] = str(args.jobs)
+        t = time.perf_counter()
+        core.convertToMP(formats[0], folder, isPlaylist=True, url="https://www.youtube.com/playlist?list=bench")
+        latencies.append(time.perf_counter() - t)
+    else:
+        for i in range(args.jobs):
+            t = time.perf_counter()
+            core.convertToMP(formats[i % len(formats)], folder, url=f"https://www.youtube.com/watch?v=bench{i:06d}")
+            latencies.append(time.perf_counter() - t)
+    deadline = time.time() + args.timeout
+    # A playlist parent stays "running" until every entry is done, so this covers expansion too.
+    while core.getDownloadsByStatus(["queued", "running", "postprocessing", "retrying"]):
+        if time.time() > deadline:
+            print(f"Timed out after {args.timeout} seconds", file=sys.stderr)
+            break
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    core.flushState()
+    totals = core._metrics_store.totals if core._metrics_store is not None else {}
+    completed = totals.get("jobs", 0) - totals.get("failed", 0)
+    return {
+        "jobs_completed": completed,
+        "jobs_failed": totals.get("failed", 0),
+        "jobs_seconds": round(elapsed, 3),
+        "jobs_per_second": round(completed / elapsed, 2) if elapsed else None,
+        "enqueue_p50_ms": round(percentile(latencies, 0.5) * 1000, 3) if latencies else None,
+        "enqueue_p99_ms": round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+        "jobs_write_bytes": delta(process_write_bytes(), before),
+        "metrics_summary": core.getMetricsSummary(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=200, help="downloads to queue (or playlist entries with --playlist)")
+    parser.add_argument("--playlist", action="store_true", help="queue one playlist of --jobs entries instead of single videos")
+    parser.add_argument("--format", choices=["mp3", "mp4", "mixed"], default="mixed")
+    parser.add_argument("--concurrency", type=int, default=4, help="MaxConcurrentDownloads")
+    parser.add_argument("--state-ops", type=int, default=2000, help="jobs for the state store measurement, 0 to skip")
+    parser.add_argument("--delay", type=float, default=0.005, help="seconds between fake progress lines")
+    parser.add_argument("--ticks", type=int, default=5, help="fake progress lines per stream")
+    parser.add_argument("--startup", type=float, default=0.0, help="fake tool startup delay in seconds")
+    parser.add_argument("--encode", type=float, default=0.02, help="fake ffmpeg run time in seconds")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="probability a fake download fails")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--output", help="append the result as one JSON line to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary folder")
+    parser.add_argument("--verbose", action="store_true", help="print the add-on log")
+    args = parser.parse_args()
+
+    os.environ.update({
+        "FAKE_DELAY": str(args.delay),
+        "FAKE_TICKS": str(args.ticks),
+        "FAKE_STARTUP": str(args.startup),
+        "FAKE_ENCODE": str(args.encode),
+        "FAKE_FAIL_RATE": str(args.fail_rate),
+    })
+    workdir = tempfile.mkdtemp(prefix="utd-bench-")
+    config_dir = os.path.join(workdir, "config")
+    folder = os.path.join(workdir, "downloads")
+    os.makedirs(config_dir)
+    nvda_host.install(config_dir, verbose=args.verbose)
+    core = nvda_host.load_addon(folder, {
+        "MaxConcurrentDownloads": args.concurrency,
+        "UseMultiPart": False,
+        "SkipExisting": False,
+        "ResumeOnRestart": False,
+        "BeepWhileConverting": False,
+        "SayDownloadComplete": False,
+        "Logging": False,
+    })
+    core.getWebSiteTitle = lambda: "Benchmark"
+
+    tracemalloc.start()
+    core.initialize_folders()
+    core.start_worker_threads()
+    commit, dirty = git_commit()
+    result = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "params": vars(args),
+    }
+    try:
+        if args.state_ops:
+            result.update(bench_state(core, args.state_ops, folder))
+        if args.jobs:
+            result.update(bench_jobs(core, args, folder))
+    finally:
+        result["peak_python_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+        rss = rss_bytes()
+        result["rss_mb"] = round(rss / (1024 * 1024), 2) if rss else None
+        core.shutdown_workers()
+        core.stop_state_flusher()
+        core.close_state_store()
+        core.stop_log_writer()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    for key, value in result.items():
+        if key != "params":
+            print(f"{key}: {value}")
+    if args.keep:
+        print(f"workdir: {workdir}")
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -26,6 +26,7 @@ else:
     AddOnPath = os.path.dirname(__file__)
 sectionName = AddOnName
 _last_tap_time = 0
+_tap_count = 0
 _double_tap_threshold = 0.3
 
 def initConfiguration():
@@ -44,9 +45,23 @@ def initConfiguration():
         "TrimLastEndTime": "string(default='00:00:00')",
         "TrimLastURL": "string(default='')",
         "TrimLastDuration": "string(default='')",
+        "TrimLastMode": "string(default='exact')",
+        "TrimEncoderProfile": "string(default='x265-fast')",
+        "TrimThreads": "integer(default=0)",
         "UseMultiPart": "boolean(default=True)",
         "MultiPartConnections": "integer(default=8)",
         "SayDownloadComplete": "boolean(default=True)",
+        "StallTimeout": "integer(default=120)",
+        "MetadataCacheTTL": "integer(default=3600)",
+        "MetadataCacheSize": "integer(default=200)",
+        "WarmHelpers": "integer(default=1)",
+        "BandwidthLimit": "integer(default=0)",
+        "BandwidthSchedule": "string(default='')",
+        "SharedAria2": "boolean(default=True)",
+        "BundleSubtitles": "boolean(default=False)",
+        "SubtitleLanguages": "string(default='en')",
+        "BundleMetadata": "boolean(default=True)",
+        "MaxRetries": "integer(default=3)",
     }
     config.conf.spec[sectionName] = confspec
 initConfiguration()
@@ -92,6 +107,11 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
                 PlayWave,
                 start_worker_threads,
                 shutdown_workers,
+                stop_state_flusher,
+                close_state_store,
+                stop_log_writer,
+                getMetricsSummary,
+                togglePauseAll,
                 log
             )
         except ImportError as e:
@@ -110,6 +130,11 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
             'PlayWave': PlayWave,
             'start_worker_threads': start_worker_threads,
             'shutdown_workers': shutdown_workers,
+            'stop_state_flusher': stop_state_flusher,
+            'close_state_store': close_state_store,
+            'stop_log_writer': stop_log_writer,
+            'getMetricsSummary': getMetricsSummary,
+            'togglePauseAll': togglePauseAll,
             'log': log
         }
         
@@ -147,34 +172,45 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 
         try:
             self.core_functions['shutdown_workers']()
+            self.core_functions['stop_state_flusher']()
+            self.core_functions['close_state_store']()
+            self.core_functions['stop_log_writer']()
         except Exception as e:
             self.core_functions['log'](f"Error during shutdown: {e}")
 
     def _get_current_download_path(self):
         return config.conf[sectionName]["ResultFolder"] or self.core_functions['DownloadPath']
 
-    @script(description=_("Download MP3 (single tap) or MP4 (double tap)"), gesture="kb:NVDA+y")
+    @script(description=_("Download MP3 (single tap), MP4 (double tap) or MP4, MP3 and thumbnail together (triple tap)"), gesture="kb:NVDA+y")
     def script_downloadMP3OrMP4(self, gesture):
-        global _last_tap_time
+        global _last_tap_time, _tap_count
         current_time = time.time()
-        is_double_tap = (current_time - _last_tap_time) < _double_tap_threshold
+        if (current_time - _last_tap_time) < _double_tap_threshold:
+            _tap_count += 1
+        else:
+            _tap_count = 1
         _last_tap_time = current_time
         
-        if is_double_tap:
+        if _tap_count >= 3:
+            _tap_count = 0
             url = self.core_functions['getCurrentDocumentURL']()
             if url:
                 self.core_functions['PlayWave']('start')
-                wx.CallAfter(ui.message, _("Download MP4"))
-                self.core_functions['convertToMP']("mp4", self._get_current_download_path(), config.conf[sectionName]["PlaylistMode"])
-        else:
-            def do_single_tap_action():
-                if (time.time() - _last_tap_time) >= _double_tap_threshold:
-                    url = self.core_functions['getCurrentDocumentURL']()
-                    if url:
-                        self.core_functions['PlayWave']('start')
-                        wx.CallAfter(ui.message, _("Download MP3"))
-                        self.core_functions['convertToMP']("mp3", self._get_current_download_path(), config.conf[sectionName]["PlaylistMode"])
-            wx.CallLater(int(_double_tap_threshold * 1000), do_single_tap_action)
+                wx.CallAfter(ui.message, _("Download MP4, MP3 and thumbnail"))
+                self.core_functions['convertToMP']("mp4", self._get_current_download_path(), config.conf[sectionName]["PlaylistMode"], bundle=True)
+            return
+
+        def do_tap_action(count=_tap_count):
+            # A later tap either changes the count or resets it, which makes this one stale.
+            if (time.time() - _last_tap_time) < _double_tap_threshold or _tap_count != count:
+                return
+            url = self.core_functions['getCurrentDocumentURL']()
+            if url:
+                mpFormat = "mp4" if count == 2 else "mp3"
+                self.core_functions['PlayWave']('start')
+                wx.CallAfter(ui.message, _("Download MP4") if count == 2 else _("Download MP3"))
+                self.core_functions['convertToMP'](mpFormat, self._get_current_download_path(), config.conf[sectionName]["PlaylistMode"])
+        wx.CallLater(int(_double_tap_threshold * 1000), do_tap_action)
 
     @script(description=_("Open download folder"), gesture="kb:NVDA+control+y")
     def script_openDownloadFolder(self, gesture):
@@ -233,6 +269,36 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         
         wx.CallAfter(show_dialog)
 
+    @script(description=_("Speak download performance summary"), gesture="kb:NVDA+alt+shift+y")
+    def script_speakMetricsSummary(self, gesture):
+        ui.message(self.core_functions['getMetricsSummary']())
+
+    @script(description=_("Show the download queue to pause, cancel or reorder downloads"), gesture="kb:NVDA+control+shift+y")
+    def script_showQueue(self, gesture):
+        def show_dialog():
+            try:
+                from .uTubeQueue import uTubeQueueDialog
+                gui.mainFrame.prePopup()
+                dlg = uTubeQueueDialog(gui.mainFrame)
+                dlg.ShowModal()
+                dlg.Destroy()
+                gui.mainFrame.postPopup()
+            except Exception as e:
+                ui.message(_("Error opening download queue"))
+                self.core_functions['log'](f"Error in download queue dialog: {e}")
+
+        wx.CallAfter(show_dialog)
+
+    @script(description=_("Pause or resume all downloads"), gesture="kb:NVDA+alt+control+y")
+    def script_togglePauseAll(self, gesture):
+        paused, count = self.core_functions['togglePauseAll']()
+        if not count:
+            ui.message(_("No downloads to pause"))
+        elif paused:
+            ui.message(_("Paused {count} downloads").format(count=count))
+        else:
+            ui.message(_("Resumed {count} downloads").format(count=count))
+
     @script(description=_("uTubeSnapshot"), gesture="kb:control+shift+y")
     def script_captureSnapshot(self, gesture):
         url = self.core_functions['getCurrentDocumentURL']()
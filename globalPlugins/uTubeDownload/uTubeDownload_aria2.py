@@ -0,0 +1,167 @@
+# uTubeDownload_aria2.py
+
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+
+class Aria2Error(Exception):
+    pass
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class Aria2Daemon:
+    """One long-lived aria2c shared by every multi-part download, driven over its JSON-RPC interface.
+
+    Sharing one instance lets aria2 reuse DNS results and TLS sessions across jobs and keeps the
+    number of open connections under one cap. The daemon listens on 127.0.0.1 only, uses a random
+    secret, and exits by itself if NVDA goes away without stopping it.
+    """
+
+    def __init__(self, exe, max_downloads=4, max_connections=16, timeout=5):
+        self.exe = exe
+        self.max_downloads = max_downloads
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.process = None
+        self.url = None
+        self._secret = None
+        self._lock = threading.Lock()
+        self._ids = 0
+        self._global_options = {}
+        self._options = {}
+        # Requests to localhost must not be handed to a system proxy.
+        self._opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+    def start(self):
+        port = _free_port()
+        self._secret = uuid.uuid4().hex
+        si = subprocess.STARTUPINFO()
+        si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        si.wShowWindow = subprocess.SW_HIDE
+        self.process = subprocess.Popen(
+            [
+                self.exe, "--enable-rpc", "--rpc-listen-all=false", f"--rpc-listen-port={port}",
+                f"--rpc-secret={self._secret}", f"--stop-with-process={os.getpid()}",
+                f"--max-concurrent-downloads={self.max_downloads}",
+                f"--max-connection-per-server={min(self.max_connections, 16)}",
+                "--min-split-size=1M", "--file-allocation=none", "--continue=true",
+                "--allow-overwrite=true", "--auto-file-renaming=false",
+                "--max-tries=0", "--retry-wait=1", "--console-log-level=warn", "--quiet=true"
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            startupinfo=si,
+            creationflags=subprocess.CREATE_NO_WINDOW
+        )
+        self.url = f"http://127.0.0.1:{port}/jsonrpc"
+        self._global_options = {}
+        self._options = {}
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                self.call("aria2.getVersion")
+                return
+            except Aria2Error:
+                if self.process.poll() is not None or time.time() > deadline:
+                    self.stop()
+                    raise
+                time.sleep(0.1)
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def call(self, method, *params):
+        with self._lock:
+            self._ids += 1
+            request_id = self._ids
+        payload = json.dumps({
+            "jsonrpc": "2.0", "id": request_id, "method": method,
+            "params": [f"token:{self._secret}"] + list(params)
+        }).encode("utf-8")
+        request = urllib.request.Request(self.url, data=payload, headers={"Content-Type": "application/json"})
+        try:
+            with self._opener.open(request, timeout=self.timeout) as response:
+                reply = json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            # aria2 answers RPC errors with an HTTP error status and the JSON error as the body.
+            try:
+                reply = json.loads(e.read().decode("utf-8"))
+            except Exception:
+                raise Aria2Error(f"{method}: HTTP {e.code}")
+        except Exception as e:
+            raise Aria2Error(f"{method}: {e}")
+        if reply.get("error"):
+            raise Aria2Error(f"{method}: {reply['error'].get('message')}")
+        return reply.get("result")
+
+    def add(self, uri, directory, name, headers=None, connections=None):
+        """Start downloading uri to directory/name and return its gid."""
+        options = {"dir": directory, "out": name}
+        if headers:
+            options["header"] = [f"{key}: {value}" for key, value in headers.items()]
+        if connections:
+            options["split"] = str(connections)
+            options["max-connection-per-server"] = str(min(connections, 16))
+        return self.call("aria2.addUri", [uri], options)
+
+    def status(self, gid):
+        return self.call("aria2.tellStatus", gid, ["status", "totalLength", "completedLength", "downloadSpeed", "errorMessage", "files"])
+
+    def pause(self, gid):
+        return self.call("aria2.pause", gid)
+
+    def unpause(self, gid):
+        return self.call("aria2.unpause", gid)
+
+    def remove(self, gid):
+        for key in [key for key in self._options if key[0] == gid]:
+            del self._options[key]
+        try:
+            self.call("aria2.forceRemove", gid)
+        except Aria2Error:
+            pass
+        try:
+            self.call("aria2.removeDownloadResult", gid)
+        except Aria2Error:
+            pass
+
+    def set_global_option(self, key, value):
+        # Only sent when it changes, since callers set it on every progress poll.
+        value = str(value)
+        if self._global_options.get(key) == value:
+            return
+        self.call("aria2.changeGlobalOption", {key: value})
+        self._global_options[key] = value
+
+    def set_option(self, gid, key, value):
+        # Like set_global_option, for one download.
+        value = str(value)
+        if self._options.get((gid, key)) == value:
+            return
+        self.call("aria2.changeOption", gid, {key: value})
+        self._options[(gid, key)] = value
+
+    def stop(self):
+        process, self.process = self.process, None
+        if process is None:
+            return
+        try:
+            if process.poll() is None:
+                self.call("aria2.shutdown")
+                process.wait(timeout=self.timeout)
+        except Exception:
+            try:
+                process.kill()
+                process.wait(timeout=self.timeout)
+            except Exception:
+                pass
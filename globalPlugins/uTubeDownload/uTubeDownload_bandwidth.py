@@ -0,0 +1,81 @@
+# uTubeDownload_bandwidth.py
+
+import re
+import time
+import datetime
+import threading
+
+_window_pattern = re.compile(r"^\s*(\d{1,2})(?::(\d{2}))?\s*-\s*(\d{1,2})(?::(\d{2}))?\s*=\s*(\d+)\s*$")
+
+def parseSchedule(text):
+    """Parse "08:00-18:00=500; 22-06=0" into (start minute, end minute, KB/s) windows.
+
+    A window may wrap past midnight, and 0 lifts the limit for that window. Raises ValueError naming the bad entry.
+    """
+    windows = []
+    for part in re.split(r"[;,]", text or ""):
+        if not part.strip():
+            continue
+        match = _window_pattern.match(part)
+        if not match:
+            raise ValueError(part.strip())
+        start_hour, start_minute, end_hour, end_minute, rate = match.groups()
+        start = int(start_hour) * 60 + int(start_minute or 0)
+        end = int(end_hour) * 60 + int(end_minute or 0)
+        if start >= 24 * 60 or end > 24 * 60:
+            raise ValueError(part.strip())
+        windows.append((start, end, int(rate)))
+    return windows
+
+def scheduledLimit(base, windows, now=None):
+    """The KB/s limit in force at now: the first window that covers it, otherwise base."""
+    now = now or datetime.datetime.now()
+    minute = now.hour * 60 + now.minute
+    for start, end, rate in windows:
+        if start <= end:
+            inside = start <= minute < end
+        else:
+            inside = minute >= start or minute < end
+        if inside:
+            return rate
+    return base
+
+class TokenBucket:
+    """Refills at rate bytes per second and holds at most burst seconds of it.
+
+    consume() never blocks; the level goes negative when downloads overdraw it, and whoever
+    reads level() decides how to pay the debt back.
+    """
+
+    def __init__(self, rate=0, burst=1.0):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = rate * burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.rate * self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def set_rate(self, rate):
+        with self._lock:
+            if rate == self.rate:
+                return
+            self._refill()
+            # Coming from no limit starts with a full bucket rather than whatever was downloaded meanwhile.
+            self._tokens = rate * self.burst if not self.rate else min(self._tokens, rate * self.burst)
+            self.rate = rate
+
+    def consume(self, nbytes):
+        with self._lock:
+            if not self.rate:
+                return
+            self._refill()
+            self._tokens -= nbytes
+
+    def level(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
@@ -8,7 +8,6 @@ import urllib
 import threading
 import subprocess
 import datetime
-import glob
 import winsound
 import api
 import controlTypes
@@ -25,6 +24,40 @@ import tempfile
 import psutil
 import sys
 from queue import Queue
+from collections import deque
+
+from .uTubeDownload_progress import OutputReader, withProgressArgs
+from .uTubeDownload_queue import FairShareQueue
+from .uTubeDownload_metadata import MetadataCache
+from .uTubeDownload_helpers import WarmProcessPool
+from .uTubeDownload_folderindex import folderIndex
+from .uTubeDownload_logwriter import LogWriter
+from .uTubeDownload_metrics import JobMetrics, MetricsStore
+from .uTubeDownload_bandwidth import TokenBucket, parseSchedule, scheduledLimit
+from .uTubeDownload_aria2 import Aria2Daemon, Aria2Error
+from .uTubeDownload_retry import classifyError, retryDelay
+from .uTubeDownload_partials import unusablePartials
+from .uTubeDownload_postprocess import (
+    buildPostprocessCommand,
+    bundleOutputs,
+    bundleOutputTemplates,
+    downloadedFileArgs,
+    findBundleExtras,
+    findDownloadedFiles,
+    keyframeProbeCommand,
+    keyframeTime,
+    parseStreamCodecs,
+    readAvcConfig,
+    smartCutCommands,
+    streamOutputTemplate,
+    streamProbeCommand,
+)
+
+try:
+    from .uTubeDownload_ledger import DownloadLedger
+except ImportError:
+    # Not every NVDA build ships sqlite3; the JSON state file and journal are used instead.
+    DownloadLedger = None
 
 AddOnSummary = "uTubeDownload"
 AddOnName = "uTubeDownload"
@@ -37,7 +70,9 @@ SoundPath = os.path.join(AddOnPath, "sounds")
 AppData = os.path.join(os.path.expanduser('~'), 'AppData', 'Roaming')
 DownloadPath = None
 sectionName = AddOnName
-_download_queue = Queue()
+_download_queue = FairShareQueue()
+_postprocess_queue = Queue()
+_postprocess_workers = 0
 _heartbeat_thread = None
 _heartbeat_active = False
 Aria2cEXE = os.path.join(ToolsPath, "aria2c.exe")
@@ -47,7 +82,41 @@ ConverterPath = ToolsPath
 _global_state_lock = threading.Lock()
 _global_active_downloads = 0
 _global_active_lock = threading.Lock()
-_num_workers = config.conf[sectionName]["MaxConcurrentDownloads"]
+_num_workers = 0
+_express_worker = None
+_slot_condition = threading.Condition()
+_slot_limit = 1
+_slots_in_use = 0
+_controller_thread = None
+_controller_active = False
+_controller_interval = 5
+_job_progress = {}
+_progress_listeners = []
+_running_jobs = {}
+_running_jobs_lock = threading.Lock()
+_watchdog_thread = None
+_watchdog_active = False
+_watchdog_interval = 2
+_watchdog_cpu_threshold = 0.2
+_bandwidth_bucket = TokenBucket()
+_bandwidth_thread = None
+_bandwidth_active = False
+_bandwidth_interval = 0.5
+_bandwidth_min_share = 16 * 1024
+_bandwidth_bad_schedule = None
+_aria2 = None
+_aria2_lock = threading.Lock()
+_aria2_failed = False
+_aria2_jobs = 0
+_aria2_poll_interval = 0.5
+# Job control: paused jobs are suspended while they run and held back by the workers while they wait.
+_control_lock = threading.Lock()
+_paused_jobs = set()
+_cancelled_jobs = set()
+_held_jobs = {}
+_retry_timers = {}
+_retry_base_delay = 5
+_retry_max_delay = 300
 
 def getStateFilePath():
     try:
@@ -108,88 +177,486 @@ def initialize_folders():
         os.makedirs(ToolsPath, exist_ok=True)
     if not os.path.exists(SoundPath):
         os.makedirs(SoundPath, exist_ok=True)
-    if not os.path.exists(StateFilePath):
-        saveState([])
+    _open_state_store()
+    _load_archive()
+    start_state_flusher()
+    _open_metadata_cache()
+    _open_metrics_store()
     log("Initialized folders")
 
-def saveState(queue_list):
+JournalFilePath = os.path.splitext(StateFilePath)[0] + ".journal"
+LedgerFilePath = os.path.splitext(StateFilePath)[0] + ".db"
+_ledger = None
+_journal_handle = None
+_journal_record_count = 0
+_journal_compact_threshold = 500
+# In-memory job table; the files on disk are written behind it by the flusher thread.
+_jobs = {}
+_jobs_by_status = {}
+_job_positions = {}
+_job_sequence = 0
+_pending_records = []
+_state_io_lock = threading.Lock()
+_state_dirty = threading.Event()
+_state_flush_thread = None
+_state_flush_active = False
+_state_flush_interval = 1.0
+
+def _write_snapshot(queue_list):
+    os.makedirs(os.path.dirname(StateFilePath), exist_ok=True)
+    temp_path = StateFilePath + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(queue_list, f, ensure_ascii=False, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, StateFilePath)
+
+def _close_journal():
+    global _journal_handle
+    if _journal_handle:
+        try:
+            _journal_handle.close()
+        except Exception:
+            pass
+        _journal_handle = None
+
+def _truncate_journal():
+    global _journal_record_count
+    _close_journal()
+    if os.path.exists(JournalFilePath):
+        os.remove(JournalFilePath)
+    _journal_record_count = 0
+
+def _append_journal(records):
+    # One JSON line per state transition; the snapshot is only rewritten on compaction.
+    global _journal_handle, _journal_record_count
+    if _journal_handle is None:
+        os.makedirs(os.path.dirname(JournalFilePath), exist_ok=True)
+        _journal_handle = open(JournalFilePath, 'a', encoding='utf-8')
+    _journal_handle.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+    _journal_handle.flush()
+    _journal_record_count += len(records)
+
+def _apply_journal_record(queue_list, record):
+    op = record.get("op")
+    if op == "add":
+        queue_list.append(record["item"])
+    elif op == "status":
+        for item in queue_list:
+            if item.get("id") == record.get("id"):
+                item["status"] = record["status"]
+                item.update(record.get("fields", {}))
+                break
+    elif op == "purge":
+        if "ids" in record:
+            purged = set(record["ids"])
+            queue_list[:] = [item for item in queue_list if item.get("id") not in purged]
+        else:
+            queue_list[:] = [item for item in queue_list if item.get("status") not in ["completed", "failed", "cancelled"]]
+    elif op == "clear":
+        del queue_list[:]
+    return queue_list
+
+def _read_snapshot():
+    if os.path.exists(StateFilePath):
+        with open(StateFilePath, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return []
+
+def _replay_journal(queue_list):
+    if not os.path.exists(JournalFilePath):
+        return 0
+    with open(JournalFilePath, 'r', encoding='utf-8') as f:
+        lines = f.read().split("\n")
+    replayed = 0
+    for index, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # A torn final line means we crashed mid-append; anything else is real damage.
+            if any(rest.strip() for rest in lines[index + 1:]):
+                log(f"Skipping corrupt journal record {index + 1}")
+            continue
+        _apply_journal_record(queue_list, record)
+        replayed += 1
+    return replayed
+
+def _copy_job(item):
+    job = dict(item)
+    if "cmd" in job:
+        job["cmd"] = list(job["cmd"])
+    return job
+
+def _index_job(item):
+    global _job_sequence
+    _job_sequence += 1
+    _jobs[item["id"]] = item
+    _job_positions[item["id"]] = _job_sequence
+    _jobs_by_status.setdefault(item.get("status"), set()).add(item["id"])
+
+def _unindex_job(download_id):
+    item = _jobs.pop(download_id, None)
+    _job_positions.pop(download_id, None)
+    if item is not None:
+        _jobs_by_status.get(item.get("status"), set()).discard(download_id)
+    return item
+
+def _set_job_status(item, status):
+    _jobs_by_status.get(item.get("status"), set()).discard(item["id"])
+    item["status"] = status
+    _jobs_by_status.setdefault(status, set()).add(item["id"])
+
+def _reset_job_table(queue_list):
+    global _job_sequence
+    _jobs.clear()
+    _jobs_by_status.clear()
+    _job_positions.clear()
+    _job_sequence = 0
+    for item in queue_list:
+        if item.get("id"):
+            _index_job(item)
+
+def _record_change(record):
+    # Caller holds _global_state_lock.
+    _pending_records.append(record)
+    _state_dirty.set()
+
+def _coalesce_records(records):
+    coalesced = []
+    added = {}
+    statuses = {}
+    for record in records:
+        op = record.get("op")
+        if op == "add":
+            added[record["item"]["id"]] = record
+        elif op == "status":
+            job_id = record["id"]
+            if job_id in added:
+                added[job_id]["item"]["status"] = record["status"]
+                added[job_id]["item"].update(record.get("fields", {}))
+                continue
+            if job_id in statuses:
+                previous = coalesced[statuses[job_id]]
+                record = dict(record, fields={**previous.get("fields", {}), **record.get("fields", {})})
+                coalesced[statuses[job_id]] = None
+            statuses[job_id] = len(coalesced)
+        elif op in ("purge", "clear"):
+            added.clear()
+            statuses.clear()
+        coalesced.append(record)
+    return [record for record in coalesced if record is not None]
+
+def _flush_pending():
+    with _state_io_lock:
+        with _global_state_lock:
+            records = _coalesce_records(_pending_records)
+            del _pending_records[:]
+            snapshot = None
+            if records and _journal_record_count + len(records) >= _journal_compact_threshold:
+                snapshot = [_copy_job(item) for item in _jobs.values()]
+        if not records:
+            return
+        try:
+            if _ledger is not None:
+                _ledger.apply(records)
+            elif snapshot is not None:
+                _write_snapshot(snapshot)
+                _truncate_journal()
+            else:
+                _append_journal(records)
+        except Exception as e:
+            log(f"Error saving state: {e}")
+
+def _state_flush_loop():
+    while _state_flush_active:
+        _state_dirty.wait()
+        # Debounce so a burst of status changes costs a single write.
+        time.sleep(_state_flush_interval)
+        _state_dirty.clear()
+        _flush_pending()
+
+def start_state_flusher():
+    global _state_flush_thread, _state_flush_active
+    if not _state_flush_active:
+        _state_flush_active = True
+        _state_flush_thread = threading.Thread(target=_state_flush_loop, daemon=True)
+        _state_flush_thread.start()
+
+def stop_state_flusher():
+    global _state_flush_active
+    _state_flush_active = False
+    _state_dirty.set()
+    flushState()
+
+def close_state_store():
+    global _ledger
+    _close_journal()
+    if _ledger is not None:
+        try:
+            _ledger.close()
+        except Exception as e:
+            log(f"Error closing download ledger: {e}")
+        _ledger = None
+
+def flushState():
+    _flush_pending()
+
+def _open_state_store():
+    global _ledger
+    if DownloadLedger is not None:
+        try:
+            _ledger = DownloadLedger(LedgerFilePath)
+        except Exception as e:
+            log(f"Error opening download ledger, using the JSON state file: {e}")
+            _ledger = None
+    if _ledger is None:
+        if not os.path.exists(StateFilePath):
+            saveState([])
+        else:
+            _load_job_table()
+        return
     try:
-        os.makedirs(os.path.dirname(StateFilePath), exist_ok=True)
-        with open(StateFilePath, 'w', encoding='utf-8') as f:
-            json.dump(queue_list, f, ensure_ascii=False, indent=4)
+        if _ledger.is_empty() and (os.path.exists(StateFilePath) or os.path.exists(JournalFilePath)):
+            legacy = [item for item in loadState() if item.get("id")]
+            _ledger.apply([{"op": "add", "item": item} for item in legacy])
+            log(f"Imported {len(legacy)} downloads from {StateFilePath} into the ledger")
+        queue_list = _ledger.load_active()
     except Exception as e:
-        log(f"Error saving state: {e}")
+        log(f"Error loading download ledger: {e}")
+        queue_list = []
+    with _global_state_lock:
+        _reset_job_table(queue_list)
+
+ArchiveFilePath = os.path.splitext(StateFilePath)[0] + ".archive"
+# (video id, format, quality) -> output path of every finished download, loaded once and kept in memory.
+_archive = {}
+_archive_lock = threading.Lock()
+
+def archiveQuality(file_format):
+    if file_format == "mp3":
+        return str(getINI("MP3Quality"))
+    return "best"
+
+def _load_archive():
+    entries = {}
+    try:
+        if _ledger is not None:
+            imported = _ledger.import_archive_from_history({"mp3": archiveQuality("mp3"), "mp4": archiveQuality("mp4")})
+            if imported:
+                log(f"Seeded download archive with {imported} completed downloads")
+            for video_id, file_format, quality, output_path in _ledger.load_archive():
+                entries[(video_id, file_format, quality)] = output_path
+        elif os.path.exists(ArchiveFilePath):
+            with open(ArchiveFilePath, "r", encoding="utf-8") as f:
+                for line in f:
+                    fields = line.rstrip("\n").split("\t")
+                    if len(fields) == 4 and fields[3]:
+                        entries[tuple(fields[:3])] = fields[3]
+                    elif len(fields) == 4:
+                        # An empty path marks an entry forgotten after its file was deleted.
+                        entries.pop(tuple(fields[:3]), None)
+    except Exception as e:
+        log(f"Error loading download archive: {e}")
+    with _archive_lock:
+        _archive.clear()
+        _archive.update(entries)
+
+def isArchived(video_id, file_format, quality=None):
+    """True while the archived file is still on disk. An entry whose file was deleted is forgotten."""
+    if not video_id:
+        return False
+    key = (video_id, file_format, quality or archiveQuality(file_format))
+    with _archive_lock:
+        if key not in _archive:
+            return False
+        path = _archive[key]
+    if path and os.path.isfile(path):
+        return True
+    log(f"Archived file for {video_id} as {file_format} is gone, forgetting it.")
+    forgetArchived(*key)
+    return False
+
+def forgetArchived(video_id, file_format, quality=None):
+    key = (video_id, file_format, quality or archiveQuality(file_format))
+    with _archive_lock:
+        if _archive.pop(key, None) is None:
+            return
+        try:
+            if _ledger is not None:
+                _ledger.remove_archive(*key)
+            else:
+                with open(ArchiveFilePath, "a", encoding="utf-8") as f:
+                    f.write("\t".join(key + ("",)) + "\n")
+        except Exception as e:
+            log(f"Error writing download archive: {e}")
+
+def archivedPath(video_id, file_format, quality=None):
+    if not video_id:
+        return None
+    key = (video_id, file_format, quality or archiveQuality(file_format))
+    with _archive_lock:
+        return _archive.get(key)
+
+def _archive_download(item, output_path):
+    video_id = item.get("video_id")
+    if not video_id or item.get("trimming") or item.get("is_playlist"):
+        return
+    key = (video_id, item["format"], str(item.get("quality") or archiveQuality(item["format"])))
+    with _archive_lock:
+        _archive[key] = output_path
+        try:
+            if _ledger is not None:
+                _ledger.add_archive(*key, output_path, datetime.datetime.now().isoformat())
+            else:
+                with open(ArchiveFilePath, "a", encoding="utf-8") as f:
+                    f.write("\t".join(key + (output_path or "",)) + "\n")
+        except Exception as e:
+            log(f"Error writing download archive: {e}")
+
+def _load_job_table():
+    with _state_io_lock:
+        queue_list = loadState()
+        with _global_state_lock:
+            _reset_job_table(queue_list)
+            del _pending_records[:]
+        try:
+            _write_snapshot(queue_list)
+            _truncate_journal()
+            log(f"Compacted state file: {len(queue_list)} entries")
+        except Exception as e:
+            log(f"Error compacting state: {e}")
+
+def saveState(queue_list):
+    with _state_io_lock:
+        with _global_state_lock:
+            _reset_job_table(queue_list)
+            del _pending_records[:]
+        try:
+            if _ledger is not None:
+                _ledger.apply([{"op": "clear"}] + [{"op": "add", "item": _copy_job(item)} for item in queue_list])
+                return
+            _write_snapshot([_copy_job(item) for item in queue_list])
+            _truncate_journal()
+        except Exception as e:
+            log(f"Error saving state: {e}")
 
 def loadState():
+    queue_list = []
     try:
-        if os.path.exists(StateFilePath):
-            with open(StateFilePath, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        queue_list = _read_snapshot()
     except Exception as e:
         log(f"Error loading state: {e}")
-    return []
-
-def clearState():
     try:
-        if os.path.exists(StateFilePath):
-            with open(StateFilePath, 'w', encoding='utf-8') as f:
-                json.dump([], f)
+        _replay_journal(queue_list)
     except Exception as e:
-        log(f"Error clearing state: {e}")
+        log(f"Error replaying state journal: {e}")
+    return queue_list
+
+def clearState():
+    with _global_state_lock:
+        _reset_job_table([])
+        _record_change({"op": "clear"})
+
+def getDownload(download_id):
+    with _global_state_lock:
+        return _jobs.get(download_id)
+
+def getDownloadsByStatus(statuses):
+    with _global_state_lock:
+        ids = set()
+        for status in statuses:
+            ids.update(_jobs_by_status.get(status, ()))
+        return [_jobs[job_id] for job_id in sorted(ids, key=_job_positions.get)]
 
 def addDownloadToQueue(download_obj):
     with _global_state_lock:
-        queue = loadState()
         download_obj["id"] = str(uuid.uuid4())
         download_obj["start_time"] = datetime.datetime.now().isoformat()
         download_obj["status"] = "queued"
-        queue.append(download_obj)
-        saveState(queue)
-        log(f"Added download to queue: ID {download_obj['id']}")
-        return download_obj["id"]
+        if "video_id" not in download_obj:
+            download_obj["video_id"] = None if download_obj.get("is_playlist") else getVideoId(download_obj.get("url", ""))
+        _index_job(download_obj)
+        _record_change({"op": "add", "item": _copy_job(download_obj)})
+    log(f"Added download to queue: ID {download_obj['id']}")
+    return download_obj["id"]
 
-def updateDownloadStatusInQueue(download_id, status):
+def updateDownloadStatusInQueue(download_id, status, **fields):
+    if status in ["completed", "failed", "cancelled"]:
+        fields["end_time"] = datetime.datetime.now().isoformat()
+    record = {"op": "status", "id": download_id, "status": status, "fields": fields}
     with _global_state_lock:
-        queue = loadState()
-        updated = False
-        for item in queue:
-            if item.get("id") == download_id:
-                item["status"] = status
-                if status in ["completed", "failed", "cancelled"]:
-                    item["end_time"] = datetime.datetime.now().isoformat()
-                updated = True
-                break
-        if updated:
-            saveState(queue)
+        item = _jobs.get(download_id)
+        if item is not None:
+            _set_job_status(item, status)
+            item.update(fields)
+            _record_change(record)
     log(f"Updated download status: ID {download_id} to {status}")
 
+def _entry_of_unfinished_playlist(item):
+    parent = _jobs.get(item.get("parent_id"))
+    return parent is not None and parent["status"] not in ["completed", "failed", "cancelled"]
+
 def removeCompletedOrFailedDownloadsFromQueue():
     with _global_state_lock:
-        queue = loadState()
-        new_queue = [item for item in queue if item.get("status") not in ["completed", "failed", "cancelled"]]
-        if len(new_queue) < len(queue):
-            saveState(new_queue)
-            log(f"Removed {len(queue) - len(new_queue)} completed/failed downloads from queue")
+        finished = [job_id for status in ["completed", "failed", "cancelled"] for job_id in _jobs_by_status.get(status, ())]
+        # Finished entries stay, and are saved, until their playlist is done, so expand_playlist can skip them after a restart.
+        finished = [job_id for job_id in finished if not _entry_of_unfinished_playlist(_jobs[job_id])]
+        for job_id in finished:
+            _unindex_job(job_id)
+        if finished:
+            _record_change({"op": "purge", "ids": finished})
+    if finished:
+        with _control_lock:
+            _cancelled_jobs.difference_update(finished)
+            _paused_jobs.difference_update(finished)
+        log(f"Removed {len(finished)} completed/failed downloads from queue")
 
 def makePrintable(s):
     return "".join(c if c.isprintable() else " " for c in str(s))
 
+def getVideoId(url):
+    try:
+        parsed = urllib.parse.urlparse(url)
+    except Exception:
+        return None
+    host = parsed.netloc.lower()
+    if host.endswith("youtu.be"):
+        video_id = parsed.path.strip("/").split("/")[0]
+        return video_id or None
+    if "youtube." in host:
+        query_params = urllib.parse.parse_qs(parsed.query)
+        if query_params.get("v"):
+            return query_params["v"][0]
+        match = re.match(r"/(?:shorts|live|embed)/([\w-]+)", parsed.path)
+        if match:
+            return match.group(1)
+    return None
+
 def validFilename(s):
     s = str(s).strip().replace(" ", "_")
     s = re.sub(r'(?u)[^-\w.]', '', s)
     return s
 
+def _log_file_path():
+    folder = getINI("ResultFolder") or DownloadPath or os.path.join(AppData, "uTubeDownload")
+    return os.path.join(folder, "log.txt")
+
+_log_writer = LogWriter(_log_file_path)
+
 def log(s):
     try:
-        api.log.info(f"uTubeDownload: {makePrintable(s)}")
+        line = makePrintable(s)
+        api.log.info(f"uTubeDownload: {line}")
         if getINI("Logging"):
-            path = getINI("ResultFolder") or DownloadPath
-            os.makedirs(path, exist_ok=True)
-            with open(os.path.join(path, "log.txt"), "a", encoding="utf-8") as f:
-                f.write(f"{datetime.datetime.now()} - {makePrintable(s)}\n")
+            _log_writer.write(line)
     except Exception as e:
         api.log.error(f"uTubeDownload: Error writing log: {e}")
 
+def stop_log_writer():
+    _log_writer.stop()
+
 def createFolder(folder):
     if not os.path.isdir(folder):
         try:
@@ -263,7 +730,7 @@ def getWebSiteTitle():
     except Exception:
         return "Unknown_Title"
 
-def checkFileExists(savePath, title, extension, is_trimming=False):
+def checkFileExists(savePath, title, extension, is_trimming=False, url=None):
     if not getINI("SkipExisting"):
         return False
     
@@ -274,7 +741,13 @@ def checkFileExists(savePath, title, extension, is_trimming=False):
         # For trimming, allow download even if file exists
         return False
     
-    if os.path.exists(filename):
+    # The archive knows the video by id, so a renamed file or a changed page title does not matter.
+    if url and isArchived(getVideoId(url), extension):
+        log(f"Video {getVideoId(url)} already downloaded as {extension}.")
+        return True
+    
+    index = folderIndex(savePath)
+    if index.exists(os.path.basename(filename)):
         log(f"File '{filename}' already exists.")
         return True
     
@@ -291,11 +764,8 @@ def checkFileExists(savePath, title, extension, is_trimming=False):
         f"{sanitized_title}.aria2"
     ]
     
-    for pattern in temp_patterns:
-        full_pattern = os.path.join(savePath, pattern)
-        if glob.glob(full_pattern):
-            log(f"Found temp file matching pattern {full_pattern}, not skipping.")
-            return False
+    if index.temp_files(temp_patterns):
+        log(f"Found temp files for {sanitized_title}, not skipping.")
             
     return False
 
@@ -327,27 +797,123 @@ def _cleanup_temp_files(save_path, title, file_format, check_count=2):
         f"{sanitized_title}.aria2"
     ]
     
-    if file_format == "mp3":
-        temp_patterns.append(f"{sanitized_title}.mp4")
-    
     final_file = os.path.join(save_path, f"{sanitized_title}.{file_format}")
+    protected = _pending_postprocess_inputs()
+    index = folderIndex(save_path)
     
     for _ in range(check_count):
-        for pattern in temp_patterns:
-            for temp_file in glob.glob(os.path.join(save_path, pattern)):
-                # Skip the final output file
-                if temp_file == final_file:
-                    continue
-                # Only delete temporary files
-                if ('f' in os.path.basename(temp_file).split('.')[0] or 
-                    temp_file.endswith(('.part', '.ytdl', '.temp', '.download', '.aria2', '.part.aria2', '.mp4'))):
-                    try:
-                        os.remove(temp_file)
-                        log(f"Removed temp file: {temp_file}")
-                    except Exception as e:
-                        log(f"Error removing temp file {temp_file}: {e}")
+        for temp_file in index.temp_files(temp_patterns):
+            # Skip the final output file
+            if temp_file == final_file or os.path.normcase(temp_file) in protected:
+                continue
+            # Only delete temporary files
+            if ('f' in os.path.basename(temp_file).split('.')[0] or 
+                temp_file.endswith(('.part', '.ytdl', '.temp', '.download', '.aria2', '.part.aria2', '.mp4'))):
+                try:
+                    os.remove(temp_file)
+                    index.discard(os.path.basename(temp_file))
+                    log(f"Removed temp file: {temp_file}")
+                except Exception as e:
+                    log(f"Error removing temp file {temp_file}: {e}")
+
+MetadataCachePath = os.path.splitext(StateFilePath)[0] + "-metadata"
+_metadata_cache = None
+_info_pool = None
+
+def _start_info_pool():
+    # Metadata extraction always runs with the same arguments, so a spare yt-dlp can be started before it is needed.
+    global _info_pool
+    if _info_pool is not None or not getINI("WarmHelpers") or not os.path.exists(YouTubeEXE):
+        return
+    _info_pool = WarmProcessPool(
+        [YouTubeEXE, "-J", "--no-playlist", "--no-warnings"],
+        spares=getINI("WarmHelpers")
+    )
+    threading.Thread(target=_info_pool.refill, daemon=True).start()
+
+def _stop_info_pool():
+    global _info_pool
+    if _info_pool is not None:
+        _info_pool.close()
+        _info_pool = None
+
+def _open_metadata_cache():
+    global _metadata_cache
+    try:
+        _metadata_cache = MetadataCache(
+            MetadataCachePath,
+            ttl=getINI("MetadataCacheTTL"),
+            max_entries=getINI("MetadataCacheSize")
+        )
+        _metadata_cache.evict()
+    except Exception as e:
+        log(f"Error opening metadata cache: {e}")
+        _metadata_cache = None
+
+def getVideoInfoPath(url):
+    """Return the cached info JSON file for url, extracting it with yt-dlp first when it is missing or stale."""
+    video_id = getVideoId(url)
+    if _metadata_cache is None or not video_id:
+        return None
+    with _metadata_cache.fetch_lock(video_id):
+        path = _metadata_cache.fresh_path(video_id)
+        if path:
+            return path
+        try:
+            pool = _info_pool
+            if pool is not None:
+                return_code, stdout_str, stderr_str = pool.run(url)
+            else:
+                cmd = [YouTubeEXE, "-J", "--no-playlist", "--no-warnings", url]
+                result = subprocess.run(
+                    cmd,
+                    capture_output=True,
+                    text=True,
+                    encoding='utf-8',
+                    creationflags=subprocess.CREATE_NO_WINDOW
+                )
+                return_code, stdout_str, stderr_str = result.returncode, result.stdout, result.stderr
+            if return_code != 0 or not stdout_str.strip():
+                log(f"Metadata extraction failed for {url}: {stderr_str}")
+                return None
+            return _metadata_cache.put(video_id, stdout_str)
+        except Exception as e:
+            log(f"Error extracting metadata: {e}")
+            return None
+
+def getVideoInfo(url):
+    path = getVideoInfoPath(url)
+    if path is None:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        log(f"Error reading cached metadata {path}: {e}")
+        return None
+
+def _with_cached_info(item):
+    # Hand yt-dlp the cached info JSON instead of the URL so it skips extraction.
+    cmd = item["cmd"]
+    url = item.get("url")
+    if _metadata_cache is None or not cmd or cmd[0] != YouTubeEXE or item.get("is_playlist"):
+        return cmd
+    if url not in cmd or "--load-info-json" in cmd:
+        return cmd
+    path = _metadata_cache.fresh_path(item.get("video_id"))
+    if not path:
+        return cmd
+    cmd = list(cmd)
+    index = cmd.index(url)
+    cmd[index:index + 1] = ["--load-info-json", path]
+    # Rewriting the file would make old format URLs look freshly extracted.
+    cmd.append("--no-write-info-json")
+    return cmd
 
 def get_video_duration(url):
+    info = getVideoInfo(url)
+    if info and info.get("duration"):
+        return int(info["duration"])
     try:
         cmd = [YouTubeEXE, "--get-duration", "--no-playlist", url]
         result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
@@ -383,54 +949,68 @@ def get_file_duration(file_path):
         log(f"Error getting file duration: {e}")
     return None
 
+def _pending_postprocess_inputs():
+    # Streams that finished downloading and are waiting for ffmpeg must survive cleanup and repair.
+    return {
+        os.path.normcase(path)
+        for item in getDownloadsByStatus(["postprocessing"])
+        for path in item.get("inputs", [])
+    }
+
 def repairIncompleteFiles(path):
     repaired_count = 0
-    patterns = [
-        "*.part", "*.ytdl", "*.temp", "*.download", "*.f*.tmp",
-        "*.f*.webm", "*.f*.m4a", "*.f*.mp4", "*.part.aria2", "*.aria2"
-    ]
-    
-    for pattern in patterns:
-        full_pattern = os.path.join(path, pattern)
-        for temp_file in glob.glob(full_pattern):
-            try:
-                base_name, _ = os.path.splitext(temp_file)
-                if base_name.endswith('.part') or base_name.endswith('.aria2'):
-                    base_name, _ = os.path.splitext(base_name)
-                
-                original_file = os.path.splitext(base_name)[0]
+    protected = _pending_postprocess_inputs()
+    index = folderIndex(path)
+    temp_files = index.temp_files()
+    temp_names = {os.path.normcase(os.path.basename(f)) for f in temp_files}
+
+    def final_exists(name):
+        # A stream aria2 is still filling in has a final-looking name of its own.
+        return index.exists(name) and os.path.normcase(name) not in temp_names
+
+    for temp_file in temp_files:
+        # A file may already be gone with the partial it belonged to.
+        if os.path.normcase(temp_file) in protected or not os.path.exists(temp_file):
+            continue
+        try:
+            base_name, _ = os.path.splitext(os.path.basename(temp_file))
+            if base_name.endswith('.part') or base_name.endswith('.aria2'):
+                base_name, _ = os.path.splitext(base_name)
+            
+            original_file = os.path.splitext(base_name)[0]
+            
+            if final_exists(original_file + '.mp4') or final_exists(original_file + '.mp3'):
+                log(f"Skipping repair for {temp_file}: corresponding file already exists.")
+                continue
+            
+            matches = re.findall(r"^(.*?)(?:-\w+)?(?:\.\w+)?$", original_file)
+            if matches:
+                potential_final_base = matches[0]
                 
-                if os.path.exists(original_file + '.mp4') or os.path.exists(original_file + '.mp3'):
-                    log(f"Skipping repair for {temp_file}: corresponding file already exists.")
+                if final_exists(f"{potential_final_base}.mp4") or final_exists(f"{potential_final_base}.mp3"):
+                    log(f"Skipping repair for {temp_file}: corresponding final file exists.")
                     continue
-                
-                matches = re.findall(r"^(.*?)(?:-\w+)?(?:\.\w+)?$", original_file)
-                if matches:
-                    potential_final_base = matches[0]
-                    target_mp4 = os.path.join(path, f"{potential_final_base}.mp4")
-                    target_mp3 = os.path.join(path, f"{potential_final_base}.mp3")
-                    
-                    if os.path.exists(target_mp4) or os.path.exists(target_mp3):
-                        log(f"Skipping repair for {temp_file}: corresponding final file exists.")
-                        continue
-                
-                if os.path.getsize(temp_file) > 0:
-                    os.remove(temp_file)
+            
+            # Partials that check out are left for --continue; only data proven broken goes.
+            doomed, reason = unusablePartials(temp_file)
+            if not doomed:
+                log(f"Keeping partial file {temp_file}: {reason}")
+                continue
+            for doomed_file in doomed:
+                if os.path.normcase(doomed_file) not in protected and os.path.exists(doomed_file):
+                    os.remove(doomed_file)
+                    _forget_file(doomed_file)
                     repaired_count += 1
-                    log(f"Cleaned up incomplete file: {temp_file}")
-            except Exception as e:
-                log(f"Error repairing file {temp_file}: {str(e)}")
+                    log(f"Cleaned up incomplete file {doomed_file}: {reason}")
+        except Exception as e:
+            log(f"Error repairing file {temp_file}: {str(e)}")
 
     return repaired_count
 
 def resumeInterruptedDownloads():
     if not getINI("ResumeOnRestart"):
         return
-    if not os.path.exists(StateFilePath):
-        saveState([])
-    with _global_state_lock:
-        queue = loadState()
-    downloads_to_resume = [item for item in queue if item.get("status") in ["running", "queued"]]
+    downloads_to_resume = getDownloadsByStatus(["running", "queued", "postprocessing", "retrying"])
     if not downloads_to_resume:
         return
     path = getINI("ResultFolder") or DownloadPath
@@ -439,47 +1019,946 @@ def resumeInterruptedDownloads():
         log(f"Auto-repaired {repaired} files before resuming downloads")
 
     ui.message(_("Checking interrupted downloads..."))
+    with _control_lock:
+        _paused_jobs.update(item["id"] for item in downloads_to_resume if item.get("paused"))
     for item in downloads_to_resume:
+        if item.get("status") in ("postprocessing", "retrying") or "expanded" in item:
+            continue
         if YouTubeEXE in item["cmd"][0] and "--continue" not in item["cmd"]:
             item["cmd"].insert(1, "--continue")
         updateDownloadStatusInQueue(item.get("id"), "queued")
-        if item.get("format") == "mp3":
-            _cleanup_temp_files(item.get("path", ""), item.get("title", ""), item.get("format", ""))
     if not promptResumeDownloads(downloads_to_resume):
         for item in downloads_to_resume:
             updateDownloadStatusInQueue(item.get("id"), "cancelled")
         clearState()
         return
+    playlists = []
     for item in downloads_to_resume:
-        updateDownloadStatusInQueue(item.get("id"), "queued")
-        if item.get("format") == "mp3":
-            _cleanup_temp_files(item.get("path", ""), item.get("title", ""), item.get("format", ""))
+        if "expanded" in item:
+            playlists.append(item)
+            continue
+        inputs = item.get("inputs") or []
+        if item.get("status") == "postprocessing" and inputs and all(os.path.exists(p) for p in inputs):
+            _postprocess_queue.put(item)
+            continue
+        if item.get("status") == "retrying":
+            # The backoff carries on from where it was when NVDA stopped.
+            _schedule_retry(item["id"], max(0, item.get("retry_at", 0) - time.time()))
+            continue
+        if item.get("local_source"):
+            # The MP4 it was to be extracted from is gone, so download the audio after all.
+            updateDownloadStatusInQueue(item.get("id"), "queued", local_source=None, inputs=[])
+        else:
+            updateDownloadStatusInQueue(item.get("id"), "queued")
         _download_queue.put(item)
+    # Entries resume as ordinary jobs above; a playlist only needs listing again if that was cut short.
+    for item in playlists:
+        if not item["expanded"]:
+            updateDownloadStatusInQueue(item.get("id"), "running")
+            _start_playlist_expansion(item.get("id"))
+        else:
+            updateDownloadStatusInQueue(item.get("id"), "running")
+            _finish_playlist_if_done(item.get("id"))
+
+def _max_concurrent_downloads():
+    try:
+        return max(1, int(getINI("MaxConcurrentDownloads")))
+    except Exception:
+        return 1
 
 def start_worker_threads():
+    global _slot_limit, _controller_thread, _controller_active
+    ceiling = _max_concurrent_downloads()
+    with _slot_condition:
+        _slot_limit = ceiling
+    _resize_worker_pool(ceiling)
+    _start_express_worker()
+    _start_info_pool()
+    _start_postprocess_workers()
+    if not _controller_active:
+        _controller_active = True
+        _controller_thread = threading.Thread(target=_concurrency_loop, daemon=True)
+        _controller_thread.start()
+
+def _resize_worker_pool(count):
     global _num_workers
-    _num_workers = getINI("MaxConcurrentDownloads")
-    for _ in range(_num_workers):
-        t = threading.Thread(target=worker_loop, daemon=True)
-        t.start()
+    with _slot_condition:
+        if count > _num_workers:
+            for _ in range(count - _num_workers):
+                threading.Thread(target=worker_loop, daemon=True).start()
+        else:
+            # Surplus workers exit when they pick up a sentinel; the slot limit already holds them back.
+            for _ in range(_num_workers - count):
+                _download_queue.put(None)
+        if count != _num_workers:
+            log(f"Download worker pool resized from {_num_workers} to {count}")
+        _num_workers = count
 
 def shutdown_workers():
-    for _ in range(_num_workers):
-        _download_queue.put(None)
+    global _controller_active, _num_workers, _postprocess_workers
+    _controller_active = False
+    with _slot_condition:
+        for _ in range(_num_workers):
+            _download_queue.put(None)
+        _num_workers = 0
+    for _ in range(_postprocess_workers):
+        _postprocess_queue.put(None)
+    _postprocess_workers = 0
+    _download_queue.close()
+    _stop_info_pool()
+    _stop_aria2()
+
+def _start_express_worker():
+    # One extra lane that only takes single and trim jobs, so they start even while every slot runs a playlist.
+    global _express_worker
+    if _express_worker and _express_worker.is_alive():
+        return
+    _download_queue.open()
+    _express_worker = threading.Thread(target=express_worker_loop, daemon=True)
+    _express_worker.start()
+
+def _start_postprocess_workers():
+    # ffmpeg work is CPU bound, so this pool is sized from the CPU rather than MaxConcurrentDownloads.
+    global _postprocess_workers
+    if _postprocess_workers:
+        return
+    try:
+        cores = psutil.cpu_count(logical=False) or os.cpu_count() or 2
+    except Exception:
+        cores = os.cpu_count() or 2
+    _postprocess_workers = max(1, cores // 2)
+    for _ in range(_postprocess_workers):
+        threading.Thread(target=postprocess_loop, daemon=True).start()
+
+def postprocess_loop():
+    while True:
+        item = _postprocess_queue.get()
+        if item is None:
+            _postprocess_queue.task_done()
+            break
+        if _claim_job(item, _postprocess_queue):
+            run_postprocess(item)
+        _postprocess_queue.task_done()
+
+def _acquire_slot():
+    global _slots_in_use
+    with _slot_condition:
+        while _slots_in_use >= _slot_limit:
+            _slot_condition.wait()
+        _slots_in_use += 1
+
+def _release_slot():
+    global _slots_in_use
+    with _slot_condition:
+        _slots_in_use -= 1
+        _slot_condition.notify_all()
 
 def worker_loop():
     while True:
+        # The slot comes first, so a job leaves the queue only once it can start; while every slot is
+        # busy, interactive and trim jobs stay queued for the express worker.
+        _acquire_slot()
         item = _download_queue.get()
+        if item is None:
+            _release_slot()
+            _download_queue.task_done()
+            break
+        with _slot_condition:
+            over_limit = _slots_in_use > _slot_limit
+        if over_limit:
+            # The controller took slots away while this worker waited for a job.
+            _download_queue.put(item, first=True)
+            _download_queue.task_done()
+            _release_slot()
+            continue
+        try:
+            if _claim_job(item, _download_queue):
+                run_download(item)
+        finally:
+            _release_slot()
+        _download_queue.task_done()
+
+def express_worker_loop():
+    while True:
+        item = _download_queue.get(bulk=False)
         if item is None:
             break
-        run_download(item)
+        if _claim_job(item, _download_queue):
+            run_download(item)
         _download_queue.task_done()
 
+def _disk_io_time():
+    try:
+        counters = psutil.disk_io_counters()
+        return counters.read_time + counters.write_time
+    except Exception:
+        return None
+
+def _aggregate_throughput():
+    with _running_jobs_lock:
+        return sum(watch["throughput"] or 0 for watch in _running_jobs.values())
+
+def _concurrency_loop():
+    # Hill-climbs the number of active download slots between 1 and MaxConcurrentDownloads:
+    # back off under CPU or disk pressure, add a slot while the queue is backed up and keep it
+    # only if aggregate throughput improved.
+    global _slot_limit
+    last_disk = _disk_io_time()
+    last_tick = time.time()
+    grow_baseline = None
+    cooldown = 0
+    try:
+        psutil.cpu_percent(interval=None)
+    except Exception:
+        pass
+    while _controller_active:
+        time.sleep(_controller_interval)
+        if not _controller_active:
+            break
+        try:
+            ceiling = _max_concurrent_downloads()
+            if ceiling != _num_workers:
+                # The user changed the setting: start from the new maximum and adapt from there.
+                _resize_worker_pool(ceiling)
+                with _slot_condition:
+                    _slot_limit = ceiling
+                    _slot_condition.notify_all()
+                grow_baseline = None
+                cooldown = 0
+            now = time.time()
+            disk = _disk_io_time()
+            # Milliseconds spent on I/O per millisecond of wall time approximates the average disk queue depth.
+            disk_depth = 0
+            if disk is not None and last_disk is not None and now > last_tick:
+                disk_depth = (disk - last_disk) / ((now - last_tick) * 1000)
+            last_disk, last_tick = disk, now
+            cpu = psutil.cpu_percent(interval=None)
+            throughput = _aggregate_throughput()
+            with _slot_condition:
+                limit = min(_slot_limit, ceiling)
+                backed_up = _slots_in_use >= limit and _download_queue.qsize() > 0
+                if cpu > 90 or disk_depth > 2:
+                    if limit > 1:
+                        limit -= 1
+                        log(f"Reducing download slots to {limit} (CPU {cpu:.0f}%, disk queue {disk_depth:.1f})")
+                    grow_baseline = None
+                    cooldown = 3
+                elif grow_baseline is not None:
+                    if throughput < grow_baseline * 1.1:
+                        limit = max(1, limit - 1)
+                        cooldown = 6
+                    grow_baseline = None
+                elif cooldown > 0:
+                    cooldown -= 1
+                elif backed_up and limit < ceiling and cpu < 75:
+                    grow_baseline = throughput
+                    limit += 1
+                    log(f"Increasing download slots to {limit}")
+                _slot_limit = limit
+                _slot_condition.notify_all()
+        except Exception as e:
+            log(f"Error in concurrency controller: {e}")
+
 def _process_next_download():
     # Placeholder for processing the next download in the queue
     # This will be called by uTubeTrim to ensure queue processing
     pass
 
+_output_path_patterns = [
+    re.compile(r'^\[Merger\] Merging formats into "(.+)"\s*$', re.MULTILINE),
+    re.compile(r'^\[ExtractAudio\] Destination: (.+?)\s*$', re.MULTILINE),
+    re.compile(r'^\[VideoRemuxer\] .*Destination: (.+?)\s*$', re.MULTILINE),
+    re.compile(r'^\[download\] Destination: (.+?)\s*$', re.MULTILINE),
+    re.compile(r'^\[download\] (.+) has already been downloaded\s*$', re.MULTILINE),
+]
+
+def _find_output_path(cmd, stdout_str, save_path):
+    if cmd and cmd[0] == ConverterEXE:
+        return cmd[-1]
+    # The final file is named by whichever stage wrote last.
+    last_match = None
+    for pattern in _output_path_patterns:
+        for match in pattern.finditer(stdout_str):
+            if last_match is None or match.start() > last_match.start():
+                last_match = match
+    if last_match is None:
+        return None
+    return os.path.join(save_path, last_match.group(1))
+
+MetricsFilePath = os.path.splitext(StateFilePath)[0] + "-metrics.json"
+_metrics_store = None
+_job_metrics = {}
+_session_started = time.time()
+
+def _open_metrics_store():
+    global _metrics_store
+    try:
+        _metrics_store = MetricsStore(MetricsFilePath)
+    except Exception as e:
+        log(f"Error opening metrics store: {e}")
+        _metrics_store = None
+
+def _job_kind(item):
+    if item.get("trimming"):
+        return "trim"
+    if item.get("parent_id"):
+        return "playlist entry"
+    if item.get("local_source"):
+        return "local"
+    if (item.get("postprocess") or {}).get("kind") == "bundle":
+        return "bundle"
+    if item.get("cmd") and item["cmd"][0] == ConverterEXE:
+        return "direct"
+    return "youtube"
+
+def _metrics_for(item):
+    metrics = _job_metrics.get(item["id"])
+    if metrics is None:
+        try:
+            queued_at = datetime.datetime.fromisoformat(item["start_time"]).timestamp()
+        except Exception:
+            queued_at = time.time()
+        # A job resumed after a restart did not wait in the queue while NVDA was closed.
+        queued_at = max(queued_at, _session_started)
+        metrics = _job_metrics[item["id"]] = JobMetrics(item["id"], item.get("format"), _job_kind(item), queued_at)
+    return metrics
+
+def _finish_metrics(download_id, ok):
+    metrics = _job_metrics.pop(download_id, None)
+    if metrics is None or _metrics_store is None:
+        return
+    try:
+        _metrics_store.record(metrics.finish(ok))
+    except Exception as e:
+        log(f"Error recording metrics for ID {download_id}: {e}")
+
+def getMetricsSummary(last=20):
+    summary = _metrics_store.summary(last) if _metrics_store is not None else None
+    if not summary:
+        return _("No download metrics yet")
+    parts = [_("last {count} jobs").format(count=summary["jobs"])]
+    if summary["failed"]:
+        parts.append(_("{count} failed").format(count=summary["failed"]))
+    if summary["median_speed"]:
+        parts.append(_("median {speed:.1f} MB/s").format(speed=summary["median_speed"] / (1024 * 1024)))
+    if summary["peak_speed"]:
+        parts.append(_("peak {speed:.1f} MB/s").format(speed=summary["peak_speed"] / (1024 * 1024)))
+    labels = {
+        "queue_wait": _("queue"),
+        "extract": _("extraction"),
+        "transfer": _("transfer"),
+        "postprocess_wait": _("waiting for encode"),
+        "encode": _("encode"),
+    }
+    shares = [
+        f"{labels[phase]} {round(share * 100)}%"
+        for phase, share in summary["shares"].items() if share >= 0.005
+    ]
+    if shares:
+        parts.append(_("{shares} of wall time").format(shares=", ".join(shares)))
+    parts.append(_("{seconds:.0f} seconds of tool CPU time").format(seconds=summary["cpu"]))
+    return "; ".join(parts)
+
+def addProgressListener(listener):
+    """listener(download_id, event) is called from the reader thread for every progress event."""
+    if listener not in _progress_listeners:
+        _progress_listeners.append(listener)
+
+def removeProgressListener(listener):
+    if listener in _progress_listeners:
+        _progress_listeners.remove(listener)
+
+def getDownloadProgress(download_id):
+    return _job_progress.get(download_id)
+
+def _on_progress(download_id, event):
+    _job_progress[download_id] = event
+    _note_activity(download_id, event)
+    metrics = _job_metrics.get(download_id)
+    if metrics is not None:
+        metrics.on_progress(event)
+    _notify_progress(download_id, event)
+    item = _jobs.get(download_id)
+    if item and item.get("parent_id"):
+        _update_playlist_progress(item["parent_id"])
+
+def _notify_progress(download_id, event):
+    for listener in list(_progress_listeners):
+        try:
+            listener(download_id, event)
+        except Exception as e:
+            log(f"Error in progress listener: {e}")
+
+def _terminate_process_tree(process):
+    try:
+        parent = psutil.Process(process.pid)
+        procs = parent.children(recursive=True) + [parent]
+    except psutil.NoSuchProcess:
+        return
+    except Exception:
+        procs = []
+    for proc in procs:
+        try:
+            # A job paused by the bandwidth governor has to run again to act on the signal.
+            proc.resume()
+        except Exception:
+            pass
+        try:
+            proc.terminate()
+        except psutil.NoSuchProcess:
+            pass
+        except Exception as e:
+            log(f"Error terminating process {proc.pid}: {e}")
+    try:
+        _gone, alive = psutil.wait_procs(procs, timeout=5)
+        for proc in alive:
+            proc.kill()
+    except Exception:
+        pass
+    if not procs:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def _sample_tree_cpu(watch):
+    # Caller holds _running_jobs_lock. A process that has exited keeps its last reading, so the total never drops.
+    try:
+        parent = psutil.Process(watch["process"].pid)
+        procs = [parent] + parent.children(recursive=True)
+    except Exception:
+        return None
+    for proc in procs:
+        try:
+            times = proc.cpu_times()
+            watch["cpu_by_pid"][proc.pid] = times.user + times.system
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return sum(watch["cpu_by_pid"].values())
+
+def _wait_for_exit(download_id, process):
+    """Wait for a job's process; returns (return code, CPU seconds of the process and the children it waited for, or None)."""
+    if hasattr(os, "wait4"):
+        # The rusage of a reaped process covers every child it waited for, however short-lived.
+        try:
+            _pid, status, usage = os.wait4(process.pid, 0)
+        except ChildProcessError:
+            # psutil reaped it while the tree was being stopped.
+            return process.wait(), None
+        process.returncode = os.waitstatus_to_exitcode(status)
+        return process.returncode, usage.ru_utime + usage.ru_stime
+    # An exited process can no longer be asked, so the tree is sampled while it runs: often at first, so
+    # short tool runs are counted, then no more than once a second.
+    delay = 0.02
+    while True:
+        try:
+            return process.wait(timeout=delay), None
+        except subprocess.TimeoutExpired:
+            pass
+        with _running_jobs_lock:
+            watch = _running_jobs.get(download_id)
+            if watch is not None and not watch["suspended"]:
+                _sample_tree_cpu(watch)
+        delay = min(delay * 2, 1.0)
+
+def _watch_job(download_id, process, network=False):
+    now = time.time()
+    with _running_jobs_lock:
+        _running_jobs[download_id] = {
+            "process": process,
+            "started": now,
+            "last_advance": now,
+            "last_bytes": 0,
+            "last_fragment": 0,
+            "last_cpu": None,
+            "cpu_by_pid": {},
+            "throughput": None,
+            "samples": deque(maxlen=30),
+            "stalled": False,
+            "network": network,
+            "suspended": False,
+            "paused": False,
+        }
+    _start_watchdog()
+    if network:
+        _start_bandwidth_governor()
+
+def _unwatch_job(download_id):
+    with _running_jobs_lock:
+        return _running_jobs.pop(download_id, None)
+
+def _note_activity(download_id, event=None):
+    with _running_jobs_lock:
+        watch = _running_jobs.get(download_id)
+        if watch is None:
+            return
+        now = time.time()
+        if event is None:
+            # A non-progress output line (merger, extractor, post-processor) still shows the job is alive.
+            watch["last_advance"] = now
+            return
+        downloaded = event.get("downloaded_bytes")
+        fragment = event.get("fragment_index")
+        if watch["network"] and downloaded is not None:
+            # yt-dlp restarts the count for each format, so a drop means a new stream began.
+            moved = downloaded - watch["last_bytes"] if downloaded >= watch["last_bytes"] else downloaded
+            _bandwidth_bucket.consume(moved)
+        if (downloaded is not None and downloaded != watch["last_bytes"]) or (fragment is not None and fragment > watch["last_fragment"]):
+            watch["last_advance"] = now
+            # yt-dlp restarts the byte count for each format, so any change counts as progress.
+            watch["last_bytes"] = downloaded if downloaded is not None else watch["last_bytes"]
+            watch["last_fragment"] = fragment if fragment is not None else watch["last_fragment"]
+        speed = event.get("speed")
+        if speed is not None:
+            watch["samples"].append((now, speed))
+            watch["throughput"] = speed if watch["throughput"] is None else 0.8 * watch["throughput"] + 0.2 * speed
+
+def getDownloadThroughput(download_id):
+    """Return (smoothed bytes per second, trend) for a running job; trend is the change between the older and newer half of recent samples."""
+    with _running_jobs_lock:
+        watch = _running_jobs.get(download_id)
+        if watch is None or not watch["samples"]:
+            return None, None
+        speeds = [speed for _t, speed in watch["samples"]]
+        half = len(speeds) // 2
+        trend = None
+        if half:
+            trend = sum(speeds[half:]) / len(speeds[half:]) - sum(speeds[:half]) / half
+        return watch["throughput"], trend
+
+def _watchdog_loop():
+    global _watchdog_active
+    while _watchdog_active:
+        time.sleep(_watchdog_interval)
+        stall_window = getINI("StallTimeout")
+        now = time.time()
+        stalled = []
+        with _running_jobs_lock:
+            if not _running_jobs:
+                _watchdog_active = False
+                break
+            for download_id, watch in _running_jobs.items():
+                if watch["stalled"] or watch["suspended"] or watch["paused"]:
+                    continue
+                # No bytes moved, but ffmpeg merging or encoding still burns CPU; that is not a stall.
+                cpu = _sample_tree_cpu(watch)
+                if cpu is not None and watch["last_cpu"] is not None and cpu - watch["last_cpu"] > _watchdog_cpu_threshold:
+                    watch["last_advance"] = now
+                if cpu is not None:
+                    watch["last_cpu"] = cpu
+                if stall_window > 0 and now - watch["last_advance"] >= stall_window:
+                    watch["stalled"] = True
+                    stalled.append((download_id, watch["process"]))
+        for download_id, process in stalled:
+            log(f"Download for ID {download_id} made no progress for {stall_window} seconds, stopping it.")
+            _terminate_process_tree(process)
+
+def _start_watchdog():
+    global _watchdog_thread, _watchdog_active
+    with _running_jobs_lock:
+        if _watchdog_active and _watchdog_thread and _watchdog_thread.is_alive():
+            return
+        _watchdog_active = True
+        _watchdog_thread = threading.Thread(target=_watchdog_loop, daemon=True)
+        _watchdog_thread.start()
+
+def _bandwidth_limit():
+    """Bytes per second all downloads may use together right now, or 0 for no limit."""
+    global _bandwidth_bad_schedule
+    schedule = getINI("BandwidthSchedule")
+    try:
+        windows = parseSchedule(schedule)
+    except ValueError as e:
+        if _bandwidth_bad_schedule != schedule:
+            _bandwidth_bad_schedule = schedule
+            log(f"Ignoring bandwidth schedule, invalid entry: {e}")
+        windows = []
+    return max(0, scheduledLimit(getINI("BandwidthLimit"), windows)) * 1024
+
+def _with_rate_limit(cmd):
+    # The rate of a running yt-dlp cannot be changed, so a fixed share would stay small after the other jobs
+    # finish. Each job may use the whole limit and the governor shares it out by pausing those that run ahead.
+    # yt-dlp hands --limit-rate on to aria2c as its overall limit, so this covers multi-part downloads too.
+    limit = _bandwidth_limit()
+    if not limit or not cmd or cmd[0] != YouTubeEXE or "--limit-rate" in cmd:
+        return cmd
+    return cmd[:1] + ["--limit-rate", str(limit)] + cmd[1:]
+
+def _network_jobs():
+    # Downloads on the shared aria2c have no process of their own to watch, so they are counted apart.
+    with _running_jobs_lock:
+        running = sum(1 for watch in _running_jobs.values() if watch["network"] and not watch["paused"])
+    with _aria2_lock:
+        return running + _aria2_jobs
+
+def _set_tree_suspended(process, suspend):
+    # yt-dlp.exe unpacks into a child process and hands work to aria2c or ffmpeg, so the whole tree is paused.
+    try:
+        parent = psutil.Process(process.pid)
+        procs = [parent] + parent.children(recursive=True)
+    except Exception:
+        return False
+    for proc in procs:
+        try:
+            if suspend:
+                proc.suspend()
+            else:
+                proc.resume()
+        except psutil.NoSuchProcess:
+            pass
+        except Exception as e:
+            log(f"Error {'suspending' if suspend else 'resuming'} process {proc.pid}: {e}")
+    return True
+
+def _resume_throttled(watch):
+    if watch["suspended"]:
+        _set_tree_suspended(watch["process"], False)
+        watch["suspended"] = False
+        # Time spent held back is not a stall.
+        watch["last_advance"] = time.time()
+
+def _bandwidth_loop():
+    # Downloads charge the bucket as they report bytes. While it is overdrawn, the fastest job and any
+    # others above their share are paused until the debt is paid back.
+    global _bandwidth_active
+    while True:
+        time.sleep(_bandwidth_interval)
+        limit = _bandwidth_limit()
+        _bandwidth_bucket.set_rate(limit)
+        level = _bandwidth_bucket.level()
+        with _aria2_lock:
+            shared = _aria2_jobs
+        with _running_jobs_lock:
+            if not any(watch["network"] for watch in _running_jobs.values()):
+                _bandwidth_active = False
+                break
+            # A job the user paused is left alone and its share goes to the others.
+            jobs = {download_id: watch for download_id, watch in _running_jobs.items() if watch["network"] and not watch["paused"]}
+            if not jobs:
+                continue
+            if not limit or level >= 0:
+                for watch in jobs.values():
+                    _resume_throttled(watch)
+                continue
+            running = sorted(
+                ((watch["throughput"] or 0, download_id) for download_id, watch in jobs.items() if not watch["suspended"]),
+                reverse=True
+            )
+            share = limit / (len(jobs) + shared)
+            total = sum(speed for speed, _id in running)
+            paused = 0
+            for speed, download_id in running:
+                if paused and (total <= limit or speed <= share):
+                    break
+                if _set_tree_suspended(jobs[download_id]["process"], True):
+                    jobs[download_id]["suspended"] = True
+                    paused += 1
+                total -= speed
+
+def _start_bandwidth_governor():
+    global _bandwidth_thread, _bandwidth_active
+    with _running_jobs_lock:
+        if _bandwidth_active and _bandwidth_thread and _bandwidth_thread.is_alive():
+            return
+        _bandwidth_active = True
+        _bandwidth_thread = threading.Thread(target=_bandwidth_loop, daemon=True)
+        _bandwidth_thread.start()
+
+def _is_cancelled(download_id):
+    # A purged job has left _cancelled_jobs, but a thread still winding it down must not carry on with it.
+    return download_id in _cancelled_jobs or getDownload(download_id) is None
+
+def _claim_job(item, queue):
+    """Whether a worker should run item now. A paused job is held until resumeDownload puts it back."""
+    download_id = item["id"]
+    with _control_lock:
+        cancelled = download_id in _cancelled_jobs
+        if not cancelled and download_id in _paused_jobs:
+            _held_jobs[download_id] = (queue, item)
+            log(f"Holding paused job {download_id}")
+            return False
+    if cancelled:
+        _report_cancelled(download_id)
+        removeCompletedOrFailedDownloadsFromQueue()
+        return False
+    return True
+
+def _apply_job_control(download_id):
+    # A job cancelled or paused between two of its processes is dealt with as soon as the next one starts.
+    process = None
+    with _running_jobs_lock:
+        watch = _running_jobs.get(download_id)
+        if watch is None:
+            return
+        if _is_cancelled(download_id):
+            process = watch["process"]
+        elif download_id in _paused_jobs and not watch["paused"]:
+            watch["paused"] = _set_tree_suspended(watch["process"], True)
+    if process is not None:
+        _terminate_process_tree(process)
+
+def _remove_streams(item, paths, keep=None):
+    # The MP4 an MP3 job reads its audio from belongs to the user, not to the job.
+    for path in paths:
+        if path in (item.get("local_source"), keep):
+            continue
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+                _forget_file(path)
+        except Exception as e:
+            log(f"Error removing downloaded stream {path}: {e}")
+
+def _report_cancelled(download_id):
+    with _control_lock:
+        item = getDownload(download_id)
+        if item is None or item["status"] == "cancelled":
+            return
+        status = item["status"]
+        updateDownloadStatusInQueue(download_id, "cancelled", paused=False)
+    log(f"Download for ID {download_id} cancelled.")
+    if status == "postprocessing":
+        # These streams will never be converted now.
+        _remove_streams(item, item.get("inputs", []))
+    # A cancelled job is not a failure, so it stays out of the performance figures.
+    _job_metrics.pop(download_id, None)
+    _job_progress.pop(download_id, None)
+    parent_id = item.get("parent_id")
+    if parent_id:
+        _update_playlist_progress(parent_id)
+        _finish_playlist_if_done(parent_id)
+
+def pauseDownload(download_id):
+    """Pause a waiting or running job, or every entry of a playlist. Returns False when there is nothing to pause."""
+    item = getDownload(download_id)
+    if item is None or item["status"] not in ("queued", "running", "postprocessing", "retrying") or item.get("paused"):
+        return False
+    if item.get("is_playlist"):
+        for child in _playlist_children(download_id):
+            pauseDownload(child["id"])
+    with _control_lock:
+        _paused_jobs.add(download_id)
+    with _running_jobs_lock:
+        watch = _running_jobs.get(download_id)
+        if watch is not None and not watch["paused"]:
+            # Suspended processes stop transferring, so the bandwidth governor hands their share to the others.
+            watch["paused"] = _set_tree_suspended(watch["process"], True)
+    updateDownloadStatusInQueue(download_id, item["status"], paused=True)
+    return True
+
+def resumeDownload(download_id):
+    item = getDownload(download_id)
+    if item is None or not item.get("paused"):
+        return False
+    if item.get("is_playlist"):
+        for child in _playlist_children(download_id):
+            resumeDownload(child["id"])
+    with _control_lock:
+        _paused_jobs.discard(download_id)
+        held = _held_jobs.pop(download_id, None)
+    with _running_jobs_lock:
+        watch = _running_jobs.get(download_id)
+        if watch is not None and watch["paused"]:
+            _set_tree_suspended(watch["process"], False)
+            watch["paused"] = False
+            watch["suspended"] = False
+            # Time spent paused is not a stall.
+            watch["last_advance"] = time.time()
+    updateDownloadStatusInQueue(download_id, item["status"], paused=False)
+    if held is not None:
+        queue, held_item = held
+        queue.put(held_item)
+    return True
+
+def cancelDownload(download_id):
+    """Stop a job for good: a waiting job leaves the queue, a running one has its processes terminated."""
+    item = getDownload(download_id)
+    if item is None or item["status"] not in ("queued", "running", "postprocessing", "retrying"):
+        return False
+    with _control_lock:
+        _cancelled_jobs.add(download_id)
+        _paused_jobs.discard(download_id)
+        held = _held_jobs.pop(download_id, None)
+        timer = _retry_timers.pop(download_id, None)
+    if timer is not None:
+        timer.cancel()
+    if item.get("is_playlist"):
+        # Marked first, so cancelling the entries does not report the playlist as finished.
+        _report_cancelled(download_id)
+        for child in _playlist_children(download_id):
+            cancelDownload(child["id"])
+    waiting = held is not None or timer is not None or _download_queue.remove(lambda queued: queued.get("id") == download_id) is not None
+    with _running_jobs_lock:
+        watch = _running_jobs.get(download_id)
+    if watch is not None:
+        # The job's own thread sees the cancellation when its process ends and reports it.
+        _terminate_process_tree(watch["process"])
+    elif waiting:
+        _report_cancelled(download_id)
+    removeCompletedOrFailedDownloadsFromQueue()
+    return True
+
+def moveDownload(download_id, first=True):
+    """Move a waiting job to the front of the queue as an interactive job, or to the back as a bulk job."""
+    item = _download_queue.remove(lambda queued: queued.get("id") == download_id)
+    if item is None:
+        return False
+    item["priority"] = "interactive" if first else "bulk"
+    updateDownloadStatusInQueue(download_id, item["status"], priority=item["priority"])
+    _download_queue.put(item, first=first)
+    return True
+
+def togglePauseAll():
+    """Pause every unfinished job, or resume them all when everything is already paused. Returns (paused, count)."""
+    jobs = getDownloadsByStatus(["queued", "running", "postprocessing", "retrying"])
+    # Playlist entries follow their playlist.
+    targets = [item for item in jobs if not item.get("parent_id") and not item.get("paused")]
+    if targets:
+        return True, sum(1 for item in targets if pauseDownload(item["id"]))
+    return False, sum(1 for item in jobs if resumeDownload(item["id"]))
+
+def listJobs():
+    """Unfinished jobs as the queue dialog lists them: working ones first, then waiting ones in the order they will start."""
+    working = getDownloadsByStatus(["running", "postprocessing"])
+    waiting = _download_queue.snapshot()
+    seen = {item["id"] for item in working + waiting}
+    return working + waiting + [item for item in getDownloadsByStatus(["queued", "retrying"]) if item["id"] not in seen]
+
+def _job_started():
+    global _global_active_downloads
+    with _global_active_lock:
+        _global_active_downloads += 1
+        if _global_active_downloads == 1:
+            wx.CallAfter(startHeartbeat)
+
+def _job_finished():
+    global _global_active_downloads
+    with _global_active_lock:
+        _global_active_downloads -= 1
+        if _global_active_downloads == 0:
+            wx.CallAfter(stopHeartbeat)
+
+def _run_process(download_id, cmd, cwd, on_line=None, network=False):
+    si = subprocess.STARTUPINFO()
+    si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    si.wShowWindow = subprocess.SW_HIDE
+    
+    process = subprocess.Popen(
+        withProgressArgs(cmd),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        startupinfo=si,
+        creationflags=subprocess.CREATE_NO_WINDOW
+    )
+    log(f"Process started with PID: {process.pid}")
+    _watch_job(download_id, process, network)
+    _apply_job_control(download_id)
+    def _on_line(line):
+        _note_activity(download_id)
+        if on_line:
+            on_line(line)
+    reader = OutputReader(
+        process,
+        on_progress=lambda event: _on_progress(download_id, event),
+        on_line=_on_line
+    )
+    reader.start()
+    try:
+        # No fixed timeout: the watchdog stops the process once it stops making progress.
+        return_code, cpu = _wait_for_exit(download_id, process)
+        reader.join(timeout=5)
+    except BaseException:
+        cpu = None
+        _terminate_process_tree(process)
+        raise
+    finally:
+        watch = _unwatch_job(download_id)
+        metrics = _job_metrics.get(download_id)
+        if metrics is not None:
+            sampled = sum(watch["cpu_by_pid"].values()) if watch else 0.0
+            metrics.cpu_time += max(cpu or 0.0, sampled)
+    stalled = bool(watch and watch["stalled"])
+    return return_code, reader.stdout_text(), reader.stderr_text(), stalled
+
+def _record_output(path):
+    # Lets checkFileExists and the trim numbering see the file before the folder is rescanned.
+    if path and os.path.isfile(path):
+        folderIndex(os.path.dirname(path)).add(os.path.basename(path))
+
+def _forget_file(path):
+    # The deleting side of _record_output.
+    folderIndex(os.path.dirname(path)).discard(os.path.basename(path))
+
+def _report_success(download_id, output_path):
+    item = getDownload(download_id)
+    parent_id = item.get("parent_id") if item else None
+    if item:
+        _archive_download(item, output_path)
+    _record_output(output_path)
+    # Playlist entries stay quiet; the playlist announces itself once every entry is done.
+    if not parent_id:
+        PlayWave('complete')
+        if getINI("SayDownloadComplete"):
+            wx.CallAfter(ui.message, _("Download complete"))
+    updateDownloadStatusInQueue(download_id, "completed", output_path=output_path)
+    _finish_metrics(download_id, True)
+    if parent_id:
+        _playlist_entry_finished(parent_id, "entries_done")
+
+def _retry_or_fail(item, message, stderr_str, stalled=False):
+    """Schedule another attempt unless the error is permanent or the retries are used up. Returns True when a retry was scheduled."""
+    download_id = item["id"]
+    kind = "transient" if stalled else classifyError(stderr_str)
+    attempts = item.get("attempts", 0) + 1
+    retries = getINI("MaxRetries")
+    if kind == "permanent" or attempts > retries or item.get("is_playlist") or _is_cancelled(download_id):
+        if kind == "permanent":
+            log(f"Download for ID {download_id} failed permanently, not retrying.")
+        _report_failure(download_id, message)
+        return False
+    delay = retryDelay(attempts, _retry_base_delay, _retry_max_delay)
+    log(f"Download for ID {download_id} failed with a {kind or 'unclassified'} error, retry {attempts} of {retries} in {delay:.0f} seconds.")
+    updateDownloadStatusInQueue(download_id, "retrying", attempts=attempts, retry_at=time.time() + delay, last_error=kind or "unknown")
+    # Only the final attempt counts in the performance figures.
+    _job_metrics.pop(download_id, None)
+    if not item.get("parent_id"):
+        wx.CallAfter(ui.message, _("Download interrupted, retrying in {seconds} seconds").format(seconds=int(delay)))
+    _schedule_retry(download_id, delay)
+    return True
+
+def _schedule_retry(download_id, delay):
+    timer = threading.Timer(delay, _retry_due, args=(download_id,))
+    timer.daemon = True
+    with _control_lock:
+        _retry_timers[download_id] = timer
+    timer.start()
+
+def _retry_due(download_id):
+    with _control_lock:
+        _retry_timers.pop(download_id, None)
+    item = getDownload(download_id)
+    if item is None or item["status"] != "retrying":
+        return
+    log(f"Retrying download for ID {download_id}, attempt {item.get('attempts', 0) + 1}")
+    updateDownloadStatusInQueue(download_id, "queued")
+    _download_queue.put(item)
+
+def _report_failure(download_id, message):
+    if _is_cancelled(download_id):
+        _report_cancelled(download_id)
+        return
+    item = getDownload(download_id)
+    parent_id = item.get("parent_id") if item else None
+    if not parent_id:
+        PlayWave('failed')
+        wx.CallAfter(ui.message, message)
+    updateDownloadStatusInQueue(download_id, "failed")
+    _finish_metrics(download_id, False)
+    if parent_id:
+        _playlist_entry_finished(parent_id, "entries_failed")
+
 def run_download(item):
     download_id = item["id"]
     cmd = item["cmd"]
@@ -489,88 +1968,589 @@ def run_download(item):
     file_format = item["format"]
     is_playlist = item.get("is_playlist", False)
     is_trimming = item.get("trimming", False)
+    postprocess = item.get("postprocess")
     
-    with _global_active_lock:
-        global _global_active_downloads
-        _global_active_downloads += 1
-        if _global_active_downloads == 1:
-            wx.CallAfter(startHeartbeat)
-    
+    _job_started()
+    metrics = _metrics_for(item)
+    metrics.mark("download_started")
+    metrics.stage = "download"
     updateDownloadStatusInQueue(download_id, "running")
     log(f"Starting download for ID: {download_id}")
     log(f"Command: {cmd}")
     
-    process = None
+    handed_off = False
+    retrying = False
     try:
-        si = subprocess.STARTUPINFO()
-        si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-        si.wShowWindow = subprocess.SW_HIDE
-        
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            cwd=save_path,
-            startupinfo=si,
-            creationflags=subprocess.CREATE_NO_WINDOW
-        )
-        log(f"Process started with PID: {process.pid}")
-
-        timeout = 1800
-        try:
-            stdout, stderr = process.communicate(timeout=timeout)
-            return_code = process.returncode
-
-            stdout_str = stdout.decode('utf-8', errors='ignore')
-            stderr_str = stderr.decode('utf-8', errors='ignore')
-            
-            if return_code == 0:
-                log(f"Download for ID {download_id} completed successfully.")
-                log(f"STDOUT: {stdout_str}")
-                PlayWave('complete')
-                if getINI("SayDownloadComplete"):
-                    wx.CallAfter(ui.message, _("Download complete"))
-                updateDownloadStatusInQueue(download_id, "completed")
+        inputs = _download_with_shared_aria2(item) if _uses_shared_aria2(item) else None
+        if inputs:
+            metrics.mark("download_finished")
+            metrics.stage = None
+            log(f"Download stage for ID {download_id} finished, queued for post-processing.")
+            updateDownloadStatusInQueue(download_id, "postprocessing", inputs=inputs)
+            _postprocess_queue.put(item)
+            handed_off = True
+            return
+        if _is_cancelled(download_id):
+            _report_cancelled(download_id)
+            return
+        run_cmd = _with_cached_info(item)
+        if run_cmd is not cmd:
+            log(f"Using cached metadata for ID {download_id}")
+        limited_cmd = _with_rate_limit(run_cmd)
+        if limited_cmd is not run_cmd:
+            log(f"Limiting download for ID {download_id} to {limited_cmd[2]} bytes per second")
+        return_code, stdout_str, stderr_str, stalled = _run_process(download_id, limited_cmd, save_path, network=True)
+        metrics.mark("download_finished")
+        metrics.stage = None
+        if _is_cancelled(download_id):
+            # Whatever the killed process left behind is removed with the other partial files below.
+            _report_cancelled(download_id)
+            return
+        if run_cmd is not cmd and return_code != 0 and _metadata_cache is not None:
+            # The cached format URLs may have expired; the next attempt extracts again.
+            _metadata_cache.discard(item.get("video_id"))
+        if stalled:
+            log(f"Download for ID {download_id} stalled with no progress for {getINI('StallTimeout')} seconds.")
+            log(f"STDERR: {stderr_str}")
+            retrying = _retry_or_fail(item, _("Download failed because it stopped making progress"), stderr_str, stalled=True)
+        elif postprocess and return_code == 0:
+            inputs = _downloaded_inputs(item, stdout_str)
+            if inputs and postprocess["kind"] == "bundle":
+                thumbnail, subtitles = findBundleExtras(save_path, postprocess["token"])
+                postprocess = dict(postprocess, thumbnail=thumbnail, subtitles=subtitles)
+                inputs = inputs + subtitles + ([thumbnail] if thumbnail else [])
+            if inputs and postprocess.get("probe") and "codecs" not in postprocess:
+                # ffmpeg listed the source streams while copying them, so no separate probe is needed.
+                codecs = parseStreamCodecs(stderr_str)
+                if codecs:
+                    postprocess = dict(postprocess, codecs=codecs)
+            if inputs:
+                log(f"Download stage for ID {download_id} finished, queued for post-processing.")
+                updateDownloadStatusInQueue(download_id, "postprocessing", inputs=inputs, postprocess=postprocess)
+                _postprocess_queue.put(item)
+                handed_off = True
             else:
-                log(f"Download for ID {download_id} failed with return code {return_code}.")
+                log(f"Download for ID {download_id} finished but left no files to post-process.")
                 log(f"STDOUT: {stdout_str}")
-                log(f"STDERR: {stderr_str}")
-                PlayWave('failed')
-                wx.CallAfter(ui.message, _("Download failed"))
-                updateDownloadStatusInQueue(download_id, "failed")
-        except subprocess.TimeoutExpired:
-            log(f"Download for ID {download_id} timed out after {timeout} seconds.")
-            if process:
-                process.terminate()
-                try:
-                    process.wait(timeout=5)
-                except subprocess.TimeoutExpired:
-                    process.kill()
-            PlayWave('failed')
-            wx.CallAfter(ui.message, _("Download failed due to timeout"))
-            updateDownloadStatusInQueue(download_id, "failed")
+                retrying = _retry_or_fail(item, _("Download failed"), stderr_str)
+        elif return_code == 0:
+            log(f"Download for ID {download_id} completed successfully.")
+            log(f"STDOUT: {stdout_str}")
+            _report_success(download_id, _find_output_path(cmd, stdout_str, save_path))
+        else:
+            log(f"Download for ID {download_id} failed with return code {return_code}.")
+            log(f"STDOUT: {stdout_str}")
+            log(f"STDERR: {stderr_str}")
+            retrying = _retry_or_fail(item, _("Download failed"), stderr_str)
+            if postprocess and not retrying:
+                # A stream cut short, or one stream of several, is never converted.
+                _remove_streams(item, _job_stream_files(item, stdout_str))
     except Exception as e:
         log(f"Error during download execution for ID {download_id}: {e}")
-        if process:
-            process.terminate()
-            try:
-                process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                process.kill()
-        PlayWave('failed')
-        wx.CallAfter(ui.message, _("Download failed due to an error"))
-        updateDownloadStatusInQueue(download_id, "failed")
+        _report_failure(download_id, _("Download failed due to an error"))
     finally:
-        if not is_trimming:
+        _job_progress.pop(download_id, None)
+        # Partial files stay for a retry, which continues them.
+        if not is_trimming and not handed_off and not retrying:
             _cleanup_temp_files(save_path, title, file_format)
         removeCompletedOrFailedDownloadsFromQueue()
-        with _global_active_lock:
-            _global_active_downloads -= 1
-            if _global_active_downloads == 0:
-                wx.CallAfter(stopHeartbeat)
+        _job_finished()
         log(f"Download for ID {download_id} finished.")
 
-def convertToMP(mpFormat, savePath, isPlaylist=False, url=None, title=None):
+ResolvedStreamPrefix = "[utd-stream]"
+
+def _uses_shared_aria2(item):
+    cmd = item.get("cmd") or []
+    # Bundles also need the thumbnail and subtitles, which only yt-dlp itself fetches.
+    if (item.get("postprocess") or {}).get("kind") == "bundle":
+        return False
+    return bool(item.get("postprocess")) and bool(cmd) and cmd[0] == YouTubeEXE and "--external-downloader" in cmd and "-f" in cmd
+
+def _shared_aria2():
+    """Return the shared aria2c, starting it on first use, or None when jobs should run their own."""
+    global _aria2, _aria2_failed
+    with _aria2_lock:
+        if _aria2 is not None and _aria2.is_running():
+            return _aria2
+        if _aria2_failed or not getINI("SharedAria2") or not os.path.exists(Aria2cEXE):
+            return None
+        daemon = Aria2Daemon(
+            Aria2cEXE,
+            max_downloads=2 * _max_concurrent_downloads() + 1,
+            max_connections=getINI("MultiPartConnections")
+        )
+        try:
+            daemon.start()
+        except Exception as e:
+            log(f"Shared aria2c could not start, each download runs its own: {e}")
+            _aria2_failed = True
+            return None
+        _aria2 = daemon
+        log(f"Shared aria2c started with PID {daemon.process.pid}")
+        return daemon
+
+def _stop_aria2():
+    global _aria2
+    with _aria2_lock:
+        daemon, _aria2 = _aria2, None
+    if daemon is not None:
+        daemon.stop()
+
+def _resolve_streams(item):
+    # yt-dlp picks the formats and names the files from the cached metadata, without touching the network;
+    # aria2 can only take plain HTTP formats, so anything else is left to yt-dlp.
+    info_path = getVideoInfoPath(item["url"])
+    if not info_path:
+        return None
+    cmd = item["cmd"]
+    resolve_cmd = [
+        YouTubeEXE, "--no-warnings", "--load-info-json", info_path,
+        "-f", cmd[cmd.index("-f") + 1], "-o", cmd[cmd.index("-o") + 1],
+        "--print", ResolvedStreamPrefix + " %(protocol)s\t%(filename)s\t%(url)s\t%(http_headers)j"
+    ]
+    result = subprocess.run(
+        resolve_cmd,
+        capture_output=True,
+        text=True,
+        encoding='utf-8',
+        creationflags=subprocess.CREATE_NO_WINDOW
+    )
+    streams = []
+    for line in result.stdout.splitlines():
+        if not line.startswith(ResolvedStreamPrefix):
+            continue
+        fields = line[len(ResolvedStreamPrefix):].strip().split("\t")
+        if len(fields) != 4 or fields[0] not in ("http", "https"):
+            return None
+        try:
+            headers = json.loads(fields[3])
+        except ValueError:
+            headers = {}
+        streams.append({"path": fields[1], "url": fields[2], "headers": headers})
+    return streams or None
+
+def _download_with_shared_aria2(item):
+    """Fetch a job's streams through the shared aria2c. Returns the downloaded files, or None to let yt-dlp do it."""
+    global _aria2_jobs
+    daemon = _shared_aria2()
+    if daemon is None:
+        return None
+    download_id = item["id"]
+    streams = _resolve_streams(item)
+    if not streams:
+        log(f"Shared aria2c skipped for ID {download_id}; the formats need yt-dlp's own downloader.")
+        return None
+    with _aria2_lock:
+        _aria2_jobs += 1
+        # MultiPartConnections is the cap for all shared downloads together, split between the running jobs.
+        connections = max(1, getINI("MultiPartConnections") // _aria2_jobs)
+    gids = []
+    ok = False
+    try:
+        daemon.set_global_option("max-overall-download-limit", _bandwidth_limit())
+        for stream in streams:
+            gids.append(daemon.add(stream["url"], os.path.dirname(stream["path"]), os.path.basename(stream["path"]), stream["headers"], connections))
+        log(f"Shared aria2c downloading {len(gids)} streams for ID {download_id} with {connections} connections each")
+        moved = 0
+        last_advance = time.time()
+        held = False
+        while True:
+            time.sleep(_aria2_poll_interval)
+            if _is_cancelled(download_id):
+                log(f"Shared aria2c download for ID {download_id} cancelled.")
+                return None
+            if held != (download_id in _paused_jobs):
+                held = not held
+                for gid in gids:
+                    try:
+                        if held:
+                            daemon.pause(gid)
+                        else:
+                            daemon.unpause(gid)
+                    except Aria2Error:
+                        # A stream that already finished cannot be paused.
+                        pass
+            limit = _bandwidth_limit()
+            daemon.set_global_option("max-overall-download-limit", limit)
+            statuses = [daemon.status(gid) for gid in gids]
+            # Each job's share is worked out again on every poll, so it grows as other downloads finish.
+            unfinished = [gid for gid, status in zip(gids, statuses) if status.get("status") in ("active", "waiting", "paused")]
+            if unfinished:
+                share = max(limit // _network_jobs(), _bandwidth_min_share) // len(unfinished) if limit else 0
+                for gid in unfinished:
+                    try:
+                        daemon.set_option(gid, "max-download-limit", share)
+                    except Aria2Error:
+                        # It finished since its status was read.
+                        pass
+            now = time.time()
+            done = sum(int(status.get("completedLength") or 0) for status in statuses)
+            total = sum(int(status.get("totalLength") or 0) for status in statuses)
+            speed = sum(int(status.get("downloadSpeed") or 0) for status in statuses)
+            if done > moved:
+                _bandwidth_bucket.consume(done - moved)
+                moved = done
+                last_advance = now
+            _on_progress(download_id, {
+                "source": "aria2",
+                "status": "downloading",
+                "downloaded_bytes": done,
+                "total_bytes": total or None,
+                "speed": speed,
+                "eta": int((total - done) / speed) if speed and total else None,
+                "fragment_index": None,
+                "fragment_count": None,
+                "time": now,
+            })
+            failed = [status for status in statuses if status.get("status") in ("error", "removed")]
+            if failed:
+                log(f"Shared aria2c download for ID {download_id} failed: {failed[0].get('errorMessage')}")
+                return None
+            if all(status.get("status") == "complete" for status in statuses):
+                ok = True
+                return [stream["path"] for stream in streams]
+            paused = held or any(status.get("status") == "paused" for status in statuses)
+            stall_window = getINI("StallTimeout")
+            if paused:
+                last_advance = now
+            elif stall_window > 0 and now - last_advance >= stall_window:
+                log(f"Shared aria2c download for ID {download_id} made no progress for {stall_window} seconds.")
+                return None
+    except Aria2Error as e:
+        log(f"Shared aria2c error for ID {download_id}: {e}")
+        return None
+    finally:
+        with _aria2_lock:
+            _aria2_jobs -= 1
+        for gid in gids:
+            daemon.remove(gid)
+        if _is_cancelled(download_id):
+            for stream in streams:
+                for path in (stream["path"], stream["path"] + ".aria2"):
+                    try:
+                        if os.path.exists(path):
+                            os.remove(path)
+                            _forget_file(path)
+                    except Exception as e:
+                        log(f"Error removing cancelled stream {path}: {e}")
+        if not ok and _metadata_cache is not None:
+            # The format URLs may have expired; yt-dlp extracts them again.
+            _metadata_cache.discard(item.get("video_id"))
+
+def _local_audio_source(url, savePath, titles):
+    # A finished MP4 of the same video already holds the audio track an MP3 job would download.
+    path = archivedPath(getVideoId(url), "mp4")
+    if path and os.path.isfile(path):
+        return path
+    index = folderIndex(savePath)
+    for title in titles:
+        if title and index.exists(f"{title}.mp4"):
+            return os.path.join(savePath, f"{title}.mp4")
+    return None
+
+def _downloaded_inputs(item, stdout_str):
+    cmd = item["cmd"]
+    if cmd and cmd[0] == ConverterEXE:
+        return [cmd[-1]] if os.path.exists(cmd[-1]) else []
+    return findDownloadedFiles(stdout_str, item["path"])
+
+def _job_stream_files(item, stdout_str):
+    files = _downloaded_inputs(item, stdout_str)
+    token = (item.get("postprocess") or {}).get("token")
+    if token:
+        # Streams yt-dlp had not finished are still under their partial names.
+        files += folderIndex(item["path"]).temp_files([f"*.stream{token}-*"])
+    return files
+
+def run_postprocess(item):
+    download_id = item["id"]
+    save_path = item["path"]
+    is_trimming = item.get("trimming", False)
+    
+    _job_started()
+    metrics = _metrics_for(item)
+    metrics.mark("postprocess_started")
+    metrics.stage = "postprocess"
+    log(f"Starting post-processing for ID: {download_id}")
+    try:
+        if item["postprocess"]["kind"] == "smartcut":
+            return_code, stderr_str, stalled, output_path = _run_smart_cut(download_id, item)
+        else:
+            if item["postprocess"].get("probe") and "codecs" not in item["postprocess"]:
+                _probe_codecs(download_id, item)
+            if item["postprocess"].get("metadata") and "tags" not in item["postprocess"]:
+                item["postprocess"] = dict(item["postprocess"], tags=_bundle_tags(item))
+            cmd, output_path = buildPostprocessCommand(ConverterEXE, item)
+            log(f"Command: {cmd}")
+            return_code, stdout_str, stderr_str, stalled = _run_process(download_id, cmd, save_path)
+        metrics.mark("postprocess_finished")
+        metrics.stage = None
+        if _is_cancelled(download_id):
+            _report_cancelled(download_id)
+        elif return_code == 0 and not stalled:
+            _remove_streams(item, item.get("inputs", []), keep=output_path)
+            log(f"Post-processing for ID {download_id} completed successfully.")
+            if item["postprocess"]["kind"] == "bundle":
+                # The MP4 is archived as the job's output; the MP3 beside it counts as downloaded too.
+                spec = item["postprocess"]
+                _archive_download(dict(item, format="mp3", quality=str(spec.get("quality"))), bundleOutputs(item)["mp3"])
+                for path in bundleOutputs(item).values():
+                    _record_output(path)
+            _report_success(download_id, output_path)
+        else:
+            log(f"Post-processing for ID {download_id} failed with return code {return_code}.")
+            log(f"STDERR: {stderr_str}")
+            # The streams may be what ffmpeg choked on, so a retry downloads them again.
+            _remove_streams(item, item.get("inputs", []))
+            _retry_or_fail(item, _("Download failed"), stderr_str, stalled=stalled)
+    except Exception as e:
+        log(f"Error during post-processing for ID {download_id}: {e}")
+        _remove_streams(item, item.get("inputs", []))
+        _report_failure(download_id, _("Download failed due to an error"))
+    finally:
+        _job_progress.pop(download_id, None)
+        if not is_trimming and not item.get("local_source"):
+            _cleanup_temp_files(save_path, item["title"], item["format"])
+        removeCompletedOrFailedDownloadsFromQueue()
+        _job_finished()
+        log(f"Post-processing for ID {download_id} finished.")
+
+def _bundle_tags(item):
+    # The download left the video's info JSON in the metadata cache, so this needs no second extraction.
+    path = _metadata_cache.fresh_path(item.get("video_id")) if _metadata_cache is not None else None
+    if not path:
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+    except Exception as e:
+        log(f"Error reading cached metadata {path}: {e}")
+        return {}
+    date = str(info.get("upload_date") or "")
+    return {
+        "title": info.get("title"),
+        "artist": info.get("uploader") or info.get("channel"),
+        "date": f"{date[:4]}-{date[4:6]}-{date[6:8]}" if len(date) == 8 else None,
+        "comment": info.get("webpage_url"),
+    }
+
+def _probe_codecs(download_id, item):
+    # Only reached when the download stage's own listing was lost, such as after a restart.
+    cmd = streamProbeCommand(ConverterEXE, item["inputs"][0])
+    return_code, stdout_str, stderr_str, stalled = _run_process(download_id, cmd, item["path"])
+    codecs = parseStreamCodecs(stderr_str)
+    log(f"Source codecs for ID {download_id}: {codecs or 'unknown'}")
+    if codecs:
+        item["postprocess"] = dict(item["postprocess"], codecs=codecs)
+        updateDownloadStatusInQueue(download_id, "postprocessing", postprocess=item["postprocess"])
+
+def _run_smart_cut(download_id, item):
+    save_path = item["path"]
+    source = item["inputs"][0]
+    keyframes = []
+    def on_line(line):
+        t = keyframeTime(line)
+        if t is not None:
+            keyframes.append(t)
+    cmd = keyframeProbeCommand(ConverterEXE, source)
+    log(f"Command: {cmd}")
+    return_code, stdout_str, stderr_str, stalled = _run_process(download_id, cmd, save_path, on_line=on_line)
+    if return_code != 0 or stalled:
+        return return_code, stderr_str, stalled, None
+    avc = readAvcConfig(source)
+    log(f"Smart cut for ID {download_id}: source H.264 profile, level and timescale {avc or 'unknown'}")
+    commands, output_path, scratch = smartCutCommands(ConverterEXE, item, keyframes, avc)
+    log(f"Smart cut for ID {download_id}: {len(keyframes)} keyframes, {len(commands)} ffmpeg steps")
+    try:
+        for cmd in commands:
+            log(f"Command: {cmd}")
+            return_code, stdout_str, stderr_str, stalled = _run_process(download_id, cmd, save_path)
+            if return_code != 0 or stalled:
+                break
+    finally:
+        for path in scratch:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+                    _forget_file(path)
+            except Exception as e:
+                log(f"Error removing smart cut piece {path}: {e}")
+    return return_code, stderr_str, stalled, output_path
+
+PlaylistEntryPrefix = "[utd-entry]"
+_playlist_lock = threading.Lock()
+
+def _youtube_job_command(url, mpFormat, savePath, bundle=False):
+    # Only fetch the raw streams here; ffmpeg work runs in the post-processing pool
+    # so the next download can start while this one is converted.
+    token = uuid.uuid4().hex[:8]
+    if mpFormat == "mp3":
+        stream_format = "ba[ext=m4a]/ba/b"
+        postprocess = {"kind": "mp3", "quality": getINI("MP3Quality")}
+    elif bundle:
+        stream_format = "(bv*[ext=mp4]/bv*),(ba[ext=m4a]/ba)"
+        postprocess = {"kind": "bundle", "quality": getINI("MP3Quality"), "metadata": getINI("BundleMetadata")}
+    else:
+        stream_format = "(bv*[ext=mp4]/bv*),(ba[ext=m4a]/ba)"
+        postprocess = {"kind": "merge"}
+    postprocess["token"] = token
+    cmd = [YouTubeEXE, "--no-playlist", "-f", stream_format] + downloadedFileArgs() + [
+        "-o", os.path.join(savePath, streamOutputTemplate(token))
+    ]
+    if bundle:
+        templates = bundleOutputTemplates(token)
+        cmd += ["--write-thumbnail", "-o", "thumbnail:" + os.path.join(savePath, templates["thumbnail"])]
+        if getINI("BundleSubtitles"):
+            cmd += [
+                "--write-subs", "--write-auto-subs", "--sub-langs", getINI("SubtitleLanguages") or "en",
+                "-o", "subtitle:" + os.path.join(savePath, templates["subtitle"])
+            ]
+    if _metadata_cache is not None:
+        # Leave the extracted metadata behind for trims, snapshots and later downloads of this video.
+        cmd += ["--write-info-json", "-o", "infojson:" + _metadata_cache.output_template()]
+    cmd += ["--ignore-errors", "--no-warnings", url]
+    connections = getINI("MultiPartConnections")
+    if getINI("UseMultiPart") and os.path.exists(Aria2cEXE):
+        aria2_args = f"-x{connections} -j{connections} -s{connections} -k1M --file-allocation=none --allow-overwrite=true --max-tries=0 --retry-wait=1"
+        cmd.extend(["--external-downloader", Aria2cEXE, 
+                    "--external-downloader-args", f"aria2c:{aria2_args}"])
+    elif mpFormat == "mp4":
+        cmd.extend(["--concurrent-fragments", str(connections)])
+    return cmd, postprocess
+
+def _playlist_children(parent_id):
+    with _global_state_lock:
+        return [item for item in _jobs.values() if item.get("parent_id") == parent_id]
+
+def _update_playlist_progress(parent_id):
+    parent = getDownload(parent_id)
+    if parent is None:
+        return
+    running = 0
+    downloaded = 0
+    speed = 0.0
+    for job_id, event in list(_job_progress.items()):
+        child = _jobs.get(job_id)
+        if child and child.get("parent_id") == parent_id:
+            running += 1
+            downloaded += event.get("downloaded_bytes") or 0
+            speed += event.get("speed") or 0
+    event = {
+        "source": "playlist",
+        "status": "downloading",
+        "entries_total": parent.get("entries_total"),
+        "entries_done": parent.get("entries_done", 0),
+        "entries_failed": parent.get("entries_failed", 0),
+        "entries_running": running,
+        "downloaded_bytes": downloaded,
+        "total_bytes": None,
+        "speed": speed,
+        "eta": None,
+        "fragment_index": None,
+        "fragment_count": None,
+        "time": time.time(),
+    }
+    _job_progress[parent_id] = event
+    _notify_progress(parent_id, event)
+
+def _playlist_entry_finished(parent_id, counter):
+    with _playlist_lock:
+        parent = getDownload(parent_id)
+        if parent is None:
+            return
+        updateDownloadStatusInQueue(parent_id, parent["status"], **{counter: parent.get(counter, 0) + 1})
+    _update_playlist_progress(parent_id)
+    _finish_playlist_if_done(parent_id)
+
+def _finish_playlist_if_done(parent_id):
+    with _playlist_lock:
+        parent = getDownload(parent_id)
+        if parent is None or not parent.get("expanded") or parent["status"] != "running":
+            return
+        if any(child["status"] in ["queued", "running", "postprocessing", "retrying"] for child in _playlist_children(parent_id)):
+            return
+        total = parent.get("entries_total", 0)
+        done = parent.get("entries_done", 0)
+        failed = parent.get("entries_failed", 0)
+        skipped = max(0, total - done - failed)
+        log(f"Playlist {parent_id} finished: {done} downloaded, {failed} failed, {skipped} skipped")
+        if failed and not done:
+            _report_failure(parent_id, _("Playlist download failed"))
+        else:
+            _report_success(parent_id, parent["path"])
+            if failed:
+                wx.CallAfter(ui.message, _("{failed} of {total} playlist videos failed").format(failed=failed, total=total))
+    _job_progress.pop(parent_id, None)
+    removeCompletedOrFailedDownloadsFromQueue()
+
+def expand_playlist(parent_id):
+    """List a playlist without downloading it and queue one bulk job per entry. Entries already queued or on disk are left alone, so this is safe to run again after a restart."""
+    parent = getDownload(parent_id)
+    if parent is None:
+        return
+    save_path = parent["path"]
+    file_format = parent["format"]
+    known = {child.get("video_id") for child in _playlist_children(parent_id)}
+    counts = {"total": 0, "queued": 0}
+
+    def on_line(line):
+        if not line.startswith(PlaylistEntryPrefix):
+            return
+        fields = line[len(PlaylistEntryPrefix):].lstrip(" ").split("\t", 2)
+        if len(fields) < 3 or not fields[0]:
+            return
+        video_id, entry_url, entry_title = fields
+        counts["total"] += 1
+        if video_id in known:
+            return
+        known.add(video_id)
+        if not entry_url.startswith("http"):
+            entry_url = f"https://www.youtube.com/watch?v={video_id}"
+        title = validFilename(entry_title)
+        if _is_cancelled(parent_id) or checkFileExists(save_path, title, file_format, url=entry_url):
+            return
+        cmd, postprocess = _youtube_job_command(entry_url, file_format, save_path, parent.get("bundle", False))
+        child = {
+            "url": entry_url, "title": title, "format": file_format,
+            "path": save_path, "cmd": cmd, "is_playlist": False,
+            "postprocess": postprocess, "priority": "bulk",
+            "parent_id": parent_id, "video_id": video_id,
+            "quality": archiveQuality(file_format)
+        }
+        child_id = addDownloadToQueue(child)
+        if parent_id in _paused_jobs:
+            pauseDownload(child_id)
+        _download_queue.put(child)
+        counts["queued"] += 1
+
+    _job_started()
+    log(f"Expanding playlist for ID: {parent_id}")
+    log(f"Command: {parent['cmd']}")
+    try:
+        return_code, stdout_str, stderr_str, stalled = _run_process(parent_id, parent["cmd"], save_path, on_line=on_line)
+    except Exception as e:
+        log(f"Error expanding playlist for ID {parent_id}: {e}")
+        return_code, stderr_str, stalled = None, "", False
+    finally:
+        _job_finished()
+    if _is_cancelled(parent_id):
+        return
+    if not counts["total"]:
+        log(f"Playlist expansion for ID {parent_id} found no entries, return code {return_code}, stalled {stalled}.")
+        log(f"STDERR: {stderr_str}")
+        _report_failure(parent_id, _("Playlist download failed"))
+        removeCompletedOrFailedDownloadsFromQueue()
+        return
+    log(f"Playlist {parent_id} has {counts['total']} entries, {counts['queued']} queued")
+    updateDownloadStatusInQueue(parent_id, "running", expanded=True, entries_total=counts["total"])
+    _update_playlist_progress(parent_id)
+    _finish_playlist_if_done(parent_id)
+
+def _start_playlist_expansion(parent_id):
+    threading.Thread(target=expand_playlist, args=(parent_id,), daemon=True).start()
+
+def convertToMP(mpFormat, savePath, isPlaylist=False, url=None, title=None, bundle=False):
+    """With bundle, a YouTube video is saved as MP4, MP3 and a JPG thumbnail from one download."""
     if not isBrowser():
         ui.message(_("Browser required"))
         return
@@ -589,12 +2569,9 @@ def convertToMP(mpFormat, savePath, isPlaylist=False, url=None, title=None):
     if is_youtube_url:
         video_title = getWebSiteTitle()
         sanitized_title = validFilename(video_title)
-        if checkFileExists(savePath, sanitized_title, mpFormat):
-            if mpFormat == "mp3" and os.path.exists(os.path.join(savePath, f"{sanitized_title}.mp4")):
-                log(f"MP4 exists for {sanitized_title}, allowing MP3 download")
-            else:
-                ui.message(_("File exists"))
-                return
+        if checkFileExists(savePath, sanitized_title, mpFormat, url=url):
+            ui.message(_("File exists"))
+            return
         if not isPlaylist:
             parsed = urllib.parse.urlparse(url)
             query_params = urllib.parse.parse_qs(parsed.query)
@@ -613,41 +2590,43 @@ def convertToMP(mpFormat, savePath, isPlaylist=False, url=None, title=None):
             ui.message(_("yt-dlp.exe missing"))
             return
         PlayWave("start")
-        output = os.path.join(savePath, "%(title)s.%(ext)s")
         
-        use_multipart = getINI("UseMultiPart") and os.path.exists(Aria2cEXE)
-        connections = getINI("MultiPartConnections")
-        
-        if mpFormat == "mp3":
+        if isPlaylist:
+            # The playlist itself only lists its entries; each entry becomes its own bulk job.
             cmd = [
-                YouTubeEXE, "--no-playlist" if not isPlaylist else "--yes-playlist",
-                "-x", "--audio-format", "mp3",
-                "--audio-quality", str(getINI("MP3Quality")),
-                "--ffmpeg-location", ConverterEXE,
-                "-o", output, "--ignore-errors", "--no-warnings", url
+                YouTubeEXE, "--yes-playlist", "--flat-playlist",
+                "--print", PlaylistEntryPrefix + " %(id)s\t%(url)s\t%(title)s",
+                "--ignore-errors", "--no-warnings", url
             ]
-            if use_multipart:
-                aria2_args = f"-x{connections} -j{connections} -s{connections} -k1M --file-allocation=none --allow-overwrite=true --max-tries=0 --retry-wait=1"
-                cmd.extend(["--external-downloader", Aria2cEXE, 
-                            "--external-downloader-args", f"aria2c:{aria2_args}"])
-        else:
-            cmd = [
-                YouTubeEXE, "--no-playlist" if not isPlaylist else "--yes-playlist",
-                "-f", "bv*[ext=mp4]+ba[ext=m4a]/b[ext=mp4]/bv*+ba/b",
-                "--remux-video", "mp4",
-                "--ffmpeg-location", ConverterEXE,
-                "-o", output, "--ignore-errors", "--no-warnings", url
-            ]
-            if use_multipart:
-                aria2_args = f"-x{connections} -j{connections} -s{connections} -k1M --file-allocation=none --allow-overwrite=true --max-tries=0 --retry-wait=1"
-                cmd.extend(["--external-downloader", Aria2cEXE, 
-                            "--external-downloader-args", f"aria2c:{aria2_args}"])
-            else:
-                cmd.extend(["--concurrent-fragments", str(connections)])
+            download_obj = {
+                "url": url, "title": sanitized_title, "format": mpFormat,
+                "path": savePath, "cmd": cmd, "is_playlist": True,
+                "priority": "bulk", "expanded": False, "bundle": bundle,
+                "entries_total": 0, "entries_done": 0, "entries_failed": 0
+            }
+            download_id = addDownloadToQueue(download_obj)
+            updateDownloadStatusInQueue(download_id, "running")
+            _start_playlist_expansion(download_id)
+            return
+        cmd, postprocess = _youtube_job_command(url, mpFormat, savePath, bundle)
         download_obj = {
             "url": url, "title": sanitized_title, "format": mpFormat,
-            "path": savePath, "cmd": cmd, "is_playlist": isPlaylist
+            "path": savePath, "cmd": cmd, "is_playlist": False,
+            "postprocess": postprocess, "priority": "interactive",
+            "quality": archiveQuality(mpFormat)
         }
+        source = _local_audio_source(url, savePath, (video_title, sanitized_title)) if mpFormat == "mp3" else None
+        if source:
+            # The audio is already on disk, so this is only an ffmpeg run; cmd stays as the
+            # fallback should the MP4 be gone by the time an interrupted job resumes.
+            stem = os.path.splitext(os.path.basename(source))[0]
+            postprocess["output"] = os.path.join(savePath, f"{stem}.mp3")
+            download_obj["local_source"] = source
+            download_id = addDownloadToQueue(download_obj)
+            log(f"Extracting MP3 for ID {download_id} from {source}, no download needed")
+            updateDownloadStatusInQueue(download_id, "postprocessing", inputs=[source], local_source=source)
+            _postprocess_queue.put(download_obj)
+            return
         download_id = addDownloadToQueue(download_obj)
         _download_queue.put(download_obj)
     else:
@@ -666,24 +2645,28 @@ def convertToMP(mpFormat, savePath, isPlaylist=False, url=None, title=None):
                 ui.message(_("No valid multimedia link found."))
                 return
             multimediaLinkName = os.path.join(savePath, validFilename(linkName) + "." + mpFormat)
+            # Copy the remote streams as they are; the post-processing pool then copies or encodes
+            # each one depending on the codecs ffmpeg found.
+            sourceName = os.path.join(savePath, validFilename(linkName) + ".stream.mkv")
             if mpFormat == "mp3":
                 cmd = [
                     ConverterEXE, "-i", multimediaLinkURL,
-                    "-c:a", "libmp3lame", "-b:a", f"{getINI('MP3Quality')}k",
-                    "-map", "0:a", "-y", multimediaLinkName
+                    "-map", "0:a", "-c", "copy", "-y", sourceName
                 ]
+                postprocess = {"kind": "mp3", "quality": getINI("MP3Quality"), "output": multimediaLinkName, "probe": True}
             else:
                 cmd = [
                     ConverterEXE, "-i", multimediaLinkURL,
-                    "-c:v", "libx265", "-preset", "fast", "-crf", "23",
-                    "-c:a", "copy", "-map", "0:v?", "-map", "0:a?",
-                    "-y", multimediaLinkName
+                    "-map", "0:v?", "-map", "0:a?", "-c", "copy",
+                    "-y", sourceName
                 ]
+                postprocess = {"kind": "transcode_mp4", "output": multimediaLinkName, "probe": True}
             ui.message(_("Adding link as {format} to download queue").format(format=mpFormat.upper()))
             PlayWave("start")
             download_obj = {
                 "url": multimediaLinkURL, "title": linkName, "format": mpFormat,
-                "path": savePath, "cmd": cmd, "is_playlist": False
+                "path": savePath, "cmd": cmd, "is_playlist": False,
+                "postprocess": postprocess, "priority": "interactive"
             }
             download_id = addDownloadToQueue(download_obj)
             _download_queue.put(download_obj)
@@ -0,0 +1,121 @@
+# uTubeDownload_folderindex.py
+
+import os
+import re
+import fnmatch
+import time
+import threading
+
+# Every partial or intermediate file yt-dlp, aria2c and the download stage can leave behind.
+TempPatterns = [
+    "*.part", "*.ytdl", "*.temp", "*.download", "*.f*.tmp",
+    "*.f*.webm", "*.f*.m4a", "*.f*.mp4", "*.part.aria2", "*.aria2", "*.part-Frag*"
+]
+_temp_name = re.compile("|".join(fnmatch.translate(pattern) for pattern in TempPatterns), re.IGNORECASE)
+
+# Numbered outputs whose next free number is looked up by kind.
+SequencePatterns = {
+    "trim": re.compile(r"^Trimmed Clip (\d+)\.(mp3|mp4)$", re.IGNORECASE),
+    "snapshot": re.compile(r"^Snapshot (\d+)\.jpg$", re.IGNORECASE),
+}
+
+# Directory mtimes on some file systems only move in steps this coarse.
+_mtime_resolution = 2.0
+
+class FolderIndex:
+    """Names in one folder, read with a single os.scandir pass.
+
+    The listing is rebuilt when the folder's modification time changes, which happens whenever a
+    file in it is created, renamed or deleted. Jobs record the files they write with add() and the
+    ones they delete with discard(), so lookups stay current while an mtime tick hides a change.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._scanned_at = 0.0
+        self._names = {}
+        self._temp = {}
+        self._sequences = {}
+
+    def _record(self, name, names, temp, sequences):
+        key = os.path.normcase(name)
+        names[key] = name
+        if _temp_name.match(name):
+            temp[key] = name
+        for kind, pattern in SequencePatterns.items():
+            match = pattern.match(name)
+            if match:
+                sequences[kind] = max(sequences.get(kind, 0), int(match.group(1)))
+
+    def _is_current(self, mtime, now):
+        if mtime is None or mtime != self._mtime:
+            return False
+        # A change in the same clock tick as the last scan leaves the mtime alone; one more scan once
+        # that tick is over catches it, after which the listing is trusted until the mtime moves.
+        return self._scanned_at - mtime / 1e9 > _mtime_resolution or now - mtime / 1e9 <= _mtime_resolution
+
+    def refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        with self._lock:
+            now = time.time()
+            if self._is_current(mtime, now):
+                return
+            names = {}
+            temp = {}
+            sequences = {}
+            if mtime is not None:
+                try:
+                    with os.scandir(self.path) as entries:
+                        for entry in entries:
+                            self._record(entry.name, names, temp, sequences)
+                except OSError:
+                    mtime = None
+            self._mtime = mtime
+            self._scanned_at = now
+            self._names = names
+            self._temp = temp
+            self._sequences = sequences
+
+    def add(self, name):
+        """Record a file this add-on just wrote, without waiting for the next rescan."""
+        with self._lock:
+            self._record(name, self._names, self._temp, self._sequences)
+
+    def discard(self, name):
+        """Forget a file this add-on just deleted, without waiting for the next rescan."""
+        key = os.path.normcase(name)
+        with self._lock:
+            self._names.pop(key, None)
+            self._temp.pop(key, None)
+
+    def exists(self, name):
+        self.refresh()
+        return os.path.normcase(name) in self._names
+
+    def next_number(self, kind):
+        self.refresh()
+        return self._sequences.get(kind, 0) + 1
+
+    def temp_files(self, patterns=None):
+        """Full paths of partial files, optionally narrowed to those matching one of patterns."""
+        self.refresh()
+        names = list(self._temp.values())
+        if patterns is not None:
+            names = [name for name in names if any(fnmatch.fnmatch(name, pattern) for pattern in patterns)]
+        return [os.path.join(self.path, name) for name in names]
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def folderIndex(path):
+    key = os.path.normcase(os.path.abspath(path))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = FolderIndex(path)
+    return index
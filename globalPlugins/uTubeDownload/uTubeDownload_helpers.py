@@ -0,0 +1,86 @@
+# uTubeDownload_helpers.py
+
+import threading
+import subprocess
+
+class WarmProcessPool:
+    """Keeps spare copies of one command started ahead of time, each parked on "--batch-file -".
+
+    yt-dlp.exe pays its unpack and import cost before it reads the batch file, so a parked spare has
+    done all of that by the time a URL is written to its stdin. Each spare serves one URL and is
+    replaced in the background. A parked spare only waits on its stdin, so it neither ages nor grows
+    and is kept however long it waits; one that has exited is replaced when it is taken.
+    """
+
+    def __init__(self, base_cmd, spares=1):
+        self.base_cmd = list(base_cmd)
+        self.spares = spares
+        self._lock = threading.Lock()
+        self._idle = []
+        self._closed = False
+
+    def _spawn(self):
+        si = subprocess.STARTUPINFO()
+        si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        si.wShowWindow = subprocess.SW_HIDE
+        process = subprocess.Popen(
+            self.base_cmd + ["--batch-file", "-"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            startupinfo=si,
+            creationflags=subprocess.CREATE_NO_WINDOW
+        )
+        return process
+
+    def _discard(self, process):
+        try:
+            process.kill()
+            process.communicate(timeout=5)
+        except Exception:
+            pass
+
+    def refill(self):
+        with self._lock:
+            if self._closed:
+                return
+            missing = self.spares - len(self._idle)
+        for _ in range(max(0, missing)):
+            try:
+                spare = self._spawn()
+            except Exception:
+                return
+            with self._lock:
+                if self._closed or len(self._idle) >= self.spares:
+                    self._discard(spare)
+                    return
+                self._idle.append(spare)
+
+    def _take(self):
+        with self._lock:
+            while self._idle:
+                process = self._idle.pop()
+                if process.poll() is None:
+                    return process
+                self._discard(process)
+        return self._spawn()
+
+    def run(self, url, timeout=None):
+        """Run the command for url on a warm spare. Returns (return_code, stdout, stderr)."""
+        process = self._take()
+        threading.Thread(target=self.refill, daemon=True).start()
+        try:
+            stdout, stderr = process.communicate(url + "\n", timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self._discard(process)
+            raise
+        return process.returncode, stdout, stderr
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for process in idle:
+            self._discard(process)
@@ -0,0 +1,154 @@
+# uTubeDownload_ledger.py
+
+import json
+import sqlite3
+import threading
+
+_finished_statuses = ("completed", "failed", "cancelled")
+
+class DownloadLedger:
+    """SQLite record of every queued download. Rows leave the active queue when purged but stay as history."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS downloads (
+                id TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                active INTEGER NOT NULL DEFAULT 1,
+                status TEXT,
+                url TEXT,
+                video_id TEXT,
+                format TEXT,
+                output_path TEXT,
+                start_time TEXT,
+                end_time TEXT,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_downloads_active ON downloads(active, seq);
+            CREATE INDEX IF NOT EXISTS idx_downloads_seq ON downloads(seq);
+            CREATE INDEX IF NOT EXISTS idx_downloads_status ON downloads(status);
+            CREATE INDEX IF NOT EXISTS idx_downloads_url ON downloads(url);
+            CREATE INDEX IF NOT EXISTS idx_downloads_video ON downloads(video_id, format, status);
+            CREATE INDEX IF NOT EXISTS idx_downloads_output ON downloads(output_path);
+            CREATE TABLE IF NOT EXISTS archive (
+                video_id TEXT NOT NULL,
+                format TEXT NOT NULL,
+                quality TEXT NOT NULL,
+                output_path TEXT,
+                completed_at TEXT,
+                PRIMARY KEY (video_id, format, quality)
+            );
+        """)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def is_empty(self):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM downloads LIMIT 1").fetchone() is None
+
+    def apply(self, records):
+        """Apply a batch of queue journal records in one transaction."""
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN")
+            try:
+                for record in records:
+                    self._apply_record(cur, record)
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+
+    def _apply_record(self, cur, record):
+        op = record.get("op")
+        if op == "add":
+            item = record["item"]
+            # Answered from idx_downloads_seq, so an enqueue does not scan the whole history.
+            seq = cur.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM downloads").fetchone()[0]
+            cur.execute(
+                "INSERT OR REPLACE INTO downloads (id, seq, active, status, url, video_id, format, output_path, start_time, end_time, data) "
+                "VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    item["id"], seq, item.get("status"), item.get("url"), item.get("video_id"),
+                    item.get("format"), item.get("output_path"), item.get("start_time"),
+                    item.get("end_time"), json.dumps(item, ensure_ascii=False)
+                )
+            )
+        elif op == "status":
+            row = cur.execute("SELECT data FROM downloads WHERE id = ?", (record["id"],)).fetchone()
+            if row is None:
+                return
+            item = json.loads(row[0])
+            item["status"] = record["status"]
+            item.update(record.get("fields", {}))
+            cur.execute(
+                "UPDATE downloads SET status = ?, output_path = ?, end_time = ?, data = ? WHERE id = ?",
+                (
+                    item["status"], item.get("output_path"), item.get("end_time"),
+                    json.dumps(item, ensure_ascii=False), record["id"]
+                )
+            )
+        elif op == "purge":
+            if "ids" in record:
+                cur.executemany("UPDATE downloads SET active = 0 WHERE id = ?", [(job_id,) for job_id in record["ids"]])
+            else:
+                cur.execute(
+                    "UPDATE downloads SET active = 0 WHERE active = 1 AND status IN (?, ?, ?)",
+                    _finished_statuses
+                )
+        elif op == "clear":
+            cur.execute("UPDATE downloads SET active = 0 WHERE active = 1")
+
+    def load_active(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM downloads WHERE active = 1 ORDER BY seq"
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def load_archive(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT video_id, format, quality, output_path FROM archive"
+            ).fetchall()
+
+    def add_archive(self, video_id, file_format, quality, output_path, completed_at):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO archive (video_id, format, quality, output_path, completed_at) VALUES (?, ?, ?, ?, ?)",
+                (video_id, file_format, quality, output_path, completed_at)
+            )
+
+    def remove_archive(self, video_id, file_format, quality):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM archive WHERE video_id = ? AND format = ? AND quality = ?",
+                (video_id, file_format, quality)
+            )
+
+    def import_archive_from_history(self, qualities):
+        """Seed an empty archive from completed downloads; qualities maps a format to the quality to record it under."""
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM archive LIMIT 1").fetchone() is not None:
+                return 0
+            rows = self._conn.execute(
+                "SELECT video_id, format, output_path, end_time FROM downloads "
+                "WHERE status = 'completed' AND video_id IS NOT NULL AND format IS NOT NULL"
+            ).fetchall()
+            rows = [
+                (video_id, file_format, qualities[file_format], output_path, end_time)
+                for video_id, file_format, output_path, end_time in rows
+                if file_format in qualities
+            ]
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO archive (video_id, format, quality, output_path, completed_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            return len(rows)
@@ -0,0 +1,123 @@
+# uTubeDownload_logwriter.py
+
+import os
+import gzip
+import queue
+import shutil
+import datetime
+import threading
+
+class LogWriter:
+    """Writes log.txt from one background thread so callers never open a file.
+
+    Lines wait in a bounded queue; when it is full they are dropped and counted rather than
+    blocking the caller. The file stays open between batches, and once it grows past max_bytes
+    it is renamed, gzipped, and only the newest backups archives are kept.
+    """
+
+    def __init__(self, path_provider, max_bytes=1024 * 1024, backups=5, max_queue=10000, flush_interval=1.0):
+        self.path_provider = path_provider
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._handle = None
+        self._path = None
+        self._dropped = 0
+
+    def write(self, line):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((datetime.datetime.now(), line))
+        except queue.Full:
+            self._dropped += 1
+
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        thread = self._thread
+        if thread and thread.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                return
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first]
+            while len(batch) < 500:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = None in batch
+            try:
+                self._write_batch([entry for entry in batch if entry is not None])
+            except Exception:
+                self._close()
+            if stopping:
+                self._close()
+                return
+
+    def _write_batch(self, batch):
+        if not batch:
+            return
+        path = self.path_provider()
+        if path != self._path:
+            self._close()
+            self._path = path
+        if self._handle is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._handle = open(path, "a", encoding="utf-8")
+        lines = []
+        if self._dropped:
+            lines.append(f"{datetime.datetime.now()} - {self._dropped} log lines dropped, the log queue was full\n")
+            self._dropped = 0
+        lines.extend(f"{stamp} - {line}\n" for stamp, line in batch)
+        self._handle.write("".join(lines))
+        self._handle.flush()
+        if self._handle.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _close(self):
+        if self._handle is not None:
+            try:
+                self._handle.close()
+            except Exception:
+                pass
+            self._handle = None
+
+    def _rotate(self):
+        self._close()
+        base, ext = os.path.splitext(self._path)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        rotated = f"{base}-{stamp}{ext}"
+        os.replace(self._path, rotated)
+        with open(rotated, "rb") as src, gzip.open(rotated + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(rotated)
+        folder = os.path.dirname(self._path)
+        prefix = os.path.basename(base) + "-"
+        archives = sorted(
+            name for name in os.listdir(folder)
+            if name.startswith(prefix) and name.endswith(ext + ".gz")
+        )
+        for name in archives[:max(0, len(archives) - self.backups)]:
+            try:
+                os.remove(os.path.join(folder, name))
+            except OSError:
+                pass
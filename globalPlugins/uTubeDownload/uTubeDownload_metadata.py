@@ -0,0 +1,88 @@
+# uTubeDownload_metadata.py
+
+import os
+import time
+import threading
+
+class MetadataCache:
+    """yt-dlp info JSON on disk, one file per video id, so duration lookups, snapshots, trims and downloads share one extraction.
+
+    A file's mtime is when it was extracted (checked against the TTL) and its atime is when it was last used (for LRU eviction).
+    The files are plain info JSON, so yt-dlp can read them back with --load-info-json.
+    """
+
+    def __init__(self, directory, ttl=3600, max_entries=200):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._fetch_locks = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, video_id):
+        return os.path.join(self.directory, f"{video_id}.info.json")
+
+    def output_template(self):
+        # For yt-dlp's "-o infojson:" option; it appends .info.json itself.
+        return os.path.join(self.directory, "%(id)s")
+
+    def fetch_lock(self, video_id):
+        """One lock per video id, so two features asking for the same video extract it once."""
+        with self._lock:
+            return self._fetch_locks.setdefault(video_id, threading.Lock())
+
+    def fresh_path(self, video_id):
+        if not video_id:
+            return None
+        path = self.path_for(video_id)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        now = time.time()
+        if now - st.st_mtime > self.ttl:
+            return None
+        try:
+            os.utime(path, (now, st.st_mtime))
+        except OSError:
+            pass
+        return path
+
+    def put(self, video_id, info_text):
+        path = self.path_for(video_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(info_text)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def discard(self, video_id):
+        try:
+            os.remove(self.path_for(video_id))
+        except OSError:
+            pass
+
+    def evict(self):
+        now = time.time()
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(".info.json"):
+                    continue
+                try:
+                    st = entry.stat()
+                    if now - st.st_mtime > self.ttl:
+                        os.remove(entry.path)
+                        continue
+                except OSError:
+                    continue
+                entries.append((st.st_atime, entry.path))
+            if len(entries) <= self.max_entries:
+                return
+            entries.sort()
+            for _atime, path in entries[:len(entries) - self.max_entries]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
@@ -0,0 +1,133 @@
+# uTubeDownload_metrics.py
+
+import os
+import json
+import time
+import threading
+
+# Phases in the order a job passes through them.
+Phases = ["queue_wait", "extract", "transfer", "postprocess_wait", "encode"]
+
+class JobMetrics:
+    """Timestamps, bytes and speeds gathered while one job runs."""
+
+    def __init__(self, download_id, file_format, kind, queued_at):
+        self.download_id = download_id
+        self.file_format = file_format
+        self.kind = kind
+        self.marks = {"queued": queued_at}
+        self.stage = None
+        self.bytes_done = 0
+        self.current_bytes = 0
+        self.peak_speed = 0.0
+        self.cpu_time = 0.0
+
+    def mark(self, name, when=None):
+        self.marks.setdefault(name, when or time.time())
+
+    def on_progress(self, event):
+        if self.stage != "download":
+            return
+        self.mark("first_progress", event.get("time"))
+        downloaded = event.get("downloaded_bytes")
+        if downloaded is not None:
+            # yt-dlp starts counting again for every format it fetches.
+            if downloaded < self.current_bytes:
+                self.bytes_done += self.current_bytes
+            self.current_bytes = downloaded
+        speed = event.get("speed")
+        if speed:
+            self.peak_speed = max(self.peak_speed, speed)
+
+    def _span(self, start, end):
+        if start in self.marks and end in self.marks:
+            return max(0.0, self.marks[end] - self.marks[start])
+        return 0.0
+
+    def finish(self, ok):
+        self.mark("finished")
+        transfer_start = "first_progress" if "first_progress" in self.marks else "download_started"
+        phases = {
+            "queue_wait": self._span("queued", "download_started"),
+            "extract": self._span("download_started", transfer_start),
+            "transfer": self._span(transfer_start, "download_finished"),
+            "postprocess_wait": self._span("download_finished", "postprocess_started"),
+            "encode": self._span("postprocess_started", "postprocess_finished"),
+        }
+        total_bytes = self.bytes_done + self.current_bytes
+        return {
+            "id": self.download_id,
+            "format": self.file_format,
+            "kind": self.kind,
+            "ok": ok,
+            "finished": self.marks["finished"],
+            "wall": self._span("queued", "finished"),
+            "phases": phases,
+            "bytes": total_bytes,
+            "avg_speed": total_bytes / phases["transfer"] if phases["transfer"] > 0 else None,
+            "peak_speed": self.peak_speed or None,
+            "cpu": self.cpu_time,
+        }
+
+class MetricsStore:
+    """The last keep finished jobs plus running totals, saved as one JSON file."""
+
+    def __init__(self, path, keep=200):
+        self.path = path
+        self.keep = keep
+        self._lock = threading.Lock()
+        self.jobs = []
+        self.totals = {"jobs": 0, "failed": 0, "bytes": 0, "wall": 0.0, "cpu": 0.0}
+        self.totals.update({phase: 0.0 for phase in Phases})
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.jobs = data.get("jobs", [])[-self.keep:]
+            self.totals.update(data.get("totals", {}))
+        except (OSError, ValueError):
+            pass
+
+    def record(self, job):
+        with self._lock:
+            self.jobs.append(job)
+            del self.jobs[:-self.keep]
+            self.totals["jobs"] += 1
+            self.totals["failed"] += 0 if job["ok"] else 1
+            self.totals["bytes"] += job["bytes"]
+            self.totals["wall"] += job["wall"]
+            self.totals["cpu"] += job["cpu"]
+            for phase in Phases:
+                self.totals[phase] += job["phases"].get(phase, 0.0)
+            data = json.dumps({"jobs": self.jobs, "totals": self.totals})
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def summary(self, last=20):
+        """Aggregate the last jobs: count, median and peak speed, and each phase's share of wall time."""
+        with self._lock:
+            jobs = self.jobs[-last:]
+        if not jobs:
+            return None
+        speeds = sorted(job["avg_speed"] for job in jobs if job["ok"] and job["avg_speed"])
+        median = None
+        if speeds:
+            mid = len(speeds) // 2
+            median = speeds[mid] if len(speeds) % 2 else (speeds[mid - 1] + speeds[mid]) / 2
+        wall = sum(job["wall"] for job in jobs)
+        shares = {
+            phase: (sum(job["phases"].get(phase, 0.0) for job in jobs) / wall if wall else 0.0)
+            for phase in Phases
+        }
+        return {
+            "jobs": len(jobs),
+            "failed": sum(1 for job in jobs if not job["ok"]),
+            "median_speed": median,
+            "peak_speed": max((job["peak_speed"] or 0 for job in jobs), default=0) or None,
+            "shares": shares,
+            "cpu": sum(job["cpu"] for job in jobs),
+        }
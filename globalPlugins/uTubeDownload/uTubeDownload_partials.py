@@ -0,0 +1,127 @@
+# uTubeDownload_partials.py
+
+import os
+import re
+import json
+import struct
+
+# Partial names end in one of these once .part, a format id and fragment suffixes are stripped.
+_media_extensions = {"mp4", "m4a", "m4v", "mov", "3gp", "webm", "mkv", "mka", "mp3", "ts", "flv", "ogg", "opus"}
+_iso_boxes = {b"ftyp", b"styp", b"moov", b"moof", b"mdat", b"sidx", b"free", b"skip", b"wide", b"emsg"}
+_fragment_name = re.compile(r"^(?P<part>.+\.part)-Frag(?P<index>\d+)(?:\.part)?$", re.IGNORECASE)
+
+def aria2ControlValid(path, data_size=None):
+    """Check an aria2 control file: its header, a bitfield that fits the piece count, and in-flight pieces that
+    fit inside the file. data_size, when given, must not be larger than the download's total length."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        version = struct.unpack_from(">H", data, 0)[0]
+        if version not in (0, 1):
+            return False
+        # Version 0 is written in the byte order of the machine, which is little-endian on Windows.
+        order = ">" if version == 1 else "<"
+        offset = 6
+        hash_length = struct.unpack_from(order + "I", data, offset)[0]
+        if hash_length not in (0, 20):
+            return False
+        offset += 4 + hash_length
+        piece_length, total_length, _upload_length, bitfield_length = struct.unpack_from(order + "IQQI", data, offset)
+        offset += 24
+        if piece_length == 0:
+            return False
+        pieces = (total_length + piece_length - 1) // piece_length
+        if total_length and bitfield_length != (pieces + 7) // 8:
+            return False
+        offset += bitfield_length
+        in_flight = struct.unpack_from(order + "I", data, offset)[0]
+        offset += 4
+        for _ in range(in_flight):
+            piece_index, _length, piece_bitfield_length = struct.unpack_from(order + "III", data, offset)
+            if total_length and piece_index >= pieces:
+                return False
+            offset += 12 + piece_bitfield_length
+        if offset > len(data):
+            return False
+    except (OSError, struct.error):
+        return False
+    return not (data_size is not None and total_length and data_size > total_length)
+
+def ytdlFragmentIndex(path):
+    """Number of fragments yt-dlp has already appended to the .part, from its .ytdl file; None if that is unreadable."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        downloader = state["downloader"]
+        index = downloader["current_fragment"]["index"]
+        count = downloader.get("fragment_count")
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if not isinstance(index, int) or index < 0:
+        return None
+    if isinstance(count, int) and index > count:
+        return None
+    return index
+
+def _media_extension(name):
+    name = _fragment_name.sub(r"\g<part>", name)
+    while name.lower().endswith((".part", ".temp", ".download", ".tmp")):
+        name = os.path.splitext(name)[0]
+    return os.path.splitext(name)[1].lstrip(".").lower()
+
+def probeHeader(path):
+    """Look at the first bytes of a partial file: "valid" for a known container, "corrupt" when the data cannot be
+    the start of the file, or None when the header proves nothing either way."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(192)
+    except OSError:
+        return None
+    if len(head) < 12:
+        return None
+    # Sequential writers never leave a hole at the start of the file.
+    if not head.strip(b"\0"):
+        return "corrupt"
+    box_size = struct.unpack_from(">I", head, 0)[0]
+    if head[4:8] in _iso_boxes:
+        return "valid" if box_size in (0, 1) or box_size >= 8 else "corrupt"
+    if (head.startswith((b"\x1aE\xdf\xa3", b"ID3", b"FLV", b"OggS", b"RIFF", b"\xff\xd8\xff", b"\x89PNG"))
+            or (head[0] == 0xFF and head[1] & 0xE0 == 0xE0)
+            or (head[0] == 0x47 and (len(head) < 189 or head[188] == 0x47))):
+        return "valid"
+    # An HTML error page or anything else saved under a media name is not the video.
+    if _media_extension(os.path.basename(path)) in _media_extensions:
+        return "corrupt"
+    return None
+
+def unusablePartials(path):
+    """Files to delete for the partial at path, with the reason; no files when it can be resumed or nothing proves it broken."""
+    name = os.path.basename(path)
+    if name.lower().endswith(".aria2"):
+        data_file = path[:-len(".aria2")]
+        if not os.path.exists(data_file):
+            return [path], "control file without its download"
+        if not aria2ControlValid(path, os.path.getsize(data_file)):
+            return [path, data_file], "damaged aria2 control file"
+        return [], "aria2 control file checks out"
+    if os.path.exists(path + ".aria2"):
+        # aria2 fills pieces in any order, so the control file decides, not the header.
+        return [], "tracked by its aria2 control file"
+    if name.lower().endswith(".ytdl"):
+        part_file = path[:-len(".ytdl")] + ".part"
+        if ytdlFragmentIndex(path) is None:
+            return [f for f in (path, part_file) if os.path.exists(f)], "unreadable fragment index"
+        return [], "fragment index checks out"
+    fragment = _fragment_name.match(name)
+    if fragment:
+        ytdl_file = os.path.join(os.path.dirname(path), fragment.group("part")[:-len(".part")] + ".ytdl")
+        appended = ytdlFragmentIndex(ytdl_file)
+        if appended is not None and int(fragment.group("index")) <= appended:
+            return [path], "fragment already appended"
+        return [], "fragment still needed"
+    if os.path.getsize(path) == 0:
+        return [], "empty"
+    if probeHeader(path) == "corrupt":
+        ytdl_file = os.path.splitext(path)[0] + ".ytdl" if name.lower().endswith(".part") else None
+        return [f for f in (path, ytdl_file) if f and os.path.exists(f)], "not a valid media header"
+    return [], "header checks out"
@@ -0,0 +1,351 @@
+# uTubeDownload_postprocess.py
+
+import os
+import re
+import struct
+
+# yt-dlp prints this line for every file it finishes, so the download stage knows what to hand over.
+DownloadedFilePrefix = "[utd-file]"
+_stream_suffix = re.compile(r"\.stream[\w-]*\.\w+$")
+_keyframe_time = re.compile(r"\bpts_time:\s*(-?[\d.]+)")
+_stream_codec = re.compile(r"Stream #\d+:\d+\S*: (Video|Audio): (\w+)")
+
+# Codecs an MP4 can carry as they are; anything else is encoded.
+Mp4VideoCodecs = {"h264", "hevc"}
+Mp4AudioCodecs = {"aac", "mp3", "ac3", "eac3", "alac", "opus"}
+
+# How MP4 trims are cut: stream copy from the nearest keyframes, re-encode only the partial
+# groups of pictures at both ends, or re-encode the whole clip.
+TrimModes = ("fast", "smart", "exact")
+
+# (encoder, preset, crf) for trims that re-encode video. x265 "fast" is what every trim used before.
+EncoderProfiles = {
+    "x264-ultrafast": ("libx264", "ultrafast", 23),
+    "x264-veryfast": ("libx264", "veryfast", 23),
+    "x265-ultrafast": ("libx265", "ultrafast", 23),
+    "x265-fast": ("libx265", "fast", 23),
+    "x265-medium": ("libx265", "medium", 23),
+}
+DefaultEncoderProfile = "x265-fast"
+
+# H.264 profile_idc values x264 can encode 8-bit 4:2:0 edges for, by x264 profile name.
+_avc_profiles = {66: "baseline", 77: "main", 100: "high"}
+_mp4_containers = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+# showinfo rounds timestamps to six significant digits; every cut point is nudged by this much so a
+# rounded keyframe time still lands on the keyframe and not the frame next to it.
+_cut_margin = 0.01
+
+def streamOutputTemplate(token):
+    # Raw streams keep this name until post-processing; the token stops two jobs for the same video sharing files.
+    return f"%(title)s.stream{token}-%(format_id)s.%(ext)s"
+
+def downloadedFileArgs():
+    return ["--print", f"after_move:{DownloadedFilePrefix} %(filepath)s", "--progress"]
+
+def findDownloadedFiles(stdout_str, save_path):
+    files = []
+    for line in stdout_str.splitlines():
+        if line.startswith(DownloadedFilePrefix):
+            path = os.path.join(save_path, line[len(DownloadedFilePrefix):].strip())
+            if path not in files and os.path.exists(path):
+                files.append(path)
+    return files
+
+def bundleOutputTemplates(token):
+    """yt-dlp -o templates for the thumbnail and subtitles of a bundle job, named after its streams."""
+    return {
+        "thumbnail": f"%(title)s.stream{token}-thumb.%(ext)s",
+        "subtitle": f"%(title)s.stream{token}-subs.%(ext)s",
+    }
+
+def findBundleExtras(save_path, token):
+    """(thumbnail, subtitles) yt-dlp wrote for a bundle job; yt-dlp prints no after_move line for these."""
+    thumbnail = None
+    subtitles = []
+    try:
+        names = sorted(os.listdir(save_path))
+    except OSError:
+        names = []
+    for name in names:
+        if name.endswith((".part", ".ytdl")):
+            continue
+        if f".stream{token}-thumb." in name:
+            thumbnail = os.path.join(save_path, name)
+        elif f".stream{token}-subs." in name:
+            subtitles.append(os.path.join(save_path, name))
+    return thumbnail, subtitles
+
+def bundleOutputs(item):
+    """Paths of the MP4, MP3 and JPG a bundle job writes."""
+    stem = os.path.splitext(outputPathFor(item))[0]
+    outputs = {"mp4": f"{stem}.mp4", "mp3": f"{stem}.mp3"}
+    if item["postprocess"].get("thumbnail"):
+        outputs["jpg"] = f"{stem}.jpg"
+    return outputs
+
+def _tag_args(tags):
+    args = []
+    for key, value in (tags or {}).items():
+        if value:
+            args += ["-metadata", f"{key}={value}"]
+    return args
+
+def outputPathFor(item):
+    spec = item["postprocess"]
+    if spec.get("output"):
+        return spec["output"]
+    first = item["inputs"][0]
+    stem = _stream_suffix.sub("", os.path.basename(first))
+    return os.path.join(os.path.dirname(first), f"{stem}.{item['format']}")
+
+def encoderArgs(profile, threads=0, encoder=None):
+    """ffmpeg video options for an encoder profile; encoder swaps the library but keeps the preset and quality."""
+    library, preset, crf = EncoderProfiles.get(profile, EncoderProfiles[DefaultEncoderProfile])
+    library = encoder or library
+    args = ["-c:v", library, "-preset", preset, "-crf", str(crf)]
+    if threads:
+        # x265 sizes its own thread pool and ignores -threads.
+        args += ["-x265-params", f"pools={threads}"] if library == "libx265" else ["-threads", str(threads)]
+    return args
+
+def streamProbeCommand(converter, path):
+    """ffmpeg run with no output; it exits with an error but lists the input streams on stderr first."""
+    return [converter, "-hide_banner", "-i", path]
+
+def parseStreamCodecs(text):
+    """Return {"video": codec, "audio": codec} for the first input streams in ffmpeg's stderr; cover art is not video."""
+    codecs = {}
+    for line in text.splitlines():
+        if line.startswith("Output #"):
+            break
+        match = _stream_codec.search(line)
+        if match and "attached pic" not in line:
+            codecs.setdefault(match.group(1).lower(), match.group(2))
+    return codecs
+
+def _mp4_stream_args(codecs):
+    # Without a probe result, keep the old behaviour: encode the video, copy the audio.
+    video = codecs.get("video")
+    audio = codecs.get("audio")
+    if video in Mp4VideoCodecs:
+        args = ["-c:v", "copy"]
+        if video == "hevc":
+            # Players that look for the hvc1 tag refuse HEVC tagged hev1.
+            args += ["-tag:v", "hvc1"]
+    else:
+        args = ["-c:v", "libx265", "-preset", "fast", "-crf", "23"]
+    if audio is None or audio in Mp4AudioCodecs:
+        args += ["-c:a", "copy"]
+    else:
+        args += ["-c:a", "aac", "-b:a", "192k"]
+    return args
+
+def keyframeProbeCommand(converter, path):
+    """ffmpeg run that decodes only keyframes and prints one showinfo line, with its pts_time, for each."""
+    return [
+        converter, "-hide_banner", "-nostats", "-skip_frame", "nokey", "-i", path,
+        "-map", "0:v:0", "-an", "-vf", "showinfo", "-f", "null", "-"
+    ]
+
+def keyframeTime(line):
+    if "showinfo" not in line:
+        return None
+    match = _keyframe_time.search(line)
+    return float(match.group(1)) if match else None
+
+def _seconds(value):
+    return f"{max(value, 0):.3f}"
+
+def _concat_entry(path):
+    return "file '" + path.replace("'", "'\\''") + "'\n"
+
+def _mp4_boxes(f, start, end):
+    # (type, payload start, payload end) of the boxes between start and end.
+    position = start
+    while position + 8 <= end:
+        f.seek(position)
+        size, kind = struct.unpack(">I4s", f.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - position
+        if size < header:
+            return
+        yield kind, position + header, min(position + size, end)
+        position += size
+
+def _find_avc_config(f, start, end, timescale=None):
+    # Depth first, so the mdhd read last is the one of the track whose stsd is being looked at.
+    for kind, begin, finish in _mp4_boxes(f, start, end):
+        if kind in _mp4_containers:
+            found = _find_avc_config(f, begin, finish, timescale)
+            if found:
+                return found
+        elif kind == b"mdhd":
+            f.seek(begin)
+            version = f.read(1)[0]
+            f.seek(begin + (20 if version == 1 else 12))
+            timescale = struct.unpack(">I", f.read(4))[0]
+        elif kind == b"stsd":
+            # Sample entries follow version, flags and entry count; a visual entry has 78 bytes before its boxes.
+            for entry, entry_begin, entry_finish in _mp4_boxes(f, begin + 8, finish):
+                if entry not in (b"avc1", b"avc3"):
+                    continue
+                for child, child_begin, _child_finish in _mp4_boxes(f, entry_begin + 78, entry_finish):
+                    if child == b"avcC":
+                        f.seek(child_begin)
+                        _version, profile, _compatibility, level = f.read(4)
+                        return profile, level, timescale
+    return None
+
+def readAvcConfig(path):
+    """(profile_idc, level_idc, timescale) of the first H.264 track of an MP4, from its avcC box; None if there is none."""
+    try:
+        with open(path, "rb") as f:
+            return _find_avc_config(f, 0, os.fstat(f.fileno()).st_size)
+    except (OSError, struct.error, ValueError, IndexError):
+        return None
+
+def _exact_cut_commands(converter, source, output, duration, profile, threads):
+    return [[
+        converter, "-hide_banner", "-i", source, "-ss", "0", "-t", _seconds(duration),
+        "-map", "0:v:0", "-map", "0:a:0?"
+    ] + encoderArgs(profile, threads) + [
+        "-c:a", "aac", "-b:a", "192k", "-movflags", "+faststart", "-y", output
+    ]]
+
+def smartCutCommands(converter, item, keyframes, avc=None):
+    """Return (commands, output_path, scratch_files) that cut a trim's source to its first duration seconds.
+
+    The source comes from a stream-copy section download, so it starts at the keyframe before the
+    requested start and time 0 is the start itself. Only the frames from 0 to the first keyframe
+    inside the clip and from the last keyframe to the end are encoded; the rest is copied. avc is
+    readAvcConfig() of the source: the edges are encoded with libx264 at its profile, level and
+    timescale. An MP4 sample entry holds only one SPS and PPS, so the concat demuxer turns every
+    piece into Annex B with its own parameter sets in-band, and the output is tagged avc3, which
+    tells players to take them from the stream. When the source is not H.264 in a profile x264 can
+    match, the whole clip is encoded as in exact mode.
+    """
+    spec = item["postprocess"]
+    source = item["inputs"][0]
+    output = outputPathFor(item)
+    duration = spec["duration"]
+    profile = spec.get("profile")
+    threads = spec.get("threads", 0)
+    if not avc or avc[0] not in _avc_profiles:
+        return _exact_cut_commands(converter, source, output, duration, profile, threads), output, []
+    avc_profile, avc_level, timescale = avc
+    first = min((t for t in keyframes if t >= -_cut_margin), default=None)
+    last = max((t for t in keyframes if t <= duration - _cut_margin), default=None)
+    if first is None or last is None or last - first < 2 * _cut_margin:
+        # The clip lies within one group of pictures, so there is nothing to copy.
+        return _exact_cut_commands(converter, source, output, duration, profile, threads), output, []
+    stem = os.path.splitext(output)[0] + ".smartcut"
+    timebase = ["-video_track_timescale", str(timescale)] if timescale else []
+    edge = encoderArgs(profile, threads, encoder="libx264") + [
+        "-profile:v", _avc_profiles[avc_profile], "-level:v", f"{avc_level / 10:.1f}", "-pix_fmt", "yuv420p"
+    ] + timebase
+    commands = []
+    parts = []
+    if first > _cut_margin:
+        head = f"{stem}-head.mp4"
+        commands.append([
+            converter, "-hide_banner", "-i", source, "-ss", "0", "-to", _seconds(first - _cut_margin),
+            "-map", "0:v:0", "-an"
+        ] + edge + ["-y", head])
+        parts.append(head)
+    # -t on a stream copy stops on decode time and lets the frames after the last keyframe through, so
+    # the segment muxer splits at that keyframe instead; only the first segment is used.
+    middle = f"{stem}-middle%d.mp4"
+    commands.append([
+        converter, "-hide_banner", "-ss", _seconds(first + _cut_margin), "-i", source,
+        "-map", "0:v:0", "-an", "-c", "copy", "-f", "segment", "-segment_format", "mp4",
+        "-segment_times", _seconds(last - first - 2 * _cut_margin), "-reset_timestamps", "1"
+    ] + (["-segment_format_options", f"video_track_timescale={timescale}"] if timescale else []) + ["-y", middle])
+    parts.append(middle % 0)
+    if duration - last > _cut_margin:
+        tail = f"{stem}-tail.mp4"
+        commands.append([
+            converter, "-hide_banner", "-ss", _seconds(last - _cut_margin), "-i", source,
+            "-t", _seconds(duration - last), "-map", "0:v:0", "-an"
+        ] + edge + ["-y", tail])
+        parts.append(tail)
+    audio = f"{stem}-audio.m4a"
+    commands.append([
+        converter, "-hide_banner", "-i", source, "-ss", "0", "-t", _seconds(duration),
+        "-map", "0:a:0", "-vn", "-c:a", "aac", "-b:a", "192k", "-y", audio
+    ])
+    concat_list = f"{stem}.txt"
+    with open(concat_list, "w", encoding="utf-8") as f:
+        f.writelines(_concat_entry(part) for part in parts)
+    commands.append([
+        converter, "-hide_banner", "-f", "concat", "-safe", "0", "-auto_convert", "1", "-i", concat_list, "-i", audio,
+        "-map", "0:v:0", "-map", "1:a:0", "-c", "copy", "-tag:v", "avc3"
+    ] + timebase + ["-movflags", "+faststart", "-y", output])
+    return commands, output, parts + [middle % 1, audio, concat_list]
+
+def buildPostprocessCommand(converter, item):
+    """Return (cmd, output_path) for the ffmpeg run that turns a job's downloaded streams into its final file."""
+    spec = item["postprocess"]
+    inputs = item["inputs"]
+    output = outputPathFor(item)
+    kind = spec["kind"]
+    cmd = [converter, "-hide_banner"]
+    if kind == "mp3":
+        cmd += ["-i", inputs[0], "-vn", "-map", "0:a:0"]
+        if spec.get("codecs", {}).get("audio") == "mp3":
+            # Re-encoding an MP3 only loses quality.
+            cmd += ["-c:a", "copy"]
+        else:
+            cmd += ["-c:a", "libmp3lame", "-b:a", f"{spec.get('quality', 320)}k"]
+    elif kind == "merge":
+        for path in inputs:
+            cmd += ["-i", path]
+        if len(inputs) > 1:
+            cmd += ["-map", "0:v:0", "-map", "1:a:0"]
+        else:
+            cmd += ["-map", "0:v?", "-map", "0:a?"]
+        cmd += ["-c", "copy", "-movflags", "+faststart"]
+    elif kind == "transcode_mp4":
+        codecs = spec.get("codecs") or {}
+        cmd += ["-i", inputs[0]]
+        if codecs:
+            cmd += ["-map", "0:v:0?", "-map", "0:a:0?"] + _mp4_stream_args(codecs) + ["-movflags", "+faststart"]
+        else:
+            cmd += ["-map", "0:v?", "-map", "0:a?"] + _mp4_stream_args(codecs)
+    elif kind == "bundle":
+        # One ffmpeg run reads the streams once and writes every output of the job.
+        thumbnail = spec.get("thumbnail")
+        subtitles = spec.get("subtitles") or []
+        streams = [path for path in inputs if path != thumbnail and path not in subtitles]
+        outputs = bundleOutputs(item)
+        tags = _tag_args(spec.get("tags"))
+        for path in streams + subtitles + ([thumbnail] if thumbnail else []):
+            cmd += ["-i", path]
+        audio = 1 if len(streams) > 1 else 0
+        if len(streams) > 1:
+            cmd += ["-map", "0:v:0", "-map", "1:a:0"]
+        else:
+            cmd += ["-map", "0:v?", "-map", "0:a?"]
+        for n in range(len(subtitles)):
+            cmd += ["-map", f"{len(streams) + n}:s:0?"]
+        cmd += ["-c:v", "copy", "-c:a", "copy"]
+        if subtitles:
+            cmd += ["-c:s", "mov_text"]
+        cmd += tags + ["-movflags", "+faststart", "-y", outputs["mp4"]]
+        cmd += ["-map", f"{audio}:a:0"]
+        if spec.get("codecs", {}).get("audio") == "mp3":
+            cmd += ["-c:a", "copy"]
+        else:
+            cmd += ["-c:a", "libmp3lame", "-b:a", f"{spec.get('quality', 320)}k"]
+        cmd += tags + ["-y", outputs["mp3"]]
+        if thumbnail:
+            cmd += ["-map", f"{len(streams) + len(subtitles)}:v:0", "-frames:v", "1", "-q:v", "2", "-y", outputs["jpg"]]
+        return cmd, outputs["mp4"]
+    else:
+        raise ValueError(f"Unknown post-processing step: {kind}")
+    cmd += ["-y", output]
+    return cmd, output
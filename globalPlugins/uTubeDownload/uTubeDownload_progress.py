@@ -0,0 +1,170 @@
+# uTubeDownload_progress.py
+
+import os
+import time
+import threading
+from collections import deque
+
+# yt-dlp prints one line per progress tick with this prefix when run with --newline.
+ProgressPrefix = "[utd-progress]"
+YtdlpProgressTemplate = "download:" + ProgressPrefix + " " + " ".join([
+    "%(progress.status)s",
+    "%(progress.downloaded_bytes)s",
+    "%(progress.total_bytes)s",
+    "%(progress.total_bytes_estimate)s",
+    "%(progress.speed)s",
+    "%(progress.eta)s",
+    "%(progress.fragment_index)s",
+    "%(progress.fragment_count)s",
+])
+
+def _to_number(value, cast=float):
+    if value in (None, "", "NA", "None", "N/A"):
+        return None
+    try:
+        return cast(float(value))
+    except ValueError:
+        return None
+
+def isYtdlpCommand(cmd):
+    return bool(cmd) and os.path.basename(cmd[0]).lower().startswith("yt-dlp")
+
+def isFfmpegCommand(cmd):
+    return bool(cmd) and os.path.basename(cmd[0]).lower().startswith("ffmpeg")
+
+def withProgressArgs(cmd):
+    """Return a copy of cmd that makes yt-dlp or ffmpeg report machine-readable progress on stdout."""
+    cmd = list(cmd)
+    if isYtdlpCommand(cmd) and "--progress-template" not in cmd:
+        cmd[1:1] = ["--newline", "--progress-template", YtdlpProgressTemplate]
+    elif isFfmpegCommand(cmd) and "-progress" not in cmd:
+        cmd[1:1] = ["-progress", "pipe:1", "-nostats"]
+    return cmd
+
+def parseYtdlpLine(line):
+    if not line.startswith(ProgressPrefix):
+        return None
+    fields = line[len(ProgressPrefix):].split()
+    if len(fields) < 8:
+        return None
+    total = _to_number(fields[2], int) or _to_number(fields[3], int)
+    return {
+        "source": "yt-dlp",
+        "status": fields[0],
+        "downloaded_bytes": _to_number(fields[1], int),
+        "total_bytes": total,
+        "speed": _to_number(fields[4]),
+        "eta": _to_number(fields[5], int),
+        "fragment_index": _to_number(fields[6], int),
+        "fragment_count": _to_number(fields[7], int),
+        "time": time.time(),
+    }
+
+class FfmpegProgressParser:
+    """Collects the key=value blocks written by ffmpeg -progress and turns each block into one event."""
+
+    def __init__(self):
+        self._block = {}
+        self._last_bytes = None
+        self._last_time = None
+
+    def feed(self, line):
+        if "=" not in line:
+            return None
+        key, value = line.split("=", 1)
+        self._block[key.strip()] = value.strip()
+        if key.strip() != "progress":
+            return None
+        block, self._block = self._block, {}
+        now = time.time()
+        total_size = _to_number(block.get("total_size"), int)
+        speed = None
+        if total_size is not None and self._last_bytes is not None and now > self._last_time:
+            speed = (total_size - self._last_bytes) / (now - self._last_time)
+        if total_size is not None:
+            self._last_bytes, self._last_time = total_size, now
+        out_time_us = _to_number(block.get("out_time_us"), int)
+        return {
+            "source": "ffmpeg",
+            "status": "finished" if block.get("progress") == "end" else "downloading",
+            "downloaded_bytes": total_size,
+            "total_bytes": None,
+            "speed": speed,
+            "eta": None,
+            "fragment_index": None,
+            "fragment_count": None,
+            "out_time": out_time_us / 1000000 if out_time_us is not None else None,
+            "time": now,
+        }
+
+class OutputReader:
+    """Reads a child's stdout and stderr line by line, turning progress lines into events.
+
+    Only the last lines of each stream are kept, so memory stays flat however long the job runs.
+    """
+
+    def __init__(self, process, on_progress=None, on_line=None, tail_lines=500):
+        self.process = process
+        self.on_progress = on_progress
+        self.on_line = on_line
+        self.stdout_tail = deque(maxlen=tail_lines)
+        self.stderr_tail = deque(maxlen=tail_lines)
+        self.last_event = None
+        self._ffmpeg = FfmpegProgressParser()
+        self._threads = []
+
+    def start(self):
+        for stream, tail, parse in (
+            (self.process.stdout, self.stdout_tail, True),
+            (self.process.stderr, self.stderr_tail, False),
+        ):
+            if stream is None:
+                continue
+            t = threading.Thread(target=self._read, args=(stream, tail, parse), daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def join(self, timeout=None):
+        for t in self._threads:
+            t.join(timeout)
+
+    def stdout_text(self):
+        return "\n".join(self.stdout_tail)
+
+    def stderr_text(self):
+        return "\n".join(self.stderr_tail)
+
+    def _read(self, stream, tail, parse):
+        try:
+            for raw in iter(stream.readline, b""):
+                line = raw.decode("utf-8", errors="ignore").rstrip("\r\n")
+                if not line:
+                    continue
+                event = None
+                if parse:
+                    event = parseYtdlpLine(line)
+                    if event is None and "=" in line and " " not in line.strip():
+                        event = self._ffmpeg.feed(line)
+                        if event is None:
+                            continue
+                if event is not None:
+                    self.last_event = event
+                    if self.on_progress:
+                        try:
+                            self.on_progress(event)
+                        except Exception:
+                            pass
+                    continue
+                tail.append(line)
+                if self.on_line:
+                    try:
+                        self.on_line(line)
+                    except Exception:
+                        pass
+        except (OSError, ValueError):
+            pass
+        finally:
+            try:
+                stream.close()
+            except Exception:
+                pass
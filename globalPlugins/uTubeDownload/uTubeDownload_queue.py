@@ -0,0 +1,151 @@
+# uTubeDownload_queue.py
+
+import threading
+from collections import OrderedDict, deque
+
+# Lower rank is served first. Within a class, sources (a playlist, or a single request) take turns.
+PriorityRanks = {
+    "interactive": 0,
+    "trim": 1,
+    "bulk": 2,
+}
+
+def jobPriority(item):
+    priority = item.get("priority")
+    if priority in PriorityRanks:
+        return priority
+    if item.get("trimming"):
+        return "trim"
+    if item.get("is_playlist") or item.get("parent_id"):
+        return "bulk"
+    return "interactive"
+
+def jobSource(item):
+    return item.get("parent_id") or item.get("source") or item.get("id")
+
+class FairShareQueue:
+    """Drop-in replacement for queue.Queue that serves jobs by priority class, round-robin between sources.
+
+    None is treated as a worker shutdown sentinel and is handed out before any job.
+    get(bulk=False) serves the express lane: it never returns bulk jobs or sentinels, only None after close().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._all_done = threading.Condition(self._lock)
+        self._classes = {}
+        self._sentinels = 0
+        self._size = 0
+        self._unfinished = 0
+        self._closed = False
+
+    def put(self, item, first=False):
+        # first puts the job at the head of its source and its source at the head of its class.
+        with self._lock:
+            self._unfinished += 1
+            if item is None:
+                self._sentinels += 1
+            else:
+                rank = PriorityRanks[jobPriority(item)]
+                sources = self._classes.setdefault(rank, OrderedDict())
+                source = jobSource(item)
+                items = sources.setdefault(source, deque())
+                if first:
+                    items.appendleft(item)
+                    sources.move_to_end(source, last=False)
+                else:
+                    items.append(item)
+                self._size += 1
+            self._not_empty.notify_all()
+
+    def remove(self, predicate):
+        """Take the first waiting job predicate accepts out of the queue and return it, or None."""
+        with self._lock:
+            for sources in self._classes.values():
+                for source, items in sources.items():
+                    for item in items:
+                        if predicate(item):
+                            items.remove(item)
+                            if not items:
+                                del sources[source]
+                            self._size -= 1
+                            self._unfinished -= 1
+                            if self._unfinished <= 0:
+                                self._unfinished = 0
+                                self._all_done.notify_all()
+                            return item
+        return None
+
+    def snapshot(self):
+        """Waiting jobs in the order they would be served if nothing else arrived."""
+        with self._lock:
+            order = []
+            for rank in sorted(self._classes):
+                pending = deque(deque(items) for items in self._classes[rank].values())
+                while pending:
+                    items = pending.popleft()
+                    order.append(items.popleft())
+                    if items:
+                        pending.append(items)
+            return order
+
+    def open(self):
+        with self._lock:
+            self._closed = False
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+
+    def _has_express_items(self):
+        bulk_rank = PriorityRanks["bulk"]
+        return any(sources for rank, sources in self._classes.items() if rank < bulk_rank)
+
+    def get(self, bulk=True):
+        with self._lock:
+            if bulk:
+                while not self._sentinels and not self._size:
+                    self._not_empty.wait()
+                if self._sentinels:
+                    self._sentinels -= 1
+                    return None
+            else:
+                while not self._closed and not self._has_express_items():
+                    self._not_empty.wait()
+                if self._closed:
+                    return None
+            for rank in sorted(self._classes):
+                if not bulk and rank >= PriorityRanks["bulk"]:
+                    break
+                sources = self._classes[rank]
+                if not sources:
+                    continue
+                source, items = next(iter(sources.items()))
+                item = items.popleft()
+                if items:
+                    sources.move_to_end(source)
+                else:
+                    del sources[source]
+                self._size -= 1
+                return item
+
+    def task_done(self):
+        with self._lock:
+            self._unfinished -= 1
+            if self._unfinished <= 0:
+                self._unfinished = 0
+                self._all_done.notify_all()
+
+    def join(self):
+        with self._lock:
+            while self._unfinished:
+                self._all_done.wait()
+
+    def qsize(self):
+        with self._lock:
+            return self._size
+
+    def empty(self):
+        return self.qsize() == 0
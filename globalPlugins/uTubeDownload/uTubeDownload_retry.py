@@ -0,0 +1,38 @@
+# uTubeDownload_retry.py
+
+import re
+import random
+
+# Checked first: no number of retries gets past these.
+_permanent = re.compile("|".join([
+    r"private video", r"video is private",
+    r"video unavailable", r"has been removed", r"account .*has been terminated",
+    r"not (?:made this video )?available in your country", r"geo.?restrict",
+    r"sign in to confirm your age", r"members.only", r"join this channel",
+    r"unsupported url", r"is not a valid url", r"requested format is not available",
+    r"http error 40[14]", r"http error 410",
+    r"no space left on device", r"disk full",
+]), re.IGNORECASE)
+
+_transient = re.compile("|".join([
+    r"http error 429", r"too many requests", r"http error 5\d\d",
+    r"connection (?:reset|aborted|refused)", r"remote end closed connection", r"incompleteread",
+    r"timed out", r"temporary failure in name resolution", r"getaddrinfo failed",
+    r"network is unreachable", r"winerror 100(?:53|54|60|65)",
+    r"fragment", r"unable to download", r"ssl", r"errorcode=",
+]), re.IGNORECASE)
+
+def classifyError(stderr):
+    """Return "permanent", "transient", or None when stderr matches neither."""
+    text = stderr or ""
+    if _permanent.search(text):
+        return "permanent"
+    if _transient.search(text):
+        return "transient"
+    return None
+
+def retryDelay(attempt, base=5.0, cap=300.0):
+    """Seconds to wait before retry number attempt (from 1): doubling from base up to cap, with the top half jittered
+    so jobs that failed together do not all come back at once."""
+    delay = min(cap, base * 2 ** max(0, attempt - 1))
+    return random.uniform(delay / 2, delay)
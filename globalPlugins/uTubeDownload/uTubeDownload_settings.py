@@ -5,6 +5,7 @@ import gui
 import config
 from gui.settingsDialogs import SettingsPanel
 from gui import guiHelper
+from .uTubeDownload_bandwidth import parseSchedule
 
 AddOnSummary = "uTubeDownload"
 AddOnName = "uTubeDownload"
@@ -70,6 +71,11 @@ class AudioYoutubeDownloadPanel(SettingsPanel):
         )
         self.multipartChk.SetValue(getINI("UseMultiPart"))
         
+        self.sharedAria2Chk = helper.addItem(
+            wx.CheckBox(self, label=_("Share one aria2c between all downloads"))
+        )
+        self.sharedAria2Chk.SetValue(getINI("SharedAria2"))
+
         connectionsLabel = _("&Number of connections:")
         self.connectionsChoice = helper.addLabeledControl(
             connectionsLabel,
@@ -83,11 +89,69 @@ class AudioYoutubeDownloadPanel(SettingsPanel):
         except Exception:
             self.connectionsChoice.SetSelection(7)
 
+        self.maxDownloadsChoice = helper.addLabeledControl(
+            _("Maximum concurrent &downloads:"),
+            wx.Choice,
+            choices=[str(i) for i in range(1, 11)]
+        )
+        try:
+            self.maxDownloadsChoice.SetSelection(
+                min(max(getINI("MaxConcurrentDownloads"), 1), 10) - 1
+            )
+        except Exception:
+            self.maxDownloadsChoice.SetSelection(0)
+
+        self.stallTimeoutCtrl = helper.addLabeledControl(
+            _("Stop a download after this many seconds without &progress (0 to never stop):"),
+            wx.SpinCtrl,
+            min=0,
+            max=3600,
+            initial=getINI("StallTimeout")
+        )
+
+        self.maxRetriesCtrl = helper.addLabeledControl(
+            _("Number of times to &retry a failed download:"),
+            wx.SpinCtrl,
+            min=0,
+            max=10,
+            initial=getINI("MaxRetries")
+        )
+
+        self.bandwidthLimitCtrl = helper.addLabeledControl(
+            _("Total download speed &limit in KB/s (0 for no limit):"),
+            wx.SpinCtrl,
+            min=0,
+            max=1000000,
+            initial=getINI("BandwidthLimit")
+        )
+
+        self.bandwidthScheduleCtrl = helper.addLabeledControl(
+            _("Speed limit by time of &day, for example 08:00-18:00=500; 22:00-06:00=0:"),
+            wx.TextCtrl
+        )
+        self.bandwidthScheduleCtrl.SetValue(getINI("BandwidthSchedule"))
+
         self.playlistModeChk = helper.addItem(
             wx.CheckBox(self, label=_("Enable &playlist mode by default"))
         )
         self.playlistModeChk.SetValue(getINI("PlaylistMode"))
 
+        self.bundleSubtitlesChk = helper.addItem(
+            wx.CheckBox(self, label=_("Embed s&ubtitles when downloading everything (triple tap)"))
+        )
+        self.bundleSubtitlesChk.SetValue(getINI("BundleSubtitles"))
+
+        self.subtitleLanguagesCtrl = helper.addLabeledControl(
+            _("Subtitle languages, for example en,fr:"),
+            wx.TextCtrl
+        )
+        self.subtitleLanguagesCtrl.SetValue(getINI("SubtitleLanguages"))
+
+        self.bundleMetadataChk = helper.addItem(
+            wx.CheckBox(self, label=_("Tag files with title and channel when downloading everything"))
+        )
+        self.bundleMetadataChk.SetValue(getINI("BundleMetadata"))
+
         self.skipExistingChk = helper.addItem(
             wx.CheckBox(self, label=_("Skip existing files"))
         )
@@ -103,6 +167,18 @@ class AudioYoutubeDownloadPanel(SettingsPanel):
         )
         self.loggingChk.SetValue(getINI("Logging"))
 
+    def isValid(self):
+        try:
+            parseSchedule(self.bandwidthScheduleCtrl.GetValue())
+        except ValueError as e:
+            gui.messageBox(
+                _("Invalid speed limit schedule entry: {entry}. Use start-end=KB/s, for example 08:00-18:00=500.").format(entry=e),
+                _("Error"), wx.OK | wx.ICON_ERROR
+            )
+            self.bandwidthScheduleCtrl.SetFocus()
+            return False
+        return super().isValid()
+
     def onSave(self):
         folder = self.folderPathCtrl.GetValue().strip()
         if folder.endswith("\\"):
@@ -124,11 +200,20 @@ class AudioYoutubeDownloadPanel(SettingsPanel):
             setINI("SayDownloadComplete", self.sayCompleteChk.GetValue())
             setINI("MP3Quality", int(self.qualityChoice.GetStringSelection()))
             setINI("PlaylistMode", self.playlistModeChk.GetValue())
+            setINI("BundleSubtitles", self.bundleSubtitlesChk.GetValue())
+            setINI("SubtitleLanguages", self.subtitleLanguagesCtrl.GetValue().strip() or "en")
+            setINI("BundleMetadata", self.bundleMetadataChk.GetValue())
             setINI("SkipExisting", self.skipExistingChk.GetValue())
             setINI("ResumeOnRestart", self.resumeOnRestartChk.GetValue())
             setINI("Logging", self.loggingChk.GetValue())
             setINI("UseMultiPart", self.multipartChk.GetValue())
+            setINI("SharedAria2", self.sharedAria2Chk.GetValue())
             setINI("MultiPartConnections", int(self.connectionsChoice.GetStringSelection()))
+            setINI("StallTimeout", self.stallTimeoutCtrl.GetValue())
+            setINI("MaxRetries", self.maxRetriesCtrl.GetValue())
+            setINI("MaxConcurrentDownloads", int(self.maxDownloadsChoice.GetStringSelection()))
+            setINI("BandwidthLimit", self.bandwidthLimitCtrl.GetValue())
+            setINI("BandwidthSchedule", self.bandwidthScheduleCtrl.GetValue().strip())
 
 
 
@@ -0,0 +1,147 @@
+# uTubeQueue.py
+
+import wx
+import ui
+import time
+import addonHandler
+from .uTubeDownload_core import (
+    cancelDownload,
+    getDownloadProgress,
+    listJobs,
+    log,
+    moveDownload,
+    pauseDownload,
+    resumeDownload,
+)
+
+addonHandler.initTranslation()
+
+def _describe(item):
+    title = item.get("title") or item.get("url", "")
+    if item.get("is_playlist"):
+        state = _("playlist, {done} of {total} done").format(done=item.get("entries_done", 0), total=item.get("entries_total") or "?")
+    elif item["status"] == "retrying":
+        seconds = max(0, int(item.get("retry_at", 0) - time.time()))
+        state = _("retry {attempt} in {seconds} seconds").format(attempt=item.get("attempts", 1), seconds=seconds)
+    elif item["status"] == "postprocessing":
+        state = _("converting")
+    elif item["status"] == "running":
+        event = getDownloadProgress(item["id"]) or {}
+        done = event.get("downloaded_bytes")
+        total = event.get("total_bytes")
+        if done is not None and total:
+            state = _("downloading {percent}%").format(percent=int(done * 100 / total))
+        else:
+            state = _("downloading")
+    else:
+        state = _("waiting")
+    if item.get("paused"):
+        state = _("paused, {state}").format(state=state)
+    return f"{title}, {item.get('format', '').upper()}, {state}"
+
+class uTubeQueueDialog(wx.Dialog):
+    def __init__(self, parent):
+        super().__init__(parent, title=_("Download queue"), style=wx.DEFAULT_DIALOG_STYLE)
+        self.jobs = []
+        self.init_ui()
+        self.refresh()
+        self.jobsList.SetFocus()
+
+    def init_ui(self):
+        mainSizer = wx.BoxSizer(wx.VERTICAL)
+        listLabel = wx.StaticText(self, label=_("&Downloads:"))
+        mainSizer.Add(listLabel, 0, wx.ALL, 5)
+        self.jobsList = wx.ListBox(self, size=(500, 250))
+        self.jobsList.Bind(wx.EVT_LISTBOX, self.on_select)
+        self.jobsList.Bind(wx.EVT_KEY_DOWN, self.on_list_key)
+        mainSizer.Add(self.jobsList, 1, wx.EXPAND | wx.ALL, 5)
+        btnSizer = wx.BoxSizer(wx.HORIZONTAL)
+        self.pauseBtn = wx.Button(self, label=_("&Pause"))
+        self.pauseBtn.Bind(wx.EVT_BUTTON, self.on_pause)
+        btnSizer.Add(self.pauseBtn, 0, wx.ALL, 5)
+        self.cancelJobBtn = wx.Button(self, label=_("Cancel &download"))
+        self.cancelJobBtn.Bind(wx.EVT_BUTTON, self.on_cancel_job)
+        btnSizer.Add(self.cancelJobBtn, 0, wx.ALL, 5)
+        self.topBtn = wx.Button(self, label=_("Move to &top"))
+        self.topBtn.Bind(wx.EVT_BUTTON, lambda event: self.on_move(True))
+        btnSizer.Add(self.topBtn, 0, wx.ALL, 5)
+        self.bottomBtn = wx.Button(self, label=_("Move to &bottom"))
+        self.bottomBtn.Bind(wx.EVT_BUTTON, lambda event: self.on_move(False))
+        btnSizer.Add(self.bottomBtn, 0, wx.ALL, 5)
+        self.refreshBtn = wx.Button(self, label=_("&Refresh"))
+        self.refreshBtn.Bind(wx.EVT_BUTTON, lambda event: self.refresh())
+        btnSizer.Add(self.refreshBtn, 0, wx.ALL, 5)
+        self.closeBtn = wx.Button(self, wx.ID_CANCEL, label=_("&Close"))
+        btnSizer.Add(self.closeBtn, 0, wx.ALL, 5)
+        mainSizer.Add(btnSizer, 0, wx.ALIGN_CENTER | wx.ALL, 5)
+        self.SetSizerAndFit(mainSizer)
+
+    def selected(self):
+        index = self.jobsList.GetSelection()
+        if index == wx.NOT_FOUND or index >= len(self.jobs):
+            return None
+        return self.jobs[index]
+
+    def refresh(self, select_id=None):
+        current = self.selected()
+        select_id = select_id or (current["id"] if current else None)
+        try:
+            self.jobs = listJobs()
+        except Exception as e:
+            log(f"Error listing downloads: {e}")
+            self.jobs = []
+        self.jobsList.Set([_describe(item) for item in self.jobs] or [_("No downloads in the queue")])
+        ids = [item["id"] for item in self.jobs]
+        self.jobsList.SetSelection(ids.index(select_id) if select_id in ids else 0)
+        self.on_select(None)
+
+    def on_select(self, event):
+        item = self.selected()
+        for button in (self.pauseBtn, self.cancelJobBtn, self.topBtn, self.bottomBtn):
+            button.Enable(item is not None)
+        if item is not None:
+            self.pauseBtn.SetLabel(_("Resu&me") if item.get("paused") else _("&Pause"))
+            waiting = item["status"] == "queued" and not item.get("is_playlist")
+            self.topBtn.Enable(waiting)
+            self.bottomBtn.Enable(waiting)
+
+    def on_list_key(self, event):
+        key = event.GetKeyCode()
+        if key == wx.WXK_DELETE:
+            self.on_cancel_job(None)
+        elif key == wx.WXK_SPACE:
+            self.on_pause(None)
+        elif key == wx.WXK_F5:
+            self.refresh()
+        else:
+            event.Skip()
+
+    def on_pause(self, event):
+        item = self.selected()
+        if item is None:
+            return
+        if item.get("paused"):
+            done = resumeDownload(item["id"])
+            message = _("Resumed") if done else _("Cannot resume this download")
+        else:
+            done = pauseDownload(item["id"])
+            message = _("Paused") if done else _("Cannot pause this download")
+        ui.message(message)
+        self.refresh(item["id"])
+
+    def on_cancel_job(self, event):
+        item = self.selected()
+        if item is None:
+            return
+        ui.message(_("Download cancelled") if cancelDownload(item["id"]) else _("Cannot cancel this download"))
+        self.refresh()
+
+    def on_move(self, first):
+        item = self.selected()
+        if item is None:
+            return
+        if moveDownload(item["id"], first):
+            ui.message(_("Moved to top") if first else _("Moved to bottom"))
+        else:
+            ui.message(_("Only waiting downloads can be moved"))
+        self.refresh(item["id"])
@@ -1,7 +1,6 @@
 # uTubeSnapshot.py
 
 import os
-import re
 import glob
 import subprocess
 import threading
@@ -10,22 +9,14 @@ import wx
 import time
 import shutil
 import addonHandler
-from .uTubeDownload_core import YouTubeEXE, log, getINI, PlayWave, AddOnPath, sectionName
+from .uTubeDownload_core import YouTubeEXE, log, getINI, PlayWave, AddOnPath, sectionName, getVideoInfoPath
+from .uTubeDownload_folderindex import folderIndex
 
 addonHandler.initTranslation()
 
 def _find_next_snapshot_number(save_path):
     try:
-        existing_files = glob.glob(os.path.join(save_path, "Snapshot *.jpg"))
-        numbers = []
-        for file_path in existing_files:
-            match = re.search(r"Snapshot (\d+)\.jpg$", os.path.basename(file_path))
-            if match:
-                numbers.append(int(match.group(1)))
-        if not numbers:
-            return 1
-        next_number = max(numbers) + 1
-        return next_number
+        return folderIndex(save_path).next_number("snapshot")
     except Exception as e:
         log(f"Error finding next snapshot number: {e}")
         return 1
@@ -61,9 +52,9 @@ def capture_snapshot(video_url, download_path):
         try:
             wx.CallAfter(ui.message, _("Downloading thumbnail..."))
 
-            cmd = [
-                YouTubeEXE,
-                video_url,
+            info_path = getVideoInfoPath(video_url)
+            source = ["--load-info-json", info_path] if info_path else [video_url]
+            cmd = [YouTubeEXE] + source + [
                 "--write-thumbnail",
                 "--skip-download",
                 "--no-playlist",
@@ -99,6 +90,7 @@ def capture_snapshot(video_url, download_path):
             
             # Remove file size check to allow small thumbnails
             shutil.move(downloaded_file, final_output_path)
+            folderIndex(download_path).add(os.path.basename(final_output_path))
             success = True
             
         except Exception as e:
@@ -13,12 +13,12 @@ import subprocess
 import re
 import json
 import uuid
-import glob
 import winsound
 from .uTubeDownload_core import (
     addDownloadToQueue,
     getINI,
     log,
+    getVideoInfo,
     YouTubeEXE,
     ConverterPath,
     _process_next_download,
@@ -26,23 +26,21 @@ from .uTubeDownload_core import (
     DownloadPath,
     _download_queue
 )
+from .uTubeDownload_folderindex import folderIndex
+from .uTubeDownload_postprocess import (
+    DefaultEncoderProfile,
+    EncoderProfiles,
+    TrimModes,
+    downloadedFileArgs,
+    encoderArgs,
+)
 
 AddOnName = "uTubeDownload"
 sectionName = AddOnName
 
 def _find_next_trim_number(save_path):
     try:
-        existing_files = glob.glob(os.path.join(save_path, "Trimmed Clip *.mp3"))
-        existing_files.extend(glob.glob(os.path.join(save_path, "Trimmed Clip *.mp4")))
-        numbers = []
-        for file_path in existing_files:
-            match = re.search(r"Trimmed Clip (\d+)\.(mp3|mp4)$", os.path.basename(file_path))
-            if match:
-                numbers.append(int(match.group(1)))
-        if not numbers:
-            return 1
-        next_number = max(numbers) + 1
-        return next_number
+        return folderIndex(save_path).next_number("trim")
     except Exception:
         return 1
 
@@ -81,6 +79,12 @@ class uTubeTrimDialog(wx.Dialog):
         else:
             self.mp3Radio.SetValue(True)
         self.qualityCtrl.SetStringSelection(f"{last_quality} kbps")
+        last_mode = config.conf[sectionName].get("TrimLastMode", "exact")
+        self.modeCtrl.SetSelection(TrimModes.index(last_mode) if last_mode in TrimModes else TrimModes.index("exact"))
+        profiles = list(EncoderProfiles)
+        last_profile = config.conf[sectionName].get("TrimEncoderProfile", DefaultEncoderProfile)
+        self.encoderCtrl.SetSelection(profiles.index(last_profile) if last_profile in profiles else profiles.index(DefaultEncoderProfile))
+        self.threadsCtrl.SetValue(config.conf[sectionName].get("TrimThreads", 0))
         self.on_format_change(None)
         
         # Use cached duration for previous URL, fetch new for new URL
@@ -138,6 +142,20 @@ class uTubeTrimDialog(wx.Dialog):
         self.qualityCtrl.SetStringSelection("320 kbps")
         qualitySizer.Add(self.qualityCtrl, 0, wx.ALL, 5)
         mainSizer.Add(qualitySizer, 0, wx.EXPAND | wx.ALL, 5)
+        videoSizer = wx.StaticBoxSizer(wx.VERTICAL, self, label=_("MP4 Cutting"))
+        videoHelper = guiHelper.BoxSizerHelper(self, sizer=videoSizer)
+        self.modeCtrl = videoHelper.addLabeledControl(_("Cut mode:"), wx.Choice, choices=[
+            _("Fast: copy, cut at the nearest keyframes"),
+            _("Smart: re-encode only the edges, copy the rest"),
+            _("Exact: re-encode the whole clip"),
+        ])
+        self.encoderCtrl = videoHelper.addLabeledControl(_("Encoder:"), wx.Choice, choices=[
+            f"{library[3:]} {preset}" for library, preset, _crf in EncoderProfiles.values()
+        ])
+        self.threadsCtrl = videoHelper.addLabeledControl(
+            _("Encoder threads (0 for automatic):"), wx.SpinCtrl, min=0, max=64, initial=0
+        )
+        mainSizer.Add(videoSizer, 0, wx.EXPAND | wx.ALL, 5)
         btnSizer = wx.BoxSizer(wx.HORIZONTAL)
         self.downloadBtn = wx.Button(self, label=_("Start download"))
         self.downloadBtn.Bind(wx.EVT_BUTTON, self.on_download)
@@ -149,6 +167,7 @@ class uTubeTrimDialog(wx.Dialog):
         self.SetSizerAndFit(mainSizer)
         self.mp3Radio.Bind(wx.EVT_RADIOBUTTON, self.on_format_change)
         self.mp4Radio.Bind(wx.EVT_RADIOBUTTON, self.on_format_change)
+        self.modeCtrl.Bind(wx.EVT_CHOICE, self.on_format_change)
         self.startTimeCtrl.Bind(wx.EVT_TEXT, self.on_time_control_text)
         self.endTimeCtrl.Bind(wx.EVT_TEXT, self.on_time_control_text)
         self.on_format_change(None)
@@ -161,6 +180,10 @@ class uTubeTrimDialog(wx.Dialog):
         url = self.urlCtrl.GetValue().strip()
         if not url:
             return
+        info = getVideoInfo(url)
+        if info and info.get("duration_string"):
+            wx.CallAfter(self._update_duration, info["duration_string"])
+            return
         try:
             cmd = [YouTubeEXE, "--get-duration", "--no-playlist", url]
             result = subprocess.run(
@@ -227,6 +250,12 @@ class uTubeTrimDialog(wx.Dialog):
     def on_format_change(self, event):
         if self.qualityCtrl:
             self.qualityCtrl.Enable(self.mp3Radio.GetValue())
+        if self.modeCtrl:
+            is_mp4 = self.mp4Radio.GetValue()
+            encodes = TrimModes[max(self.modeCtrl.GetSelection(), 0)] != "fast"
+            self.modeCtrl.Enable(is_mp4)
+            self.encoderCtrl.Enable(is_mp4 and encodes)
+            self.threadsCtrl.Enable(is_mp4 and encodes)
 
     def _time_str_to_seconds(self, time_str):
         parts = list(map(float, time_str.split(':')))
@@ -267,6 +296,9 @@ class uTubeTrimDialog(wx.Dialog):
 
         file_format = "mp3" if self.mp3Radio.GetValue() else "mp4"
         quality_kbps = int(self.qualityCtrl.GetStringSelection().split()[0])
+        trim_mode = TrimModes[max(self.modeCtrl.GetSelection(), 0)]
+        encoder_profile = list(EncoderProfiles)[max(self.encoderCtrl.GetSelection(), 0)]
+        threads = self.threadsCtrl.GetValue()
         trim_number = _find_next_trim_number(self.download_path)
         output_filename = f"Trimmed Clip {trim_number}"
         output_path = os.path.join(self.download_path, output_filename)
@@ -281,15 +313,18 @@ class uTubeTrimDialog(wx.Dialog):
         ui.message(_("Trimming and downloading {format}...").format(format=file_format.upper()))
         
         download_sections_arg = f"*{start_time_str}-{end_time_str}"
+        smart_cut = file_format == "mp4" and trim_mode == "smart"
         
         base_cmd = [
             YouTubeEXE,
             url,
             "--no-playlist",
-            "-o", f"{output_path}.%(ext)s",
+            # A smart cut finishes in the post-processing pool, which writes the final name.
+            "-o", f"{output_path}.source.%(ext)s" if smart_cut else f"{output_path}.%(ext)s",
             "--ffmpeg-location", os.path.join(ConverterPath, "ffmpeg.exe"),
             "--download-sections", download_sections_arg
         ]
+        postprocess = None
 
         if file_format == "mp3":
             base_cmd.extend([
@@ -297,11 +332,30 @@ class uTubeTrimDialog(wx.Dialog):
                 "--audio-format", "mp3",
                 "--audio-quality", str(quality_kbps)
             ])
-        else: # mp4
+        elif trim_mode == "fast":
+            # The section is fetched with stream copy, so it starts at the keyframe before the start time.
+            base_cmd.extend([
+                "-f", "bv*[ext=mp4]+ba[ext=m4a]/b[ext=mp4]/bv*+ba/b",
+                "--merge-output-format", "mp4"
+            ])
+        elif smart_cut:
+            # H.264 so the re-encoded edges can be joined to the copied middle.
+            base_cmd.extend([
+                "-f", "bv*[vcodec^=avc1]+ba[ext=m4a]/b[ext=mp4]",
+                "--merge-output-format", "mp4"
+            ] + downloadedFileArgs())
+            postprocess = {
+                "kind": "smartcut",
+                "duration": end_seconds - start_seconds,
+                "profile": encoder_profile,
+                "threads": threads,
+                "output": f"{output_path}.mp4"
+            }
+        else: # exact mp4
             base_cmd.extend([
                 "-f", "bestvideo+bestaudio/best",
                 "--merge-output-format", "mp4",
-                "--postprocessor-args", "ffmpeg:-c:v libx265 -preset fast -crf 23 -c:a copy"
+                "--postprocessor-args", "ffmpeg:" + " ".join(encoderArgs(encoder_profile, threads) + ["-c:a", "copy"])
             ])
             # Note: The trimming is handled by --download-sections,
             # but the postprocessor args for video encoding are still needed.
@@ -313,14 +367,20 @@ class uTubeTrimDialog(wx.Dialog):
             "path": self.download_path,
             "cmd": base_cmd,
             "is_playlist": False,
-            "trimming": True
+            "trimming": True,
+            "priority": "trim"
         }
+        if postprocess:
+            download_obj["postprocess"] = postprocess
         download_id = addDownloadToQueue(download_obj)
         download_obj["id"] = download_id
         _download_queue.put(download_obj)
 
         config.conf[sectionName]["TrimLastFormat"] = file_format
         config.conf[sectionName]["TrimLastQuality"] = quality_kbps
+        config.conf[sectionName]["TrimLastMode"] = trim_mode
+        config.conf[sectionName]["TrimEncoderProfile"] = encoder_profile
+        config.conf[sectionName]["TrimThreads"] = threads
         config.conf[sectionName]["TrimLastStartTime"] = start_time_str
         config.conf[sectionName]["TrimLastEndTime"] = end_time_str
         self.Close()